@@ -1,3 +1,26 @@
 from django.contrib import admin
 
+from .models import Order, OrderLine, Product
+
 # Register your models here.
+
+
+@admin.register(Product)
+class ProductAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'category', 'price', 'stock')
+    # Saving a form would overwrite the reservations made since it was loaded;
+    # change the stock with ``manage.py adjust_stock`` instead.
+    readonly_fields = ('stock',)
+    search_fields = ('title', 'name')
+
+
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    extra = 0
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'total', 'created_at', 'expires_at')
+    list_filter = ('status',)
+    inlines = (OrderLineInline,)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CartConfig(AppConfig):
     name = 'cart'
+
+    def ready(self):
+        # Connect the signal receivers.
+        from . import db, instrumentation, signals  # noqa: F401
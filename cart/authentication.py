@@ -0,0 +1,79 @@
+"""
+Stateless token authentication.
+
+``/token/`` trades a username and password for a short-lived access token and
+a longer-lived refresh token (``/token/refresh/`` exchanges the latter for a
+new access token, if the user still exists and is active). Tokens carry the
+user's id, username and cart id as claims, so ``JWTTokenUserAuthentication``
+authenticates a request without a session or ``User`` query and the cart
+views load the cart by primary key. Obtaining a token sends
+``user_logged_in``, so a guest cart built before is merged into the user's.
+
+Permissions are not put in tokens, where they would outlive a change of the
+user's flags: views checking them use ``USER_AUTHENTICATION_CLASSES``, which
+load the user.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_in
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from .models import Cart
+
+# Authentication of views whose permissions read the user's flags (e.g. IsAdminUser).
+USER_AUTHENTICATION_CLASSES = (JWTAuthentication, SessionAuthentication, BasicAuthentication)
+
+
+class CartTokenObtainPairSerializer(TokenObtainPairSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # A token login is a login: let the receivers (e.g. the guest cart
+        # merge) see the Django request behind the DRF one, as ``login()`` does.
+        request = self.context.get('request')
+        user_logged_in.send(sender=self.user.__class__, request=getattr(request, '_request', request), user=self.user)
+        return data
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        cart, created = Cart.objects.get_or_create(user=user)
+        token['cart_id'] = cart.pk
+        token['username'] = user.get_username()
+        return token
+
+
+class CartTokenObtainPairView(TokenObtainPairView):
+    serializer_class = CartTokenObtainPairSerializer
+
+
+class CartTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        user_id = RefreshToken(attrs['refresh']).get(api_settings.USER_ID_CLAIM)
+        users = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id, 'is_active': True})
+        if not users.exists():
+            raise AuthenticationFailed("The user of this token is inactive or no longer exists.", code='user_inactive')
+        return super().validate(attrs)
+
+
+class CartTokenRefreshView(TokenRefreshView):
+    serializer_class = CartTokenRefreshSerializer
+
+
+def get_user_cart(request):
+    """
+    Get the cart of the authenticated user of ``request``, creating it if needed.
+
+    With a token the cart is looked up by its ``cart_id`` claim; only the
+    cart row is read.
+    """
+    if isinstance(request.auth, Token):
+        cart = Cart.objects.filter(pk=request.auth.get('cart_id'), user_id=request.user.pk).first()
+        if cart is not None:
+            return cart
+    cart, created = Cart.objects.get_or_create(user_id=request.user.pk)
+    return cart
@@ -0,0 +1,36 @@
+"""
+SQLite database backend tuned for concurrent writers.
+
+Every new connection is switched to ``SQLITE_JOURNAL_MODE`` and
+``SQLITE_SYNCHRONOUS``, and transactions start with
+``BEGIN <SQLITE_TRANSACTION_MODE>``. With the default ``DEFERRED`` mode a
+transaction that reads before it writes fails with "database is locked" when
+another connection wrote in between, whatever the busy timeout; ``IMMEDIATE``
+takes the write lock first, so writers queue on the busy timeout instead.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def _setting(name, choices):
+    value = str(getattr(settings, name)).upper()
+    if value not in choices:
+        raise ImproperlyConfigured(f"{name} must be one of: {', '.join(choices)}.")
+    return value
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        # In-memory databases keep their "memory" journal.
+        conn.execute(f"PRAGMA journal_mode = {_setting('SQLITE_JOURNAL_MODE', JOURNAL_MODES)}")
+        conn.execute(f"PRAGMA synchronous = {_setting('SQLITE_SYNCHRONOUS', SYNCHRONOUS_MODES)}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {_setting('SQLITE_TRANSACTION_MODE', TRANSACTION_MODES)}")
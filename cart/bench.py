@@ -0,0 +1,95 @@
+"""
+Helpers shared by the benchmark management commands.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+
+def percentile(sorted_values, fraction):
+    """
+    Get the nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, seconds):
+    """
+    Summarise request latencies measured over a run.
+
+    Args:
+        latencies (list): Per-request latencies in seconds.
+        seconds (float): Wall-clock duration of the whole run.
+
+    Returns:
+        dict: Request count, throughput and latency percentiles in milliseconds.
+    """
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'seconds': round(seconds, 3),
+        'rps': round(len(ordered) / seconds, 1) if seconds else 0.0,
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 2) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+    }
+
+
+@contextmanager
+def throwaway_database(verbosity=0):
+    """
+    Run the enclosed block against freshly created test databases.
+
+    Benchmarks seed large synthetic datasets; creating the test databases the
+    way the test runner does keeps them away from the real data. The test
+    environment is set up too, so the test client's host is allowed, with
+    DEBUG off as in production.
+    """
+    setup_test_environment(debug=False)
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity)
+        teardown_test_environment()
+
+
+class QueryCounter:
+    """
+    Count the queries run on the default connection while the context is active.
+
+    Unlike ``CaptureQueriesContext`` this survives the ``reset_queries()`` done
+    at the start of each request, so it can wrap test client calls. Writes
+    (INSERT, UPDATE and DELETE statements) are also counted separately.
+    """
+    def __init__(self):
+        self.count = 0
+        self.writes = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            if sql.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+                self.writes += 1
+            self.seconds += time.perf_counter() - started
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
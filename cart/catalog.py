@@ -0,0 +1,195 @@
+"""
+Local cache of the external (fakestoreapi.com) product catalog.
+
+The upstream list is kept in memory and served according to two windows:
+
+- while the copy is younger than ``CATALOG_TTL`` it is returned as is;
+- while it is younger than ``CATALOG_TTL + CATALOG_STALE_TTL`` it is still
+  returned, and a single background refresh is started (stale-while-revalidate);
+- past that, the caller waits for a refresh.
+
+Only one upstream fetch runs at a time, so a burst of cold requests results in
+a single call. When the upstream fails, the last good copy keeps being served.
+"""
+import hashlib
+import json
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from cart import metrics
+from cart.upstream import get_client
+
+
+class CatalogUnavailable(Exception):
+    """
+    Raised when the upstream catalog cannot be fetched and no copy is cached.
+    """
+
+
+class CatalogCache:
+    """
+    An in-memory, single-flight cache of the upstream product list.
+
+    Args:
+        url (str): Upstream products URL.
+        ttl (float): Seconds a fetched copy is considered fresh.
+        stale_ttl (float): Extra seconds a copy may be served while it is refreshed.
+        client (UpstreamClient): Client used for fetches; defaults to the shared one.
+        clock (callable): Monotonic clock, replaceable in tests.
+    """
+    def __init__(self, url, ttl=300, stale_ttl=3600, client=None, clock=time.monotonic):
+        self.url = url
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.client = client
+        self.clock = clock
+        self._data = None
+        self._fetched_at = None
+        self._generation = 0
+        # Digest of the cached copy and the wall-clock time it first changed to it.
+        self._validators = None
+        self._refresh_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "errors": 0, "stale": 0}
+
+    def get(self):
+        """
+        Get the upstream product list.
+
+        Returns:
+            list: Upstream products, possibly served from cache.
+
+        Raises:
+            CatalogUnavailable: If nothing is cached and the upstream fetch fails.
+        """
+        data, age = self._current()
+        if data is not None and age < self.ttl:
+            self._count("hits")
+            return data
+        if data is not None and age < self.ttl + self.stale_ttl:
+            self._count("hits")
+            self._count("stale")
+            self._refresh_in_background()
+            return data
+        self._count("misses")
+        return self._refresh_blocking()
+
+    def validators(self):
+        """
+        Get validators of the product list ``get`` returns, for conditional requests.
+
+        Returns:
+            tuple: ``(digest, modified)``: a content digest of the list and the
+            Unix time at which the cached content last changed.
+
+        Raises:
+            CatalogUnavailable: If nothing is cached and the upstream fetch fails.
+        """
+        self.get()
+        return self._validators
+
+    def stats(self):
+        """
+        Get the hit, miss, refresh, error and stale-serve counters.
+        """
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def clear(self):
+        """
+        Drop the cached copy so the next call refetches.
+        """
+        self._data = None
+        self._fetched_at = None
+
+    def fetch(self):
+        """
+        Fetch the product list from the upstream.
+        """
+        return (self.client or get_client()).get_json(self.url)
+
+    def _current(self):
+        data, fetched_at = self._data, self._fetched_at
+        if data is None:
+            return None, None
+        return data, self.clock() - fetched_at
+
+    def _refresh_blocking(self):
+        generation = self._generation
+        with self._refresh_lock:
+            # Another caller refreshed while we were waiting: share its result.
+            if self._generation != generation and self._data is not None:
+                return self._data
+            return self._refresh(raise_on_error=True)
+
+    def _refresh_in_background(self):
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self._refresh(raise_on_error=False)
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _refresh(self, raise_on_error):
+        try:
+            data = self.fetch()
+        except (requests.RequestException, ValueError) as e:
+            self._count("errors")
+            if not raise_on_error:
+                return None
+            if self._data is not None:
+                # Serve the last good copy rather than failing the request.
+                self._count("stale")
+                return self._data
+            raise CatalogUnavailable(str(e)) from e
+        digest = hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        if self._validators is None or self._validators[0] != digest:
+            self._validators = (digest, time.time())
+        self._data, self._fetched_at = data, self.clock()
+        self._generation += 1
+        self._count("refreshes")
+        return data
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+        metrics.incr(f"catalog_cache_{name}")
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    Get the process-wide catalog cache configured from settings.
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = CatalogCache(
+                    url=settings.CATALOG_URL,
+                    ttl=settings.CATALOG_TTL,
+                    stale_ttl=settings.CATALOG_STALE_TTL,
+                )
+    return _catalog
+
+
+@receiver(setting_changed)
+def reset_catalog(setting=None, **kwargs):
+    """
+    Drop the process-wide catalog cache when a ``CATALOG_*`` setting changes.
+    """
+    global _catalog
+    if setting is None or setting.startswith("CATALOG_"):
+        _catalog = None
@@ -0,0 +1,167 @@
+"""
+Checkout: turning a cart into an order with its stock reserved.
+
+Stock is reserved for all the lines of a cart with one conditional UPDATE,
+``stock = stock - <quantity>`` for the rows where ``stock >= <quantity>``,
+instead of locking and checking each product in turn. The database applies
+each row's decrement atomically, so concurrent checkouts cannot take more
+units than a product has. When fewer rows are updated than the cart has
+lines, the transaction is rolled back and nothing is reserved.
+
+A reservation holds the stock until the order is confirmed or until it
+expires. ``release_expired`` then puts the stock back. Checkout also calls it
+when a product runs short, and ``manage.py release_reservations`` can run it
+on a schedule.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from .models import Cart, Order, OrderLine, Product
+
+
+class EmptyCart(Exception):
+    """
+    Raised when checking out a cart without items.
+    """
+
+
+class OutOfStock(Exception):
+    """
+    Raised when products of a cart do not have enough stock left.
+
+    Attributes:
+        product_ids (list): The products that are short.
+    """
+    def __init__(self, product_ids):
+        self.product_ids = product_ids
+        super().__init__(f"Not enough stock for products: {', '.join(map(str, product_ids))}")
+
+
+def _quantities(quantities):
+    # One CASE expression mapping each product id to its quantity.
+    return Case(*[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+                output_field=IntegerField())
+
+
+def _restock(quantities):
+    if quantities:
+        Product.objects.filter(pk__in=quantities).update(stock=F('stock') + _quantities(quantities))
+
+
+@transaction.atomic
+def _reserve(cart, reservation_seconds):
+    # A cart cannot be checked out twice at the same time.
+    cart.lock()
+    lines = list(cart.items.filter(product__isnull=False, quantity__gt=0)
+                 .values_list('product_id', 'quantity', 'product__price'))
+    if not lines:
+        raise EmptyCart("The cart is empty.")
+    quantities = {product_id: quantity for product_id, quantity, price in lines}
+    wanted = _quantities(quantities)
+    reserved = Product.objects.filter(pk__in=quantities, stock__gte=wanted).update(stock=F('stock') - wanted)
+    if reserved != len(quantities):
+        raise OutOfStock([])
+
+    order = Order.objects.create(
+        user_id=cart.user_id,
+        total=sum(quantity * price for product_id, quantity, price in lines),
+        expires_at=timezone.now() + timedelta(seconds=reservation_seconds),
+    )
+    OrderLine.objects.bulk_create([
+        OrderLine(order=order, product_id=product_id, quantity=quantity, unit_price=price)
+        for product_id, quantity, price in lines
+    ])
+    cart.items.all().delete()
+    Cart.objects.filter(pk=cart.pk).update(item_count=0, subtotal=0)
+    return order
+
+
+def _short_products(cart):
+    quantities = dict(cart.items.filter(product__isnull=False).values_list('product_id', 'quantity'))
+    return sorted(Product.objects.filter(pk__in=quantities, stock__lt=_quantities(quantities))
+                  .values_list('pk', flat=True))
+
+
+def checkout(cart, reservation_seconds=None):
+    """
+    Turn ``cart`` into an order, reserving stock for each of its lines.
+
+    The cart is emptied. If a product is short and some reservations have
+    expired, they are released and the checkout is tried once more.
+
+    Args:
+        cart (Cart): The cart to check out.
+        reservation_seconds (int): How long the stock is held; defaults to ``ORDER_RESERVATION_SECONDS``.
+
+    Returns:
+        Order: The new order, in the ``reserved`` state.
+
+    Raises:
+        EmptyCart: If the cart has no items.
+        OutOfStock: If a product does not have enough stock; nothing is reserved.
+    """
+    if reservation_seconds is None:
+        reservation_seconds = settings.ORDER_RESERVATION_SECONDS
+    try:
+        return _reserve(cart, reservation_seconds)
+    except OutOfStock:
+        if not release_expired():
+            raise OutOfStock(_short_products(cart))
+    try:
+        return _reserve(cart, reservation_seconds)
+    except OutOfStock:
+        raise OutOfStock(_short_products(cart))
+
+
+def confirm(order):
+    """
+    Confirm an order whose reservation has not expired.
+
+    Returns:
+        bool: Whether the order was confirmed.
+    """
+    confirmed = Order.objects.filter(
+        pk=order.pk, status=Order.Status.RESERVED, expires_at__gt=timezone.now(),
+    ).update(status=Order.Status.CONFIRMED)
+    if confirmed:
+        order.status = Order.Status.CONFIRMED
+    return bool(confirmed)
+
+
+def release_expired(now=None, batch_size=500):
+    """
+    Expire the reservations past their deadline and put their stock back.
+
+    Args:
+        now (datetime): Time to compare deadlines with; defaults to now.
+        batch_size (int): Orders released per transaction.
+
+    Returns:
+        int: Number of orders expired.
+    """
+    now = now or timezone.now()
+    expired = Order.objects.filter(status=Order.Status.RESERVED, expires_at__lte=now)
+    released = 0
+    # Checked before opening a transaction, which takes the write lock on SQLite.
+    while expired.exists():
+        with transaction.atomic():
+            # Concurrent callers skip the orders another one is releasing (where supported).
+            claim = expired
+            if connection.features.has_select_for_update_skip_locked:
+                claim = expired.select_for_update(skip_locked=True)
+            ids = list(claim.values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            Order.objects.filter(pk__in=ids).update(status=Order.Status.EXPIRED)
+            _restock(dict(
+                OrderLine.objects.filter(order_id__in=ids, product__isnull=False)
+                .values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+            ))
+        released += len(ids)
+        if len(ids) < batch_size:
+            break
+    return released
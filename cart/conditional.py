@@ -0,0 +1,101 @@
+"""
+Conditional GET (ETag / Last-Modified) for the product read endpoints.
+
+Responses are validated against ``CatalogVersion``, which the Product signal
+receivers bump on every change, and, for endpoints serving the external
+catalog, the digest of the cached upstream list. Checking a request therefore
+costs one primary key lookup: a client or proxy whose copy is current gets a
+304 before any product is loaded or serialized.
+"""
+import functools
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .catalog import CatalogUnavailable, get_catalog
+from .models import CatalogVersion
+
+
+def catalog_validators(upstream=True):
+    """
+    Get validators of the product data the read endpoints serve.
+
+    Args:
+        upstream (bool): Whether the endpoint also serves the external catalog;
+            ignored when ``CATALOG_SOURCE`` is ``database``.
+
+    Returns:
+        tuple: ``(token, last_modified)``: an opaque version token and the Unix
+        time of the last change.
+
+    Raises:
+        CatalogUnavailable: If the external catalog is needed and cannot be fetched.
+    """
+    version = CatalogVersion.current()
+    token, modified = str(version.version), version.updated_at.timestamp()
+    if upstream and settings.CATALOG_SOURCE != 'database':
+        digest, upstream_modified = get_catalog().validators()
+        token, modified = f'{token}:{digest}', max(modified, upstream_modified)
+    return token, modified
+
+
+def make_etag(request, token):
+    """
+    Build the strong ETag of a response to ``request`` over data at version ``token``.
+
+    The path, query string and negotiated media type are part of the tag, as
+    each of them changes the response body.
+    """
+    media_type = getattr(request, 'accepted_media_type', '') or ''
+    key = '\n'.join([token, request.get_full_path(), media_type])
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+
+def conditional_get(upstream=True):
+    """
+    Decorate the ``get`` method of a product read view with conditional GET handling.
+
+    Successful responses carry ``ETag``, ``Last-Modified`` and a public
+    ``Cache-Control``; a request whose validators match is answered with 304
+    without calling the view.
+
+    A view validated without the external catalog (``upstream=False``) can
+    still fall back to it: it marks such responses with ``from_upstream``,
+    and only they are validated against the external catalog too.
+
+    Args:
+        upstream (bool): Whether the view also serves the external catalog.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            try:
+                token, last_modified = catalog_validators(upstream)
+            except CatalogUnavailable:
+                return method(self, request, *args, **kwargs)
+            # Shared with cache_response, so the version is looked up once per request.
+            request.catalog_validators = (token, last_modified)
+            etag = make_etag(request, token)
+            response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                if not upstream and getattr(response, 'from_upstream', False):
+                    try:
+                        token, last_modified = catalog_validators(upstream=True)
+                    except CatalogUnavailable:
+                        return response
+                    etag = make_etag(request, token)
+                    response = get_conditional_response(
+                        request, etag=etag, last_modified=int(last_modified), response=response)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, public=True, max_age=settings.PRODUCT_CACHE_MAX_AGE,
+                                s_maxage=settings.PRODUCT_PROXY_MAX_AGE)
+            patch_vary_headers(response, ['Accept'])
+            return response
+        return wrapper
+    return decorator
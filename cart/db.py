@@ -0,0 +1,25 @@
+"""
+Health checks of persistent database connections.
+
+With ``CONN_MAX_AGE`` a connection outlives the request that opened it, and
+Django 4.0 only checks it again after an error was raised on it: a connection
+dropped by the server (restart, idle timeout) fails the next request. When
+``DB_HEALTH_CHECKS`` is on, kept connections are checked at the start of each
+request and closed if unusable, so the request opens a new one.
+"""
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.dispatch import receiver
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    if not settings.DB_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if (connection.connection is None or connection.in_atomic_block
+                or not connection.settings_dict['CONN_MAX_AGE']):
+            continue
+        if not connection.is_usable():
+            connection.close()
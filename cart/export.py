@@ -0,0 +1,81 @@
+"""
+Streaming export of the product catalog as JSONL or CSV.
+
+Rows are read with ``QuerySet.iterator(chunk_size)`` and encoded into blocks
+of roughly ``BLOCK_SIZE`` bytes, so memory use does not depend on the size of
+the catalog.
+"""
+import csv
+import io
+
+from .models import Product
+from .renderers import FastJSONRenderer
+from .serializers import ProductDetailSerializer, get_fast_serializer
+
+FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Bytes gathered before a block is sent.
+BLOCK_SIZE = 64 * 1024
+
+
+def export_queryset(updated_since=None):
+    """
+    Get the products to export, in primary key order.
+
+    Args:
+        updated_since (datetime): Only products changed at or after this time.
+    """
+    queryset = Product.objects.order_by('id')
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    return queryset
+
+
+def _rows(queryset, chunk_size):
+    serializer = get_fast_serializer(ProductDetailSerializer)
+    for row in serializer.values(queryset).iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(row)
+
+
+def iter_jsonl(queryset, chunk_size=2000):
+    """
+    Yield the products of ``queryset`` as blocks of JSON lines.
+    """
+    renderer = FastJSONRenderer()
+    block, size = [], 0
+    for item in _rows(queryset, chunk_size):
+        line = renderer.render(item) + b'\n'
+        block.append(line)
+        size += len(line)
+        if size >= BLOCK_SIZE:
+            yield b''.join(block)
+            block, size = [], 0
+    if block:
+        yield b''.join(block)
+
+
+def iter_csv(queryset, chunk_size=2000):
+    """
+    Yield the products of ``queryset`` as blocks of CSV, header first.
+    """
+    buffer = io.StringIO()
+    writer = None
+    for item in _rows(queryset, chunk_size):
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(item))
+            writer.writeheader()
+        writer.writerow(item)
+        if buffer.tell() >= BLOCK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if writer is None:
+        # An empty export still gets its header.
+        fieldnames = get_fast_serializer(ProductDetailSerializer).names
+        csv.DictWriter(buffer, fieldnames=fieldnames).writeheader()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
@@ -0,0 +1,109 @@
+"""
+factory-boy factories of the shopping models, for tests and benchmarks.
+
+The factories create a few rows at a time; ``seed`` builds a synthetic
+catalog, users and their carts at benchmark scale with bulk inserts. Output
+is reproducible for a given ``seed`` value.
+"""
+import functools
+from decimal import Decimal
+
+import factory
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from factory import fuzzy
+from factory.django import DjangoModelFactory
+
+from .models import Cart, CartItem, Product
+from .signals import products_bulk_saved
+
+CATEGORIES = ("electronics", "jewelery", "men's clothing", "women's clothing", "books", "garden")
+# Password of every generated user.
+PASSWORD = 'load-test-password'
+
+
+@functools.lru_cache(maxsize=None)
+def _password_hash():
+    # Hashing is deliberately slow: do it once for all users.
+    return make_password(PASSWORD)
+
+
+class ProductFactory(DjangoModelFactory):
+    class Meta:
+        model = Product
+
+    id = factory.Sequence(lambda n: n + 1)
+    name = factory.Faker('catch_phrase')
+    title = factory.LazyAttribute(lambda product: product.name)
+    price = fuzzy.FuzzyDecimal(1, 500)
+    category = fuzzy.FuzzyChoice(CATEGORIES)
+    description = factory.Faker('paragraph', nb_sentences=4)
+    image = factory.Sequence(lambda n: f'https://example.com/img/{n + 1}.jpg')
+
+
+class UserFactory(DjangoModelFactory):
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f'shopper{n}')
+    email = factory.LazyAttribute(lambda user: f'{user.username}@example.com')
+    first_name = factory.Faker('first_name')
+    last_name = factory.Faker('last_name')
+    password = factory.LazyFunction(_password_hash)
+
+
+class CartFactory(DjangoModelFactory):
+    class Meta:
+        model = Cart
+
+    user = factory.SubFactory(UserFactory)
+
+
+class CartItemFactory(DjangoModelFactory):
+    class Meta:
+        model = CartItem
+
+    cart = factory.SubFactory(CartFactory)
+    product = factory.SubFactory(ProductFactory)
+    quantity = fuzzy.FuzzyInteger(1, 5)
+    unit_price = factory.SelfAttribute('product.price')
+
+
+def seed(products=1000, users=50, items_per_cart=5, first_product_id=1, seed=0, batch_size=500):
+    """
+    Insert a synthetic catalog and users with filled carts.
+
+    Args:
+        products (int): Number of products.
+        users (int): Number of users; each gets one cart.
+        items_per_cart (int): Distinct products in each cart.
+        first_product_id (int): Primary key of the first product.
+        seed (int): Seed of the random values.
+        batch_size (int): Rows per INSERT.
+
+    Returns:
+        dict: ``products`` (ids) and ``users`` (User objects, password ``PASSWORD``).
+    """
+    factory.random.reseed_random(seed)
+    ProductFactory.reset_sequence(first_product_id - 1)
+    UserFactory.reset_sequence(0)
+    catalog = ProductFactory.build_batch(products)
+    Product.objects.bulk_create(catalog, batch_size=batch_size)
+    product_ids = [product.id for product in catalog]
+    if product_ids:
+        products_bulk_saved.send(sender=Product, ids=product_ids)
+
+    people = User.objects.bulk_create(UserFactory.build_batch(users), batch_size=batch_size)
+    carts = Cart.objects.bulk_create([Cart(user=user) for user in people], batch_size=batch_size)
+    prices = {product.id: Decimal(product.price) for product in catalog}
+    rng = factory.random.randgen
+    items = []
+    for cart in carts:
+        for product_id in rng.sample(product_ids, min(items_per_cart, len(product_ids))):
+            quantity = rng.randint(1, 5)
+            items.append(CartItem(cart=cart, product_id=product_id, quantity=quantity, unit_price=prices[product_id]))
+            cart.item_count += quantity
+            cart.subtotal += quantity * prices[product_id]
+    CartItem.objects.bulk_create(items, batch_size=batch_size)
+    Cart.objects.bulk_update(carts, ['item_count', 'subtotal'], batch_size=batch_size)
+    return {'products': product_ids, 'users': people}
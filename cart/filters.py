@@ -0,0 +1,66 @@
+"""
+Product filters shared by the product listing endpoints.
+
+Supported query parameters:
+    category: Exact category name.
+    min_price / max_price: Inclusive price bounds.
+
+Database listings turn them into indexed WHERE clauses; upstream products
+(plain dicts) are filtered in Python with the same semantics.
+"""
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+
+def _price(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: 'A valid number is required.'})
+    if not price.is_finite():
+        raise ValidationError({name: 'A valid number is required.'})
+    return price
+
+
+def get_filters(params):
+    """
+    Parse the product filters from query parameters.
+
+    Returns:
+        dict: ``category``, ``min_price`` and ``max_price``, each possibly None.
+    """
+    return {
+        'category': params.get('category') or None,
+        'min_price': _price(params, 'min_price'),
+        'max_price': _price(params, 'max_price'),
+    }
+
+
+def filter_queryset(queryset, filters):
+    """
+    Apply parsed filters to a Product queryset.
+    """
+    if filters['category'] is not None:
+        queryset = queryset.filter(category=filters['category'])
+    if filters['min_price'] is not None:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if filters['max_price'] is not None:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    return queryset
+
+
+def filter_items(items, filters):
+    """
+    Apply parsed filters to upstream product dicts.
+    """
+    if filters['category'] is not None:
+        items = [item for item in items if item.get('category') == filters['category']]
+    if filters['min_price'] is not None:
+        items = [item for item in items if Decimal(str(item['price'])) >= filters['min_price']]
+    if filters['max_price'] is not None:
+        items = [item for item in items if Decimal(str(item['price'])) <= filters['max_price']]
+    return items
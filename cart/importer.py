@@ -0,0 +1,266 @@
+"""
+Bulk synchronisation of external catalog records into the Product table.
+
+Records are read incrementally from a JSON array or a JSONL stream, normalised
+to Product fields and upserted in batches keyed on ``id``. A row is only
+written when the hash of its content differs from what is stored.
+
+``sync_products`` trusts its input (the upstream catalog); ``ingest_products``
+validates client-supplied rows and reports the rejected ones instead.
+"""
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from rest_framework.exceptions import ValidationError
+
+from .models import Product
+from .serializers import ProductIngestSerializer
+from .signals import products_bulk_saved
+
+PRODUCT_FIELDS = ('name', 'title', 'price', 'category', 'description', 'image')
+
+_decoder = json.JSONDecoder()
+
+
+def iter_records(stream, chunk_size=64 * 1024):
+    """
+    Yield JSON objects from a text stream holding a JSON array or JSONL.
+
+    The stream is read ``chunk_size`` characters at a time, so arbitrarily large
+    inputs are parsed with bounded memory.
+
+    Args:
+        stream: File-like object with a ``read(size)`` method returning ``str``.
+        chunk_size (int): Number of characters read per call.
+
+    Yields:
+        dict: One decoded record at a time.
+    """
+    buffer = ''
+    pos = 0
+    in_array = None
+    exhausted = False
+    while True:
+        # Skip whitespace and, inside an array, element separators.
+        while pos < len(buffer) and (buffer[pos].isspace() or (in_array and buffer[pos] == ',')):
+            pos += 1
+        if pos < len(buffer):
+            if in_array is None:
+                in_array = buffer[pos] == '['
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and buffer[pos] == ']':
+                return
+            try:
+                record, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            else:
+                # A number at the very end of the buffer may still be incomplete.
+                if end < len(buffer) or exhausted:
+                    yield record
+                    pos = end
+                    continue
+        elif exhausted:
+            if in_array:
+                raise ValueError('Unterminated JSON array')
+            return
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            exhausted = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+
+def normalize(record):
+    """
+    Map an upstream record onto Product field values.
+
+    Args:
+        record (dict): A product as returned by fakestoreapi.com or a local file.
+
+    Returns:
+        dict: Product field values, including ``id``.
+    """
+    title = str(record.get('title') or 'none')
+    return {
+        'id': int(record['id']),
+        'name': str(record.get('name') or title)[:255],
+        'title': title[:255],
+        'price': Decimal(str(record['price'])).quantize(Decimal('0.01')),
+        'category': str(record.get('category') or 'Uncategorized')[:255],
+        'description': str(record.get('description') or ''),
+        'image': str(record.get('image') or ''),
+    }
+
+
+def content_hash(values):
+    """
+    Hash the content fields of a product.
+    """
+    payload = json.dumps([str(values[field]) for field in PRODUCT_FIELDS])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+@dataclass
+class SyncResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    # Details of the first rejected rows, see ``ingest_products``.
+    errors: list = field(default_factory=list)
+
+    @property
+    def rows(self):
+        return self.created + self.updated + self.unchanged
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def sync_batch(batch, result):
+    """
+    Upsert one batch of normalised product values.
+
+    Args:
+        batch (list): Normalised values as returned by ``normalize``.
+        result (SyncResult): Counters updated in place.
+
+    Returns:
+        list: Ids of the rows that were created or updated.
+    """
+    # Last occurrence wins when an id is repeated within the batch.
+    by_id = {values['id']: values for values in batch}
+    existing = Product.objects.in_bulk(list(by_id))
+    to_create, to_update = [], []
+    old_categories = set()
+    now = timezone.now()
+    for product_id, values in by_id.items():
+        product = existing.get(product_id)
+        if product is None:
+            to_create.append(Product(**values))
+        elif content_hash(values) != content_hash(product.__dict__):
+            old_categories.add(product.category)
+            for field in PRODUCT_FIELDS:
+                setattr(product, field, values[field])
+            # bulk_update() does not apply auto_now.
+            product.updated_at = now
+            to_update.append(product)
+        else:
+            result.unchanged += 1
+    with transaction.atomic():
+        Product.objects.bulk_create(to_create, batch_size=len(to_create) or None)
+        Product.objects.bulk_update(to_update, [*PRODUCT_FIELDS, 'updated_at'], batch_size=len(to_update) or None)
+    result.created += len(to_create)
+    result.updated += len(to_update)
+    changed = [product.id for product in to_create + to_update]
+    if changed:
+        products_bulk_saved.send(sender=Product, ids=changed, categories=old_categories)
+    return changed
+
+
+def sync_products(records, batch_size=500):
+    """
+    Upsert catalog records into the Product table.
+
+    Args:
+        records (iterable): Raw records, e.g. from ``iter_records``.
+        batch_size (int): Number of records written per transaction.
+
+    Returns:
+        SyncResult: Counts of created, updated and unchanged rows.
+    """
+    result = SyncResult()
+    started = time.perf_counter()
+    batch = []
+    for record in records:
+        batch.append(normalize(record))
+        if len(batch) >= batch_size:
+            sync_batch(batch, result)
+            batch = []
+    if batch:
+        sync_batch(batch, result)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def validate_record(serializer, record):
+    """
+    Validate one client-supplied record into Product field values.
+
+    Fields left out get their model default.
+
+    Raises:
+        ValidationError: If the record is not a valid product.
+    """
+    if not isinstance(record, dict):
+        raise ValidationError({'non_field_errors': ['Expected a JSON object.']})
+    values = serializer.run_validation(record)
+    for name in PRODUCT_FIELDS:
+        if name not in values:
+            values[name] = Product._meta.get_field(name).get_default()
+    return values
+
+
+def ingest_products(records, batch_size=500, max_errors=100, result=None):
+    """
+    Validate and upsert client-supplied records into the Product table.
+
+    Records are validated one batch at a time and the valid ones of each
+    batch are written in one transaction; invalid records are counted and
+    skipped without aborting the batch.
+
+    Args:
+        records (iterable): Raw records, e.g. from ``iter_records``.
+        batch_size (int): Number of records validated and written per transaction.
+        max_errors (int): Number of rejected records listed in ``errors``.
+        result (SyncResult): Counters updated in place, so callers still get
+            them when reading the input fails.
+
+    Returns:
+        SyncResult: Counts of created, updated, unchanged and rejected rows;
+        ``errors`` holds ``{"index", "id", "errors"}`` for the first rejected ones.
+
+    Raises:
+        ValueError: If the input is not valid JSON; the records before the
+            error are written.
+    """
+    if result is None:
+        result = SyncResult()
+    started = time.perf_counter()
+    serializer = ProductIngestSerializer()
+    batch = []
+    try:
+        for index, record in enumerate(records):
+            try:
+                batch.append(validate_record(serializer, record))
+            except ValidationError as e:
+                result.rejected += 1
+                if len(result.errors) < max_errors:
+                    product_id = record.get('id') if isinstance(record, dict) else None
+                    result.errors.append({'index': index, 'id': product_id, 'errors': e.detail})
+            if len(batch) >= batch_size:
+                batch, pending = [], batch
+                sync_batch(pending, result)
+    except ValueError:
+        # Keep the rows read before the malformed input.
+        if batch:
+            sync_batch(batch, result)
+        raise
+    else:
+        if batch:
+            sync_batch(batch, result)
+    finally:
+        result.seconds = time.perf_counter() - started
+    return result
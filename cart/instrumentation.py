@@ -0,0 +1,107 @@
+"""
+Per-request timing of database, upstream and serialization work.
+
+``PerformanceMiddleware`` opens a ``RequestTimings`` for each request in a
+context variable; code doing measurable work wraps it in ``timer(kind)``,
+which adds the elapsed time to the current request, if any. Background
+threads (e.g. the catalog refresher) run outside a request and are not
+counted. Database queries are counted by an execute wrapper installed on
+every connection when it opens, so the middleware does not touch the
+connections itself (async requests run their queries in other threads).
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+class RequestTimings:
+    """
+    Work done while serving one request. Times are in seconds.
+    """
+    __slots__ = ('db_queries', 'db_seconds', 'upstream_calls', 'upstream_seconds', 'serialize_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+def start_request():
+    """
+    Start recording work for the current request.
+
+    Returns:
+        tuple: The new ``RequestTimings`` and the token to pass to ``end_request``.
+    """
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    """
+    Stop recording work for the request started with ``token``.
+    """
+    _current.reset(token)
+
+
+def current():
+    """
+    Get the ``RequestTimings`` of the request being served, or None.
+    """
+    return _current.get()
+
+
+@contextmanager
+def timer(kind):
+    """
+    Add the time spent in the enclosed block to the current request.
+
+    Args:
+        kind (str): ``upstream`` or ``serialize``. Queries run inside a
+            ``serialize`` block (e.g. a lazy queryset) count as database time only.
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    db_before = timings.db_seconds
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if kind == 'upstream':
+            timings.upstream_calls += 1
+            timings.upstream_seconds += elapsed
+        else:
+            timings.serialize_seconds += elapsed - (timings.db_seconds - db_before)
+
+
+def query_timer(execute, sql, params, many, context):
+    """
+    Execute wrapper recording queries into the current request.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Reconnecting sends connection_created again for the same wrapper.
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, query_timer)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cart.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Add units to (or, with a negative delta, take units off) the stock of a product. "
+        "The change is applied in the database, so it does not overwrite concurrent reservations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('product', type=int, help="Product id.")
+        parser.add_argument('delta', type=int, help="Units to add; negative to take units off.")
+
+    def handle(self, *args, **options):
+        if not Product.adjust_stock(options['product'], options['delta']):
+            raise CommandError(f"Product {options['product']} does not exist or has too little stock.")
+        stock = Product.objects.values_list('stock', flat=True).get(pk=options['product'])
+        self.stdout.write(self.style.SUCCESS(f"Product {options['product']} now has {stock} units in stock."))
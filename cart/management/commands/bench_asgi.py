@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from cart.bench import summarize
+from cart.stub_upstream import StubUpstream
+
+# (WSGI path, ASGI path) pairs: the sync DRF views and their async counterparts.
+ENDPOINTS = {
+    'list': ('/productapi/', '/async/productapi/'),
+    'detail': ('/products/{missing}/', '/async/products/{missing}/'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second and latency of the sync (WSGI) and async (ASGI) "
+        "product endpoints at high concurrency, with the upstream replaced by a local stub."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Requests per run.")
+        parser.add_argument('--concurrency', type=int, default=100, help="Concurrent in-flight requests.")
+        parser.add_argument('--latency', type=float, default=0.05, help="Stub upstream latency in seconds.")
+        parser.add_argument('--endpoint', choices=sorted(ENDPOINTS), action='append',
+                            help="Endpoint to benchmark (repeatable, default: all).")
+
+    def handle(self, *args, **options):
+        results = []
+        with StubUpstream(latency=options['latency']) as stub:
+            # A zero TTL makes every list request go through the catalog cache's
+            # single-flight refresh instead of a warm in-memory copy.
+            with override_settings(CATALOG_URL=stub.url, CATALOG_TTL=0, CATALOG_STALE_TTL=0,
+                                   CATALOG_SOURCE='upstream', UPSTREAM_POOL_SIZE=options['concurrency']):
+                for name in options['endpoint'] or sorted(ENDPOINTS):
+                    wsgi_path, asgi_path = (
+                        path.format(missing=len(stub.products)) for path in ENDPOINTS[name])
+                    for interface, path, run in (('wsgi', wsgi_path, self.run_wsgi),
+                                                 ('asgi', asgi_path, self.run_asgi)):
+                        latencies, seconds, statuses = run(path, options['requests'], options['concurrency'])
+                        results.append({
+                            'endpoint': name, 'interface': interface, 'path': path,
+                            'concurrency': options['concurrency'], 'upstream_latency': options['latency'],
+                            'statuses': statuses, **summarize(latencies, seconds),
+                        })
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run_wsgi(self, path, total, concurrency):
+        application = get_wsgi_application()
+
+        def call():
+            environ = {'PATH_INFO': path, 'HTTP_HOST': 'localhost', 'wsgi.input': BytesIO()}
+            setup_testing_defaults(environ)
+            status = []
+            started = time.perf_counter()
+            body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+            b''.join(body)
+            return time.perf_counter() - started, int(status[0].split()[0])
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            started = time.perf_counter()
+            outcomes = list(pool.map(lambda _: call(), range(total)))
+            seconds = time.perf_counter() - started
+        return self.collect(outcomes, seconds)
+
+    def run_asgi(self, path, total, concurrency):
+        application = get_asgi_application()
+
+        async def call():
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': b'', 'root_path': '', 'headers': [(b'host', b'localhost')],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            return time.perf_counter() - started, messages[0]['status']
+
+        async def main():
+            # Give the ASGI side as many worker threads as the WSGI side.
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def bounded():
+                async with semaphore:
+                    return await call()
+
+            started = time.perf_counter()
+            outcomes = await asyncio.gather(*(bounded() for _ in range(total)))
+            return outcomes, time.perf_counter() - started
+
+        outcomes, seconds = asyncio.run(main())
+        return self.collect(outcomes, seconds)
+
+    def collect(self, outcomes, seconds):
+        statuses = {}
+        for _, status in outcomes:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return [latency for latency, _ in outcomes], seconds, statuses
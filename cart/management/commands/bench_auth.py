@@ -0,0 +1,59 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from cart.bench import QueryCounter, summarize, throwaway_database
+from cart.factories import PASSWORD, seed
+
+# Name -> (method, path, JSON body) of the measured cart calls.
+CALLS = {
+    'cart': ('get', '/cart/', None),
+    'cart-add': ('post', '/cart/', {'product': 1, 'quantity': 1}),
+    'cart-batch': ('post', '/cart/batch/', [{'product': 2, 'quantity': 1, 'op': 'add'}]),
+    'cart-clear': ('post', '/cart/clear/', None),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare queries per request and latency of the cart endpoints with session "
+        "authentication and with bearer tokens from /token/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help="Requests per endpoint and mode.")
+
+    def handle(self, *args, **options):
+        results = []
+        with throwaway_database():
+            user = seed(products=50, users=1, items_per_cart=5)['users'][0]
+            session = Client()
+            session.force_login(user)
+            token = Client()
+            tokens = token.post('/token/', {'username': user.username, 'password': PASSWORD},
+                                content_type='application/json').json()
+            token.defaults['HTTP_AUTHORIZATION'] = f"Bearer {tokens['access']}"
+            for name, (method, path, body) in CALLS.items():
+                for mode, client in (('session', session), ('token', token)):
+                    results.append({'call': name, 'auth': mode, **self.measure(client, method, path, body, options)})
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measure(self, client, method, path, body, options):
+        extra = {} if body is None else {'data': json.dumps(body), 'content_type': 'application/json'}
+        latencies, statuses = [], set()
+        with QueryCounter() as queries:
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                request_started = time.perf_counter()
+                response = getattr(client, method)(path, **extra)
+                latencies.append(time.perf_counter() - request_started)
+                statuses.add(response.status_code)
+            seconds = time.perf_counter() - started
+        return {
+            'statuses': sorted(statuses),
+            **summarize(latencies, seconds),
+            'queries_per_request': round(queries.count / options['requests'], 2),
+            'writes_per_request': round(queries.writes / options['requests'], 2),
+        }
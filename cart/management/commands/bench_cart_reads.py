@@ -0,0 +1,68 @@
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.management.base import BaseCommand
+from django.test import Client, RequestFactory
+
+from cart.bench import QueryCounter, throwaway_database
+from cart.models import Cart, CartItem, Product
+from cart.service import Cart as SessionCart
+
+
+class Command(BaseCommand):
+    help = (
+        "Time reading carts of various sizes through the session cart (cart.service.Cart) "
+        "and the database cart endpoint (GET /cart/), with their query counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 100, 1000], help="Cart sizes to measure.")
+        parser.add_argument('--repeat', type=int, default=20, help="Reads per size; the median is reported.")
+
+    def handle(self, *args, **options):
+        results = []
+        with throwaway_database():
+            largest = max(options['lines'])
+            Product.objects.bulk_create([
+                Product(id=i, title=f"Product {i}", price=Decimal('9.99'), description="Synthetic product",
+                        image=f"https://example.com/{i}.jpg")
+                for i in range(1, largest + 1)
+            ])
+            for lines in options['lines']:
+                results.append(self.measure('session', lines, options['repeat'], self.session_reader(lines)))
+                results.append(self.measure('database', lines, options['repeat'], self.database_reader(lines)))
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measure(self, backend, lines, repeat, read):
+        read()
+        timings = []
+        for _ in range(repeat):
+            with QueryCounter() as queries:
+                started = time.perf_counter()
+                read()
+                timings.append(time.perf_counter() - started)
+        return {
+            'cart': backend, 'lines': lines, 'queries': queries.count,
+            'median_ms': round(statistics.median(timings) * 1000, 3),
+            'lines_per_second': round(lines / statistics.median(timings)),
+        }
+
+    def session_reader(self, lines):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        cart = SessionCart(request)
+        for i in range(1, lines + 1):
+            cart.add({'id': i, 'price': '9.99'}, quantity=2)
+        return lambda: list(cart)
+
+    def database_reader(self, lines):
+        user = User.objects.create_user(f'bench-{lines}')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product_id=i, quantity=2, unit_price='9.99') for i in range(1, lines + 1)])
+        client = Client()
+        client.force_login(user)
+        return lambda: client.get('/cart/')
@@ -0,0 +1,75 @@
+import json
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from cart.bench import QueryCounter, summarize, throwaway_database
+from cart.middleware import CartStorageMiddleware
+from cart.models import Product
+from cart.service import Cart as SessionCart
+
+# Label, CART_STORAGE and SESSION_ENGINE of each measured configuration.
+BACKENDS = [
+    ('session', 'cart.storage.SessionCartStorage', 'django.contrib.sessions.backends.db'),
+    ('cached-session', 'cart.storage.SessionCartStorage', 'django.contrib.sessions.backends.cached_db'),
+    ('signed-cookie', 'cart.storage.SignedCookieCartStorage', 'django.contrib.sessions.backends.db'),
+]
+
+
+def add_to_cart(request):
+    cart = SessionCart(request)
+    product_id = int(request.GET['product'])
+    cart.add({'id': product_id, 'price': '9.99'})
+    return HttpResponse(str(len(cart)))
+
+
+class Command(BaseCommand):
+    help = (
+        "Time anonymous add-to-cart requests through the session, signed-cookie and cart "
+        "storage middleware with each guest cart storage backend, and count the database "
+        "writes they cause."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Requests per backend.")
+        parser.add_argument('--products', type=int, default=20, help="Distinct products added.")
+
+    def handle(self, *args, **options):
+        results = []
+        with throwaway_database():
+            Product.objects.bulk_create([
+                Product(id=i, title=f"Product {i}", price=Decimal('9.99'), description="Synthetic product",
+                        image=f"https://example.com/{i}.jpg")
+                for i in range(1, options['products'] + 1)
+            ])
+            for label, storage, engine in BACKENDS:
+                with override_settings(CART_STORAGE=storage, SESSION_ENGINE=engine):
+                    results.append({'backend': label, **self.measure(options)})
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def measure(self, options):
+        user = AnonymousUser()
+        handler = SessionMiddleware(CartStorageMiddleware(add_to_cart))
+        factory = RequestFactory()
+        latencies = []
+        with QueryCounter() as queries:
+            started = time.perf_counter()
+            for i in range(options['requests']):
+                request = factory.get('/', {'product': i % options['products'] + 1})
+                request.user = user
+                request_started = time.perf_counter()
+                response = handler(request)
+                latencies.append(time.perf_counter() - request_started)
+                factory.cookies.update(response.cookies)
+            seconds = time.perf_counter() - started
+        return {
+            **summarize(latencies, seconds),
+            'queries_per_request': round(queries.count / options['requests'], 2),
+            'writes_per_request': round(queries.writes / options['requests'], 2),
+            'cookie_bytes': sum(len(morsel.OutputString()) for morsel in factory.cookies.values()),
+        }
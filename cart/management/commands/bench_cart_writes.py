@@ -0,0 +1,134 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from cart.bench import summarize, throwaway_database
+from cart.models import Cart, Product
+
+# Environment of each database profile; PROFILES['postgres'] also uses the
+# DB_NAME / DB_USER / DB_PASSWORD / DB_HOST / DB_PORT of the caller.
+PROFILES = {
+    # The settings before database profiles existed.
+    'sqlite-default': {
+        'DB_ENGINE': 'sqlite', 'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_BUSY_TIMEOUT': '5', 'SQLITE_TRANSACTION_MODE': 'DEFERRED',
+    },
+    'sqlite-wal': {
+        'DB_ENGINE': 'sqlite', 'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL',
+        'SQLITE_BUSY_TIMEOUT': '20', 'SQLITE_TRANSACTION_MODE': 'IMMEDIATE',
+    },
+    'postgres': {'DB_ENGINE': 'postgres'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Add items to carts from concurrent threads, each with its own database connection, "
+        "and report latency, throughput and 'database is locked' failures. With --profile, "
+        "each named database profile is measured in its own process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help="Concurrent writers.")
+        parser.add_argument('--writes', type=int, default=100, help="Cart writes per thread.")
+        parser.add_argument('--products', type=int, default=50, help="Distinct products added.")
+        parser.add_argument('--profile', action='append', choices=sorted(PROFILES),
+                            help="Database profile to compare; repeat to compare several.")
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['writes'] < 1:
+            raise CommandError("--threads and --writes must be positive.")
+        if options['profile']:
+            results = [self.run_profile(name, options) for name in options['profile']]
+        else:
+            results = self.measure(options)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run_profile(self, name, options):
+        command = [
+            sys.executable, '-m', 'django', 'bench_cart_writes',
+            '--threads', str(options['threads']), '--writes', str(options['writes']),
+            '--products', str(options['products']),
+        ]
+        env = {**os.environ, **PROFILES[name], 'DJANGO_SETTINGS_MODULE': os.environ['DJANGO_SETTINGS_MODULE']}
+        process = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if process.returncode:
+            # E.g. no PostgreSQL server or driver here: report it and carry on.
+            lines = process.stderr.strip().splitlines() or ['exit status %d' % process.returncode]
+            return {'profile': name, 'error': lines[-1]}
+        return {'profile': name, **json.loads(process.stdout)}
+
+    def measure(self, options):
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                # Threads share the database only if it is a file.
+                connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'bench.sqlite3')
+            with throwaway_database():
+                Product.objects.bulk_create([
+                    Product(id=i, title=f"Product {i}", price=Decimal('9.99'), description="Synthetic product",
+                            image=f"https://example.com/{i}.jpg")
+                    for i in range(1, options['products'] + 1)
+                ])
+                carts = [Cart.objects.create(user=User.objects.create_user(f'writer-{i}'))
+                         for i in range(options['threads'])]
+                connection.close()
+                result = self.run_writers(carts, options)
+        return result
+
+    def run_writers(self, carts, options):
+        latencies, errors = [], []
+        lock = threading.Lock()
+        start = threading.Barrier(len(carts) + 1)
+
+        def writer(cart):
+            rng = random.Random(cart.pk)
+            mine, failed = [], 0
+            start.wait()
+            try:
+                for _ in range(options['writes']):
+                    operation = {'product': rng.randint(1, options['products']), 'quantity': 1, 'op': 'add'}
+                    began = time.perf_counter()
+                    try:
+                        cart.apply_operations([operation])
+                    except OperationalError:
+                        failed += 1
+                    mine.append(time.perf_counter() - began)
+            finally:
+                connection.close()
+                with lock:
+                    latencies.extend(mine)
+                    errors.append(failed)
+
+        threads = [threading.Thread(target=writer, args=(cart,)) for cart in carts]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - started
+        failed = sum(errors)
+        with connection.cursor() as cursor:
+            journal_mode = None
+            if connection.vendor == 'sqlite':
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+        return {
+            'vendor': connection.vendor,
+            'journal_mode': journal_mode,
+            'threads': len(carts),
+            **summarize(latencies, seconds),
+            'failed': failed,
+            'committed_per_second': round((len(latencies) - failed) / seconds, 1) if seconds else 0.0,
+        }
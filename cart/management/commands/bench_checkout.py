@@ -0,0 +1,105 @@
+import itertools
+import json
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client
+from django.test.utils import override_settings
+
+from cart.bench import summarize, throwaway_database
+from cart.factories import seed
+from cart.models import OrderLine, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress the checkout with concurrent shoppers competing for scarce stock in a seeded "
+        "throwaway database, and print checkouts per second, latency and a check that no "
+        "product was oversold as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=400, help="Shoppers, each checking out one cart.")
+        parser.add_argument('--products', type=int, default=20, help="Products the carts are filled from.")
+        parser.add_argument('--items', type=int, default=3, help="Distinct products in each cart.")
+        parser.add_argument('--stock', type=int, default=100, help="Initial stock of each product.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic carts.")
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['products'], options['items'], options['concurrency']) < 1:
+            raise CommandError("--users, --products, --items and --concurrency must be positive.")
+        with throwaway_database():
+            users = seed(products=options['products'], users=options['users'],
+                         items_per_cart=options['items'], seed=options['seed'])['users']
+            Product.objects.update(stock=options['stock'])
+            clients = []
+            for user in users:
+                client = Client(raise_request_exception=False)
+                client.force_login(user)
+                clients.append(client)
+            connection.close()
+            report = {name: options[name] for name in ('users', 'products', 'items', 'stock', 'concurrency')}
+            report['database'] = connection.vendor
+            with override_settings(SLOW_REQUEST_SECONDS=0):
+                report.update(self.run(clients, options['concurrency']))
+            report['check'] = self.check_stock(options['stock'])
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, clients, concurrency):
+        next_client = itertools.count()
+        lock = threading.Lock()
+        latencies, statuses = [], {}
+        start = threading.Barrier(concurrency + 1)
+
+        def shopper():
+            mine, codes = [], []
+            try:
+                start.wait()
+                while True:
+                    with lock:
+                        index = next(next_client)
+                    if index >= len(clients):
+                        break
+                    began = time.perf_counter()
+                    response = clients[index].post('/checkout/')
+                    mine.append(time.perf_counter() - began)
+                    codes.append(response.status_code)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(mine)
+                for code in codes:
+                    statuses[str(code)] = statuses.get(str(code), 0) + 1
+
+        threads = [threading.Thread(target=shopper) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - started
+        return {
+            'statuses': statuses,
+            'checkouts_per_second': round(statuses.get('201', 0) / seconds, 1) if seconds else 0.0,
+            **summarize(latencies, seconds),
+        }
+
+    def check_stock(self, initial_stock):
+        """
+        Compare the stock left with the quantities reserved by orders.
+        """
+        reserved = dict(OrderLine.objects.values('product_id').annotate(total=Sum('quantity'))
+                        .values_list('product_id', 'total'))
+        stock = dict(Product.objects.values_list('id', 'stock'))
+        mismatched = sorted(pk for pk, left in stock.items() if left + reserved.get(pk, 0) != initial_stock)
+        return {
+            'units_reserved': sum(reserved.values()),
+            'products_sold_out': sum(1 for left in stock.values() if left == 0),
+            'oversold': any(total > initial_stock for total in reserved.values()),
+            'stock_mismatches': mismatched,
+        }
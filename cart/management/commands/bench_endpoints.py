@@ -0,0 +1,168 @@
+import itertools
+import json
+import random
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from cart.bench import QueryCounter, summarize, throwaway_database
+from cart.factories import CATEGORIES, seed
+from cart.stub_upstream import StubUpstream, make_products
+
+
+def _json(body):
+    return {'data': json.dumps(body), 'content_type': 'application/json'}
+
+
+# Name -> (method, needs a logged-in user, request builder). A builder gets the
+# seeded data, a random generator and the request number, and returns the path
+# and the extra arguments of the test client call.
+SCENARIOS = {
+    'home': ('GET', False, lambda data, rng, n: ('/', {})),
+    'products': ('GET', False, lambda data, rng, n: (f'/products/?category={rng.choice(CATEGORIES)}', {})),
+    'product-detail': ('GET', False, lambda data, rng, n: (f"/products/{rng.choice(data['products'])}/", {})),
+    'product-search': ('GET', False, lambda data, rng, n: (f"/products/search/?q={rng.choice(['pro', 'sys', 'net'])}", {})),
+    'product-facets': ('GET', False, lambda data, rng, n: ('/products/facets/', {})),
+    'product-export': ('GET', False, lambda data, rng, n: ('/products/export/?format=csv', {})),
+    'productapi': ('GET', False, lambda data, rng, n: ('/productapi/', {})),
+    'product-detail-upstream': ('GET', False, lambda data, rng, n: (f"/products/{rng.choice(data['upstream'])}/", {})),
+    'cart': ('GET', True, lambda data, rng, n: ('/cart/', {})),
+    'cart-add': ('POST', True, lambda data, rng, n: (
+        '/cart/', _json({'product': rng.choice(data['products']), 'quantity': 1}))),
+    'cart-batch': ('POST', True, lambda data, rng, n: ('/cart/batch/', _json([
+        {'product': product, 'quantity': rng.randint(1, 3), 'op': 'add'}
+        for product in rng.sample(data['products'], 3)]))),
+    'register': ('POST', False, lambda data, rng, n: ('/register/', _json({
+        'username': f'load-{n}', 'email': f'load-{n}@example.com', 'password': 'load-test-password',
+        'first_name': 'Load', 'last_name': 'Test'}))),
+    'metrics': ('GET', False, lambda data, rng, n: ('/metrics/', {})),
+}
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the API endpoints with concurrent clients against a seeded throwaway database, "
+        "with the upstream catalog replaced by a local stub, and print throughput, latency "
+        "percentiles and queries per request as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000, help="Products in the database.")
+        parser.add_argument('--upstream-products', type=int, default=100, help="Products served by the stub upstream.")
+        parser.add_argument('--users', type=int, default=50, help="Users, each with a cart.")
+        parser.add_argument('--items', type=int, default=5, help="Distinct products in each cart.")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients.")
+        parser.add_argument('--latency', type=float, default=0.05, help="Stub upstream latency in seconds.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data and requests.")
+        parser.add_argument('--endpoint', choices=sorted(SCENARIOS), action='append',
+                            help="Endpoint to load (repeatable, default: all).")
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        if min(options['requests'], options['concurrency'], options['products'], options['users']) < 1:
+            raise CommandError("--requests, --concurrency, --products and --users must be positive.")
+        report = {
+            'commit': _commit(),
+            'scale': {name: options[name] for name in ('products', 'upstream_products', 'users', 'items')},
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'upstream_latency': options['latency'],
+            'seed': options['seed'],
+        }
+        upstream = make_products(options['upstream_products'])
+        with StubUpstream(products=upstream, latency=options['latency']) as stub, throwaway_database():
+            # Database products follow the upstream ids so neither shadows the other.
+            data = seed(products=options['products'], users=options['users'], items_per_cart=options['items'],
+                        first_product_id=len(upstream) + 1, seed=options['seed'])
+            data['upstream'] = [product['id'] for product in upstream]
+            report['database'] = connection.vendor
+            connection.close()
+            # The test client comes from 127.0.0.1: let it scrape /metrics/.
+            with override_settings(CATALOG_URL=stub.url, CATALOG_SOURCE='upstream', SLOW_REQUEST_SECONDS=0,
+                                   UPSTREAM_POOL_SIZE=options['concurrency'], METRICS_ALLOWED_IPS=['127.0.0.1']):
+                report['results'] = [
+                    {'endpoint': name, **self.run(name, data, options)}
+                    for name in options['endpoint'] or list(SCENARIOS)
+                ]
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        self.stdout.write(output)
+
+    def run(self, name, data, options):
+        method, needs_user, build = SCENARIOS[name]
+        rng = random.Random(f"{options['seed']}:{name}")
+        # Build every request up front, so their order does not depend on thread scheduling.
+        requests = [build(data, rng, n) for n in range(options['requests'])]
+        next_request = itertools.count()
+        lock = threading.Lock()
+        latencies, statuses = [], {}
+        totals = {'queries': 0, 'writes': 0}
+        start = threading.Barrier(options['concurrency'] + 1)
+
+        def client_loop(number):
+            # Errors are counted as 500s rather than stopping the run.
+            client = Client(raise_request_exception=False)
+            mine, codes = [], []
+            try:
+                if needs_user:
+                    client.force_login(data['users'][number % len(data['users'])])
+            except BaseException:
+                start.abort()
+                raise
+            try:
+                start.wait()
+                with QueryCounter() as queries:
+                    while True:
+                        with lock:
+                            index = next(next_request)
+                        if index >= len(requests):
+                            break
+                        path, extra = requests[index]
+                        began = time.perf_counter()
+                        response = getattr(client, method.lower())(path, **extra)
+                        if response.streaming:
+                            b''.join(response.streaming_content)
+                        mine.append(time.perf_counter() - began)
+                        codes.append(response.status_code)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(mine)
+                for code in codes:
+                    statuses[str(code)] = statuses.get(str(code), 0) + 1
+                totals['queries'] += queries.count
+                totals['writes'] += queries.writes
+
+        threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - started
+        return {
+            'method': method,
+            'path': requests[0][0],
+            'statuses': statuses,
+            **summarize(latencies, seconds),
+            'queries_per_request': round(totals['queries'] / len(requests), 2),
+            'writes_per_request': round(totals['writes'] / len(requests), 2),
+        }
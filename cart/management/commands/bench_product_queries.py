@@ -0,0 +1,87 @@
+import json
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from cart.bench import throwaway_database
+from cart.filters import filter_queryset, get_filters
+from cart.models import Product
+from cart.pagination import encode_cursor, page_queryset
+
+CATEGORIES = 50
+
+# Query parameters of the listing requests to time.
+SCENARIOS = {
+    'first page by id': {},
+    'deep page by id': {'cursor': encode_cursor('id', (900_000,))},
+    'first page by price': {'ordering': 'price'},
+    'deep page by -price': {'ordering': '-price', 'cursor': encode_cursor('-price', (Decimal('100.00'), 500_000))},
+    'price range': {'min_price': '500', 'max_price': '501', 'ordering': 'price'},
+    'category': {'category': 'category-7'},
+    'category by price': {'category': 'category-7', 'ordering': 'price'},
+    'category + price range': {'category': 'category-7', 'min_price': '100', 'max_price': '200', 'ordering': '-price'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the filtered / ordered product listing queries on a synthetic catalog "
+        "(in a throwaway test database), with and without the product indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Products in the synthetic catalog.")
+        parser.add_argument('--repeat', type=int, default=20, help="Runs per scenario; the median is reported.")
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--skip-unindexed', action='store_true', help="Don't rerun without the indexes.")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.seed(options['rows'])
+            report = {'rows': options['rows'], 'vendor': connection.vendor, 'indexed': self.run(options)}
+            if not options['skip_unindexed']:
+                with connection.schema_editor() as editor:
+                    for index in Product._meta.indexes:
+                        editor.remove_index(Product, index)
+                report['unindexed'] = self.run(options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def seed(self, rows, batch_size=10_000):
+        rng = random.Random(42)
+        for start in range(1, rows + 1, batch_size):
+            Product.objects.bulk_create([
+                Product(
+                    id=i, name=f"Product {i}", title=f"Product {i}",
+                    price=Decimal(rng.randrange(100, 100_000)) / 100,
+                    category=f"category-{rng.randrange(CATEGORIES)}",
+                    description="Synthetic product", image=f"https://example.com/{i}.jpg",
+                )
+                for i in range(start, min(start + batch_size, rows + 1))
+            ])
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE cart_product')
+        elif connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def run(self, options):
+        results = {}
+        for name, params in SCENARIOS.items():
+            params = {**params, 'page_size': str(options['page_size'])}
+            queryset = filter_queryset(Product.objects.all(), get_filters(params))
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                rows = list(page_queryset(queryset, params))
+                timings.append(time.perf_counter() - started)
+            results[name] = {
+                'median_ms': round(statistics.median(timings) * 1000, 3),
+                'rows': len(rows),
+                'plan': page_queryset(queryset, params).explain(),
+            }
+        return results
@@ -0,0 +1,73 @@
+import json
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from cart.bench import throwaway_database
+from cart.models import Cart, CartItem, Product
+from cart.renderers import FastJSONRenderer
+from cart.serializers import CartSerializer, ProductDetailSerializer, ProductSerializer, get_fast_serializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure rows per second of the DRF model serializers and their .values() fast paths "
+        "(cart.serializers.FastReadSerializer) on synthetic catalogs, and of the JSON renderers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000], help="Catalog sizes to measure.")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement; the best one is reported.")
+
+    def handle(self, *args, **options):
+        results = []
+        with throwaway_database():
+            for rows in options['rows']:
+                self.seed(rows)
+                querysets = {
+                    ProductSerializer: Product.objects.order_by('id'),
+                    ProductDetailSerializer: Product.objects.order_by('id'),
+                    CartSerializer: CartItem.objects.order_by('id'),
+                }
+                for serializer_class, queryset in querysets.items():
+                    results.append(self.measure(serializer_class, queryset, rows, options['repeat']))
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def seed(self, rows):
+        Product.objects.all().delete()
+        Cart.objects.all().delete()
+        Product.objects.bulk_create([
+            Product(id=i, title=f"Product {i}", price=Decimal(i % 10000) / 100, category=f"Category {i % 20}",
+                    description="Synthetic product " * 10, image=f"https://example.com/{i}.jpg")
+            for i in range(1, rows + 1)
+        ], batch_size=5000)
+        user, created = User.objects.get_or_create(username='bench')
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product_id=i, quantity=i % 5 + 1, unit_price=Decimal(i % 10000) / 100)
+             for i in range(1, rows + 1)], batch_size=5000)
+
+    def measure(self, serializer_class, queryset, rows, repeat):
+        fast = get_fast_serializer(serializer_class)
+        drf_data = serializer_class(queryset, many=True).data
+        fast_data = fast.serialize(fast.values(queryset))
+        return {
+            'serializer': serializer_class.__name__,
+            'rows': rows,
+            'drf_rows_per_second': self.rate(rows, repeat, lambda: serializer_class(queryset.all(), many=True).data),
+            'fast_rows_per_second': self.rate(rows, repeat, lambda: fast.serialize(fast.values(queryset.all()))),
+            'json_renderer_rows_per_second': self.rate(rows, repeat, lambda: JSONRenderer().render(fast_data)),
+            'fast_renderer_rows_per_second': self.rate(rows, repeat, lambda: FastJSONRenderer().render(fast_data)),
+            'identical': JSONRenderer().render(drf_data) == FastJSONRenderer().render(fast_data),
+        }
+
+    def rate(self, rows, repeat, run):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - started)
+        return round(rows / best)
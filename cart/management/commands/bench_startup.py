@@ -0,0 +1,121 @@
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from cart.bench import throwaway_database
+from cart.factories import seed
+from cart.stub_upstream import StubUpstream, make_products
+
+# Run in each fresh process: serve shopping.wsgi on a free port and report it.
+SERVER = """
+import json
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+from shopping.wsgi import application
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+server = make_server('127.0.0.1', 0, application, handler_class=QuietHandler)
+print(json.dumps({'port': server.server_port}), flush=True)
+server.serve_forever()
+"""
+
+
+def _median_ms(values):
+    return round(statistics.median(values) * 1000, 2)
+
+
+class Command(BaseCommand):
+    help = (
+        "Start fresh server processes with and without WARM_UP against a seeded throwaway "
+        "database and print their boot time and time to first byte of the first requests as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Processes started per mode.")
+        parser.add_argument('--products', type=int, default=2000, help="Products in the database.")
+        parser.add_argument('--latency', type=float, default=0.05, help="Stub upstream latency in seconds.")
+        parser.add_argument('--path', action='append',
+                            help="Path requested in order after boot (repeatable, default: the product reads).")
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError("--runs must be positive.")
+        paths = options['path'] or ['/products/', '/productapi/', '/products/1/', '/']
+        upstream = make_products(20)
+        with StubUpstream(products=upstream, latency=options['latency']) as stub, throwaway_database():
+            seed(products=options['products'], users=1, first_product_id=len(upstream) + 1)
+            env = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'shopping.settings'),
+                'DB_NAME': str(connection.settings_dict['NAME']),
+                'CATALOG_URL': stub.url,
+                'CATALOG_SOURCE': 'upstream',
+            }
+            connection.close()
+            report = {'runs': options['runs'], 'paths': paths, 'upstream_latency': options['latency'], 'modes': {}}
+            for mode, warm_up in (('cold', 'false'), ('warm', 'true')):
+                runs = [self.start(dict(env, WARM_UP=warm_up), paths) for _ in range(options['runs'])]
+                report['modes'][mode] = {
+                    'boot_ms': _median_ms([run['boot'] for run in runs]),
+                    'first_byte_ms': _median_ms([run['first_byte'] for run in runs]),
+                    'requests': {
+                        path: {
+                            'statuses': sorted({run['statuses'][path] for run in runs}),
+                            'first_ms': _median_ms([run['first'][path] for run in runs]),
+                            'repeat_ms': _median_ms([run['repeat'][path] for run in runs]),
+                        }
+                        for path in paths
+                    },
+                }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def start(self, env, paths):
+        """
+        Start one server process and time its boot and the first and second request to each path.
+
+        ``boot`` runs from the spawn until the server listens, ``first_byte``
+        until the response headers of the first request arrived.
+        """
+        spawned = time.perf_counter()
+        process = subprocess.Popen([sys.executable, '-c', SERVER], cwd=settings.BASE_DIR, env=env,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        try:
+            line = process.stdout.readline()
+            if not line:
+                raise CommandError(f"The server process exited with status {process.wait()}.")
+            run = {'boot': time.perf_counter() - spawned, 'first': {}, 'repeat': {}, 'statuses': {}}
+            port = json.loads(line)['port']
+            for path in paths:
+                run['first'][path], run['statuses'][path] = self.request(port, path)
+            run['first_byte'] = run['boot'] + run['first'][paths[0]]
+            for path in paths:
+                run['repeat'][path], status = self.request(port, path)
+            return run
+        finally:
+            process.kill()
+            process.wait()
+
+    def request(self, port, path):
+        client = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        try:
+            started = time.perf_counter()
+            client.request('GET', path, headers={'Host': 'localhost'})
+            response = client.getresponse()
+            elapsed = time.perf_counter() - started
+            response.read()
+            return elapsed, response.status
+        finally:
+            client.close()
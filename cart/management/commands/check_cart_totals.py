@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+
+from cart.models import Cart
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare every cart's running totals with its items at the prices they "
+        "were added at, and optionally repair the carts that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help="Rewrite the totals of drifted carts.")
+
+    def handle(self, *args, **options):
+        drifted = (
+            Cart.objects.annotate(**Cart.totals_expressions())
+            .filter(~Q(item_count=F('actual_item_count')) | ~Q(subtotal=F('actual_subtotal')))
+            .order_by('pk')
+        )
+        count = 0
+        for cart in drifted.iterator():
+            count += 1
+            self.stdout.write(
+                f"Cart {cart.pk}: stored {cart.item_count} items / {cart.subtotal}, "
+                f"actual {cart.actual_item_count} items / {cart.actual_subtotal:.2f}"
+            )
+            if options['repair']:
+                with transaction.atomic():
+                    # Recompute under a row lock, in case the cart changed since the scan.
+                    locked = Cart.objects.select_for_update().get(pk=cart.pk)
+                    locked.reset_totals()
+
+        if not count:
+            self.stdout.write(self.style.SUCCESS("All cart totals are consistent."))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {count} cart(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{count} cart(s) drifted; rerun with --repair to fix them."))
@@ -0,0 +1,44 @@
+import io
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cart.importer import iter_records, sync_products
+from cart.upstream import get_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Sync the external product catalog into the Product table. "
+        "SOURCE is an http(s) URL or a local JSON / JSONL file "
+        "(defaults to settings.CATALOG_URL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?', help="Upstream URL or path to a JSON / JSONL file.")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows written per transaction.")
+
+    def handle(self, *args, **options):
+        source = options['source'] or settings.CATALOG_URL
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        try:
+            with self.open_source(source) as stream:
+                result = sync_products(iter_records(stream), batch_size=options['batch_size'])
+        except (OSError, requests.RequestException, ValueError, KeyError, ArithmeticError) as e:
+            raise CommandError(f"Failed to import catalog from {source}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.rows} rows in {result.seconds:.2f}s "
+            f"({result.rows_per_second:.0f} rows/s): "
+            f"{result.created} created, {result.updated} updated, {result.unchanged} unchanged."
+        ))
+
+    def open_source(self, source):
+        if source.startswith(('http://', 'https://')):
+            response = get_client().get(source, stream=True)
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return io.TextIOWrapper(response.raw, encoding=response.encoding or 'utf-8')
+        return open(source, encoding='utf-8')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from cart.models import CategoryFacet
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the category facets from the Product table, e.g. after products "
+        "were changed with queryset update() calls, which send no signals."
+    )
+
+    def handle(self, *args, **options):
+        CategoryFacet.refresh()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {CategoryFacet.objects.count()} category facets."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cart.checkout import release_expired
+
+
+class Command(BaseCommand):
+    help = "Expire the orders whose stock reservation timed out and put their stock back."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Orders released per transaction.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        released = release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservations."))
@@ -0,0 +1,110 @@
+"""
+Process-local counters and histograms for the shopping API.
+
+Counters are plain integers keyed by name and guarded by a single lock so
+they can be bumped from request threads and background refreshers alike.
+Histograms count observations into fixed buckets per set of labels; both
+are exported in the Prometheus text format by ``render_prometheus``.
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+# Histogram name -> (bucket upper bounds, {labels: [count per bucket..., sum, count]}).
+_histograms = {}
+
+# Upper bounds of the default buckets, for durations in seconds.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def incr(name, amount=1):
+    """
+    Increment the counter ``name`` by ``amount``.
+    """
+    with _lock:
+        _counters[name] += amount
+
+
+def observe(name, amount, labels=None, buckets=DURATION_BUCKETS):
+    """
+    Record ``amount`` in the histogram ``name``.
+
+    Args:
+        name (str): Histogram name.
+        amount (float): The observed value.
+        labels (dict): Label names mapped to values identifying the series.
+        buckets (tuple): Sorted bucket upper bounds, fixed by the first observation.
+    """
+    key = tuple(sorted((labels or {}).items()))
+    with _lock:
+        bounds, series = _histograms.setdefault(name, (tuple(buckets), {}))
+        row = series.get(key)
+        if row is None:
+            # One count per bucket, one for +Inf, then the sum and the count.
+            row = series[key] = [0] * (len(bounds) + 1) + [0, 0]
+        row[bisect.bisect_left(bounds, amount)] += 1
+        row[-2] += amount
+        row[-1] += 1
+
+
+def value(name):
+    """
+    Get the current value of the counter ``name``.
+    """
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot():
+    """
+    Get a copy of every counter.
+
+    Returns:
+        dict: Counter names mapped to their current values.
+    """
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    """
+    Reset every counter to zero.
+    """
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render_prometheus(prefix='shopping_'):
+    """
+    Render every counter and histogram in the Prometheus text exposition format.
+    """
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = [(name, bounds, {key: list(row) for key, row in series.items()})
+                      for name, (bounds, series) in sorted(_histograms.items())]
+    lines = []
+    for name, count in counters:
+        lines += [f'# TYPE {prefix}{name}_total counter', f'{prefix}{name}_total {count}']
+    for name, bounds, series in histograms:
+        lines.append(f'# TYPE {prefix}{name} histogram')
+        for key, row in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip((*bounds, '+Inf'), row):
+                cumulative += count
+                lines.append(f'{prefix}{name}_bucket{_labels((*key, ("le", bound)))} {cumulative}')
+            lines.append(f'{prefix}{name}_sum{_labels(key)} {row[-2]}')
+            lines.append(f'{prefix}{name}_count{_labels(key)} {row[-1]}')
+    return '\n'.join(lines) + '\n'
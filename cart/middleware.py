@@ -0,0 +1,121 @@
+"""
+Middleware of the shopping API.
+"""
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+
+from . import instrumentation, metrics
+from .storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds of the per-request query count and response size histograms.
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _async_check(middleware):
+    # Under ASGI the handler passes a coroutine function: answer with coroutines
+    # too (like django.utils.deprecation.MiddlewareMixin), so the request stays
+    # on the event loop instead of being run in a thread.
+    middleware.async_mode = asyncio.iscoroutinefunction(middleware.get_response)
+    if middleware.async_mode:
+        middleware._is_coroutine = asyncio.coroutines._is_coroutine
+
+
+class CartStorageMiddleware:
+    """
+    Let the cart storage backend act on the response, e.g. to set the signed cart cookie.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _async_check(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return get_storage().process_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return get_storage().process_response(request, response)
+
+
+class PerformanceMiddleware:
+    """
+    Measure where the time of each request goes.
+
+    Total latency, database queries and their time, upstream HTTP time,
+    serialization time (fast serializers and JSON rendering) and response
+    size are added to per-endpoint histograms (see ``cart.metrics``, served
+    by ``/metrics/``) and, with ``SERVER_TIMING_ENABLED``, returned in a
+    ``Server-Timing`` header. Requests slower than ``SLOW_REQUEST_SECONDS``
+    are logged. Place it first so it times the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        _async_check(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = instrumentation.start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+        return self.finish(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        timings, token = instrumentation.start_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.end_request(token)
+        return self.finish(request, response, timings, time.perf_counter() - started)
+
+    def finish(self, request, response, timings, seconds):
+        """
+        Record the measures of a request and add them to its response.
+        """
+        size = None if response.streaming else len(response.content)
+        self.record(request, timings, seconds, size)
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={timings.db_seconds * 1000:.2f};desc="{timings.db_queries} queries"',
+                f'upstream;dur={timings.upstream_seconds * 1000:.2f};desc="{timings.upstream_calls} calls"',
+                f'serialize;dur={timings.serialize_seconds * 1000:.2f}',
+                f'total;dur={seconds * 1000:.2f}',
+            ])
+        if settings.SLOW_REQUEST_SECONDS and seconds >= settings.SLOW_REQUEST_SECONDS:
+            logger.warning(
+                "Slow request %s %s: %d in %.0f ms (%d queries in %.0f ms, upstream %.0f ms, "
+                "serialization %.0f ms, %s bytes)",
+                request.method, request.get_full_path(), response.status_code, seconds * 1000,
+                timings.db_queries, timings.db_seconds * 1000, timings.upstream_seconds * 1000,
+                timings.serialize_seconds * 1000, size if size is not None else 'streamed',
+            )
+        return response
+
+    def record(self, request, timings, seconds, size):
+        match = request.resolver_match
+        labels = {'method': request.method, 'endpoint': f'/{match.route}' if match is not None else 'unmatched'}
+        metrics.observe('request_duration_seconds', seconds, labels)
+        metrics.observe('request_db_queries', timings.db_queries, labels, buckets=QUERY_BUCKETS)
+        metrics.observe('request_db_seconds', timings.db_seconds, labels)
+        metrics.observe('request_upstream_seconds', timings.upstream_seconds, labels)
+        metrics.observe('request_serialize_seconds', timings.serialize_seconds, labels)
+        if size is not None:
+            metrics.observe('response_size_bytes', size, labels, buckets=SIZE_BUCKETS)
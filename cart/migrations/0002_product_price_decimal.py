@@ -0,0 +1,53 @@
+# Generated by Django 4.0.1 on 2026-10-17 21:33
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+
+def normalize_prices(apps, schema_editor):
+    """
+    Rewrite price strings as 2-decimal numbers so the column can change type.
+
+    Values that are not numbers (or do not fit the new column) become 0.
+    """
+    Product = apps.get_model('cart', 'Product')
+    batch = []
+    for product in Product.objects.only('id', 'price').iterator(chunk_size=2000):
+        try:
+            price = Decimal(str(product.price).strip()).quantize(Decimal('0.01'))
+            if not price.is_finite() or abs(price) >= Decimal('1e8'):
+                raise InvalidOperation
+        except (InvalidOperation, ValueError):
+            price = Decimal('0.00')
+        if str(price) != product.price:
+            product.price = str(price)
+            batch.append(product)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, ['price'])
+            batch = []
+    Product.objects.bulk_update(batch, ['price'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'price'], name='cart_product_category_price'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='cart_product_price_id'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.0.1 on 2026-10-17 22:05
+
+from django.db import DatabaseError, migrations
+
+
+def create_fts_table(apps, schema_editor):
+    """
+    Create and fill the FTS5 product search table on SQLite.
+
+    Other databases (or SQLite builds without FTS5) use the in-process index.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE cart_product_fts USING fts5("
+            "title, name, description, category, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    except DatabaseError:
+        return
+    schema_editor.execute(
+        "INSERT INTO cart_product_fts (rowid, title, name, description, category) "
+        "SELECT id, title, name, description, category FROM cart_product"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS cart_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0002_product_price_decimal'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
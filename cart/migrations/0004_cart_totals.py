@@ -0,0 +1,42 @@
+# Generated by Django 4.0.1 on 2026-10-17 21:37
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_totals(apps, schema_editor):
+    Cart = apps.get_model('cart', 'Cart')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    carts = Cart.objects.annotate(
+        actual_item_count=Coalesce(Sum('items__quantity'), 0),
+        actual_subtotal=Coalesce(
+            Sum(F('items__quantity') * F('items__product__price'), output_field=money),
+            Decimal('0'), output_field=money),
+    )
+    for cart in carts.iterator():
+        cart.item_count, cart.subtotal = cart.actual_item_count, cart.actual_subtotal
+        cart.save(update_fields=['item_count', 'subtotal'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0003_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
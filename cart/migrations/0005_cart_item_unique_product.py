@@ -0,0 +1,37 @@
+# Generated by Django 4.0.1 on 2026-10-17 21:40
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_items(apps, schema_editor):
+    """
+    Fold duplicate (cart, product) lines into one line with the summed quantity.
+    """
+    CartItem = apps.get_model('cart', 'CartItem')
+    duplicates = (
+        CartItem.objects.filter(product__isnull=False)
+        .values('cart_id', 'product_id')
+        .annotate(lines=Count('id'), keep=Min('id'), total=Sum('quantity'))
+        .filter(lines__gt=1)
+    )
+    for group in duplicates:
+        CartItem.objects.filter(pk=group['keep']).update(quantity=group['total'])
+        CartItem.objects.filter(
+            cart_id=group['cart_id'], product_id=group['product_id'],
+        ).exclude(pk=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0004_cart_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='cart_item_unique_product'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.1 on 2026-10-17 21:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cart', '0005_cart_item_unique_product'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
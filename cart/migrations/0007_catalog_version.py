@@ -0,0 +1,33 @@
+# Generated by Django 4.0.1 on 2026-10-17 21:47
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_version(apps, schema_editor):
+    CatalogVersion = apps.get_model('cart', 'CatalogVersion')
+    CatalogVersion.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0006_cart_user_no_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.1 on 2026-10-17 21:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0007_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at'], name='cart_product_updated_at'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.0.1 on 2026-10-17 22:03
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+import django.db.models.deletion
+
+
+def merge_duplicate_carts(apps, schema_editor):
+    """
+    Fold the carts of a user into the oldest one, summing the quantities of shared products.
+    """
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+    duplicates = Cart.objects.values('user_id').annotate(carts=Count('id'), keep=Min('id')).filter(carts__gt=1)
+    for group in duplicates:
+        keep = group['keep']
+        others = Cart.objects.filter(user_id=group['user_id']).exclude(pk=keep)
+        for item in CartItem.objects.filter(cart__in=others):
+            if item.product_id is not None and CartItem.objects.filter(
+                    cart_id=keep, product_id=item.product_id).update(quantity=F('quantity') + item.quantity):
+                item.delete()
+            else:
+                CartItem.objects.filter(pk=item.pk).update(cart_id=keep)
+        others.delete()
+        item_count, subtotal = 0, Decimal('0')
+        for item in CartItem.objects.filter(cart_id=keep).select_related('product'):
+            item_count += item.quantity
+            if item.product is not None:
+                subtotal += item.quantity * item.product.price
+        Cart.objects.filter(pk=keep).update(item_count=item_count, subtotal=subtotal)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cart', '0008_product_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_carts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cart',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['cart', 'product', 'quantity'], name='cart_item_cart_product_qty'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.0.1 on 2026-10-17 22:20
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min
+
+
+def build_facets(apps, schema_editor):
+    Product = apps.get_model('cart', 'Product')
+    CategoryFacet = apps.get_model('cart', 'CategoryFacet')
+    rows = Product.objects.order_by().values('category').annotate(
+        product_count=Count('id'), min_price=Min('price'), max_price=Max('price'),
+    )
+    CategoryFacet.objects.bulk_create([CategoryFacet(**row) for row in rows], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0009_cart_user_one_to_one'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryFacet',
+            fields=[
+                ('category', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(build_facets, migrations.RunPython.noop),
+    ]
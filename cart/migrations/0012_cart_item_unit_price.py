@@ -0,0 +1,29 @@
+# Generated by Django 4.0.1 on 2026-10-17 23:07
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_unit_prices(apps, schema_editor):
+    # Existing lines are priced at the current product price, which their running totals used.
+    CartItem = apps.get_model('cart', 'CartItem')
+    Product = apps.get_model('cart', 'Product')
+    CartItem.objects.filter(product__isnull=False).update(
+        unit_price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0011_checkout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_unit_prices, migrations.RunPython.noop),
+    ]
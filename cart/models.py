@@ -1,5 +1,9 @@
+from decimal import Decimal
+
 from django.utils import timezone
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Case, Count, DecimalField, F, Max, Min, Sum, Value, When
+from django.db.models.functions import Coalesce
 
 # Create your models here.
 from django.contrib.auth.models import User
@@ -10,10 +14,48 @@ class Product(models.Model):
     name = models.CharField(max_length=255, default='Default Name')
     id = models.IntegerField(primary_key=True)
     title = models.CharField(max_length=255, default='none')
-    price = models.CharField(max_length=100) 
+    price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.CharField(max_length=255, default='Uncategorized')
     description = models.TextField()
     image = models.URLField()
+    updated_at = models.DateTimeField(auto_now=True)
+    # Units available to check out; reserved units are taken off at checkout (see cart.checkout).
+    stock = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored category and price, so saves know which facets they change (see CategoryFacet).
+        if 'category' in field_names and 'price' in field_names:
+            instance._stored_facet_values = (instance.category, instance.price)
+        return instance
+
+    def save(self, *args, update_fields=None, **kwargs):
+        # Checkouts change the stock with UPDATEs, so the stock an instance was
+        # loaded with may be stale: saving a whole existing row writes every
+        # field but the stock (use adjust_stock, or name it in update_fields).
+        if update_fields is None and not self._state.adding:
+            update_fields = [field.name for field in self._meta.concrete_fields
+                             if not field.primary_key and field.name != 'stock']
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    @classmethod
+    def adjust_stock(cls, pk, delta):
+        """
+        Add ``delta`` units to the stock of a product, in the database.
+
+        Args:
+            pk (int): The product.
+            delta (int): Units to add; negative to take units off.
+
+        Returns:
+            bool: Whether the stock was changed; False if the product does not
+            exist or has fewer than ``-delta`` units.
+        """
+        products = cls.objects.filter(pk=pk)
+        if delta < 0:
+            products = products.filter(stock__gte=-delta)
+        return bool(products.update(stock=F('stock') + delta))
 
     def __str__(self) -> str:
         """
@@ -24,12 +66,388 @@ class Product(models.Model):
         """
         return str(self.name)
 
+    class Meta:
+        indexes = [
+            # Serves category filters, optionally combined with a price range or price ordering.
+            models.Index(fields=['category', 'price'], name='cart_product_category_price'),
+            # Serves price ranges and price ordering with the id tie-breaker of keyset pagination.
+            models.Index(fields=['price', 'id'], name='cart_product_price_id'),
+            # Serves incremental exports (updated_since).
+            models.Index(fields=['updated_at'], name='cart_product_updated_at'),
+        ]
+
+class CatalogVersion(models.Model):
+    """
+    Single-row counter of changes to the Product table.
+
+    It is bumped by the Product signal receivers (see ``cart.signals``), so
+    read endpoints can validate cached responses with one primary key lookup.
+    """
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
+    objects = models.Manager()
+
+    @classmethod
+    def current(cls):
+        """
+        Get the catalog version row.
+        """
+        version, created = cls.objects.get_or_create(pk=1)
+        return version
+
+    @classmethod
+    def bump(cls):
+        """
+        Record a change to the products.
+        """
+        now = timezone.now()
+        if not cls.objects.filter(pk=1).update(version=F('version') + 1, updated_at=now):
+            cls.objects.get_or_create(pk=1, defaults={'updated_at': now})
+
+
+class CategoryFacet(models.Model):
+    """
+    Product count and price range of one category.
+
+    Rows are kept in sync with the Product table by the Product signal
+    receivers (see ``cart.signals``): adding a product and removing one that
+    is not the cheapest or dearest of its category are a single conditional
+    UPDATE; other changes recompute the affected categories with a GROUP BY
+    served by the ``(category, price)`` index. Reading the facets never
+    touches the Product table. Queryset ``update()`` calls bypass the signals
+    and need a ``manage.py rebuild_facets``.
+    """
+    category = models.CharField(max_length=255, primary_key=True)
+    product_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return self.category
+
+    @classmethod
+    def refresh(cls, categories=None):
+        """
+        Recompute the facets of ``categories`` from the Product table.
+
+        Args:
+            categories (iterable): Categories to recompute; all of them when None.
+        """
+        products, facets = Product.objects.order_by(), cls.objects.all()
+        if categories is not None:
+            categories = set(categories)
+            if not categories:
+                return
+            products = products.filter(category__in=categories)
+            facets = facets.filter(category__in=categories)
+        rows = products.values('category').annotate(
+            product_count=Count('id'), min_price=Min('price'), max_price=Max('price'),
+        )
+        with transaction.atomic():
+            # Increments pending on these rows commit before the products are counted.
+            list(facets.select_for_update().values_list('pk', flat=True))
+            found = []
+            for row in rows:
+                category = row.pop('category')
+                cls.objects.update_or_create(category=category, defaults=row)
+                found.append(category)
+            facets.exclude(category__in=found).delete()
+
+    @classmethod
+    def _extend_range(cls, price):
+        # Update values widening the stored price range to include ``price``.
+        price_field = cls._meta.get_field('min_price')
+        return {
+            'min_price': Case(When(min_price__lte=price, then=F('min_price')),
+                              default=Value(price, output_field=price_field)),
+            'max_price': Case(When(max_price__gte=price, then=F('max_price')),
+                              default=Value(price, output_field=price_field)),
+            'updated_at': timezone.now(),
+        }
+
+    @classmethod
+    def add_product(cls, category, price):
+        """
+        Count a new product of ``category`` priced ``price``.
+        """
+        updated = cls.objects.filter(category=category).update(
+            product_count=F('product_count') + 1, **cls._extend_range(price),
+        )
+        if not updated:
+            cls.refresh([category])
+
+    @classmethod
+    def remove_product(cls, category, price):
+        """
+        Uncount a removed product of ``category`` priced ``price``.
+        """
+        # The price range only changes when the product was at one of its ends.
+        updated = cls.objects.filter(
+            category=category, product_count__gt=1, min_price__lt=price, max_price__gt=price,
+        ).update(product_count=F('product_count') - 1, updated_at=timezone.now())
+        if not updated:
+            cls.refresh([category])
+
+    @classmethod
+    def change_price(cls, category, old_price, new_price):
+        """
+        Record a product of ``category`` going from ``old_price`` to ``new_price``.
+        """
+        # Unless the product was at one end of the range, the range can only widen.
+        updated = cls.objects.filter(
+            category=category, min_price__lt=old_price, max_price__gt=old_price,
+        ).update(**cls._extend_range(new_price))
+        if not updated:
+            cls.refresh([category])
+
 class Cart(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, default=1)
+    # One cart per user: concurrent get_or_create() calls cannot create a second one.
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Running totals, updated in the same transaction as every CartItem change,
+    # at the price each line was added at (CartItem.unit_price).
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
     objects = models.Manager()
 
+    def lock(self):
+        """
+        Lock the cart row until the end of the current transaction.
+
+        Every writer locks the cart before touching its lines, so writers of
+        one cart run one after the other and cannot deadlock.
+        """
+        Cart.objects.select_for_update().only('pk').get(pk=self.pk)
+
+    def add_to_totals(self, quantity, amount):
+        """
+        Add ``quantity`` items worth ``amount`` to the running totals.
+
+        The update is done in SQL, so concurrent changes to the same cart are not lost.
+        Negative values remove items.
+        """
+        Cart.objects.filter(pk=self.pk).update(
+            item_count=F('item_count') + quantity,
+            subtotal=F('subtotal') + amount,
+        )
+        self.refresh_from_db(fields=['item_count', 'subtotal'])
+
+    def compute_totals(self):
+        """
+        Compute the totals from the cart items, at the prices they were added at.
+
+        Returns:
+            tuple: ``(item_count, subtotal)``.
+        """
+        totals = self.items.aggregate(**Cart.totals_expressions(prefix=''))
+        return totals['actual_item_count'], totals['actual_subtotal']
+
+    def reset_totals(self):
+        """
+        Recompute the running totals from the cart items and store them.
+        """
+        self.item_count, self.subtotal = self.compute_totals()
+        self.save(update_fields=['item_count', 'subtotal'])
+
+    @staticmethod
+    def totals_expressions(prefix='items__'):
+        """
+        Aggregate expressions for the actual item count and subtotal of carts.
+        """
+        return {
+            'actual_item_count': Coalesce(Sum(f'{prefix}quantity'), 0),
+            'actual_subtotal': Coalesce(
+                Sum(F(f'{prefix}quantity') * F(f'{prefix}unit_price'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Decimal('0'),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        }
+
+    def totals(self):
+        """
+        Get the running totals as they are rendered in API responses.
+        """
+        return {'item_count': self.item_count, 'subtotal': f'{self.subtotal:.2f}'}
+
+    @transaction.atomic
+    def add_item(self, product, quantity=1):
+        """
+        Add ``quantity`` of ``product`` to the cart.
+
+        The line and the totals are incremented in SQL, so concurrent adds to
+        one cart all count. A new line is priced at the current product price;
+        units added to an existing line keep the price it was added at.
+
+        Args:
+            product (Product): The product to add.
+            quantity (int): Number of items to add.
+
+        Returns:
+            CartItem: The updated line.
+        """
+        self.lock()
+        line = CartItem.objects.filter(cart=self, product=product)
+        if not line.update(quantity=F('quantity') + quantity):
+            try:
+                with transaction.atomic():
+                    CartItem.objects.create(cart=self, product=product, quantity=quantity, unit_price=product.price)
+            except IntegrityError:
+                # Another request created the line first.
+                line.update(quantity=F('quantity') + quantity)
+        item = line.get()
+        self.add_to_totals(quantity, quantity * item.unit_price)
+        return item
+
+    @transaction.atomic
+    def apply_operations(self, operations):
+        """
+        Apply a batch of item operations in one transaction.
+
+        Operations are applied in order and merged per product, then written
+        with one bulk insert, one bulk update and one delete.
+
+        Args:
+            operations (list): Dicts with ``product`` (id), ``quantity`` and ``op``:
+                ``add`` adds to the quantity, ``set`` replaces it and ``remove``
+                drops the line. A resulting quantity of 0 drops the line.
+
+        Returns:
+            dict: Product ids mapped to their CartItem, for lines still in the cart.
+
+        Raises:
+            Product.DoesNotExist: If an operation names an unknown product.
+        """
+        self.lock()
+        product_ids = {operation['product'] for operation in operations}
+        prices = dict(Product.objects.filter(id__in=product_ids).values_list('id', 'price'))
+        unknown = product_ids.difference(prices)
+        if unknown:
+            raise Product.DoesNotExist(f"Unknown products: {', '.join(map(str, sorted(unknown)))}")
+
+        lines = {item.product_id: item for item in self.items.filter(product_id__in=product_ids)}
+        quantities = {product_id: item.quantity for product_id, item in lines.items()}
+        for operation in operations:
+            product_id, quantity = operation['product'], operation['quantity']
+            if operation['op'] == 'add':
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            elif operation['op'] == 'set':
+                quantities[product_id] = quantity
+            else:
+                quantities[product_id] = 0
+
+        to_create, to_update, to_delete = [], [], []
+        count_delta, amount_delta = 0, Decimal('0')
+        for product_id, quantity in quantities.items():
+            item = lines.get(product_id)
+            old_quantity = item.quantity if item is not None else 0
+            if quantity == old_quantity:
+                continue
+            count_delta += quantity - old_quantity
+            amount_delta += (quantity - old_quantity) * (item.unit_price if item is not None else prices[product_id])
+            if quantity == 0:
+                to_delete.append(item.pk)
+                del lines[product_id]
+            elif item is None:
+                lines[product_id] = CartItem(cart=self, product_id=product_id, quantity=quantity,
+                                             unit_price=prices[product_id])
+                to_create.append(lines[product_id])
+            else:
+                item.quantity = quantity
+                to_update.append(item)
+
+        CartItem.objects.bulk_create(to_create)
+        CartItem.objects.bulk_update(to_update, ['quantity'])
+        if to_delete:
+            CartItem.objects.filter(pk__in=to_delete).delete()
+        if count_delta or amount_delta:
+            self.add_to_totals(count_delta, amount_delta)
+        return lines
+
+    @transaction.atomic
+    def merge_items(self, quantities):
+        """
+        Add quantities to the cart's lines with one set-based upsert.
+
+        Lines already in the cart get the quantities summed, the others are
+        inserted at the current product price; products that no longer exist are
+        skipped. The totals are then recomputed.
+
+        Args:
+            quantities (dict): Product ids mapped to the quantity to add.
+        """
+        self.lock()
+        rows = [(int(product_id), quantity) for product_id, quantity in quantities.items() if quantity > 0]
+        item_table = connection.ops.quote_name(CartItem._meta.db_table)
+        product_table = connection.ops.quote_name(Product._meta.db_table)
+        with connection.cursor() as cursor:
+            # Bounded so the statement stays under the database's parameter limit.
+            for start in range(0, len(rows), 400):
+                chunk = rows[start:start + 400]
+                values = ', '.join(['(%s, %s)'] * len(chunk))
+                # "WHERE 1 = 1" keeps SQLite from reading ON CONFLICT as a join constraint.
+                cursor.execute(
+                    f"INSERT INTO {item_table} (cart_id, product_id, quantity, unit_price) "
+                    f"SELECT %s, guest.column1, guest.column2, {product_table}.price FROM (VALUES {values}) AS guest "
+                    f"INNER JOIN {product_table} ON {product_table}.id = guest.column1 WHERE 1 = 1 "
+                    f"ON CONFLICT (cart_id, product_id) "
+                    f"DO UPDATE SET quantity = {item_table}.quantity + excluded.quantity",
+                    [self.pk, *(value for row in chunk for value in row)],
+                )
+        self.reset_totals()
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, related_name='items', on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True)
     quantity = models.IntegerField(default=1)
+    # Price of the product when the line was added; the cart totals use it.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='cart_item_unique_product'),
+        ]
+        indexes = [
+            # Covers the cart read query: its items' products and quantities come from the index alone.
+            models.Index(fields=['cart', 'product', 'quantity'], name='cart_item_cart_product_qty'),
+        ]
+
+    @property
+    def line_total(self):
+        """
+        Get the price of this line, at the price it was added at.
+        """
+        return self.quantity * self.unit_price
+
+
+class Order(models.Model):
+    """
+    A checked-out cart.
+
+    Checkout reserves the stock of every line until ``expires_at``; the order
+    must be confirmed by then, or ``cart.checkout.release_expired`` puts the
+    stock back.
+    """
+    class Status(models.TextChoices):
+        RESERVED = 'reserved'
+        CONFIRMED = 'confirmed'
+        EXPIRED = 'expired'
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='orders', on_delete=models.CASCADE)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.RESERVED)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Serves the scan for expired reservations.
+            models.Index(fields=['status', 'expires_at'], name='cart_order_status_expires'),
+        ]
 
+class OrderLine(models.Model):
+    order = models.ForeignKey(Order, related_name='lines', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
+    quantity = models.PositiveIntegerField()
+    # Price of the product at checkout.
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
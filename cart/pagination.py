@@ -0,0 +1,242 @@
+"""
+Keyset (cursor) pagination and field projection for product listings.
+
+Pages follow the ``ordering`` query parameter (``id``, ``-id``, ``price`` or
+``-price``), always with ``id`` as the final tie-breaker. The cursor is an
+opaque token holding the sort key of the last row of the previous page, so
+fetching a page costs an indexed range scan no matter how deep the client
+has paged.
+"""
+import base64
+import binascii
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+# Sort key of each ordering, and whether it is descending.
+ORDERINGS = {
+    'id': (('id',), False),
+    '-id': (('id',), True),
+    'price': (('price', 'id'), False),
+    '-price': (('price', 'id'), True),
+}
+
+
+def get_ordering(params):
+    """
+    Get the requested ordering, ``id`` by default.
+    """
+    ordering = params.get('ordering') or 'id'
+    if ordering not in ORDERINGS:
+        raise ValidationError({'ordering': f"Must be one of: {', '.join(ORDERINGS)}."})
+    return ordering
+
+
+def key_fields(params):
+    """
+    Get the fields making up the sort key of the requested ordering.
+    """
+    return ORDERINGS[get_ordering(params)][0]
+
+
+def _key_value(field, value):
+    if field == 'price':
+        return Decimal(str(value))
+    return value
+
+
+def row_key(row, fields):
+    """
+    Get the sort key of a Product row or a product dict.
+    """
+    if isinstance(row, dict):
+        return tuple(_key_value(field, row[field]) for field in fields)
+    return tuple(_key_value(field, getattr(row, field)) for field in fields)
+
+
+def encode_cursor(ordering, key):
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+    """
+    payload = {'o': ordering, 'k': [str(value) if isinstance(value, Decimal) else value for value in key]}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ordering):
+    """
+    Decode a cursor produced by ``encode_cursor`` for ``ordering``.
+
+    Raises:
+        ValidationError: If the cursor is malformed or was issued for another ordering.
+    """
+    fields = ORDERINGS[ordering][0]
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload['k']
+        if payload['o'] != ordering or len(values) != len(fields):
+            raise ValueError
+        key = []
+        for field, value in zip(fields, values):
+            if field == 'id' and (isinstance(value, bool) or not isinstance(value, int)):
+                raise ValueError
+            key.append(Decimal(value) if field == 'price' else value)
+        return tuple(key)
+    except (binascii.Error, ValueError, UnicodeDecodeError, InvalidOperation, TypeError, KeyError):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+
+
+def get_page_size(params):
+    """
+    Get the requested page size, capped at ``PRODUCT_MAX_PAGE_SIZE``.
+    """
+    try:
+        size = int(params.get('page_size', settings.PRODUCT_PAGE_SIZE))
+    except ValueError:
+        raise ValidationError({'page_size': 'A valid integer is required.'})
+    if size < 1:
+        raise ValidationError({'page_size': 'Ensure this value is greater than or equal to 1.'})
+    return min(size, settings.PRODUCT_MAX_PAGE_SIZE)
+
+
+def get_fields(params, allowed):
+    """
+    Get the fields requested with ``fields=a,b,c``.
+
+    Args:
+        params (QueryDict): Request query parameters.
+        allowed (list): Fields the endpoint can return.
+
+    Returns:
+        list: Requested fields in ``allowed`` order, or None when not restricted.
+    """
+    value = params.get('fields')
+    if not value:
+        return None
+    requested = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+    return [name for name in allowed if name in requested]
+
+
+def load_fields(fields, params):
+    """
+    Get the fields to load for a projected page: the requested ones plus the sort key.
+    """
+    if fields is None:
+        return None
+    return list(dict.fromkeys([*key_fields(params), *fields]))
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated listing.
+
+    Attributes:
+        items (list): Rows of the page.
+        next_cursor (str): Cursor of the following page, or None on the last page.
+    """
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def next_link(self, request):
+        """
+        Build the ``Link`` header pointing at the next page, if any.
+        """
+        if self.next_cursor is None:
+            return None
+        params = request.GET.copy()
+        params['cursor'] = self.next_cursor
+        return f'<{request.build_absolute_uri(request.path)}?{params.urlencode()}>; rel="next"'
+
+
+def _after(params):
+    cursor = params.get('cursor')
+    return decode_cursor(cursor, get_ordering(params)) if cursor else None
+
+
+def _after_q(fields, key, descending):
+    # (f1, f2) > (v1, v2)  <=>  f1 >= v1 AND (f1 > v1 OR (f1 = v1 AND f2 > v2)).
+    # The redundant leading bound lets the database seek the index instead of scanning it.
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    equal = {}
+    for field, value in zip(fields, key):
+        condition |= Q(**equal, **{f'{field}__{lookup}': value})
+        equal[field] = value
+    if len(fields) > 1:
+        condition &= Q(**{f'{fields[0]}__{lookup}e': key[0]})
+    return condition
+
+
+def _page(items, params, fields):
+    size = get_page_size(params)
+    has_more = len(items) > size
+    items = items[:size]
+    cursor = encode_cursor(get_ordering(params), row_key(items[-1], fields)) if has_more else None
+    return KeysetPage(items, cursor)
+
+
+def page_queryset(queryset, params):
+    """
+    Restrict ``queryset`` to the ``page_size + 1`` rows that follow the cursor.
+    """
+    fields, descending = ORDERINGS[get_ordering(params)]
+    queryset = queryset.order_by(*(f"{'-' if descending else ''}{field}" for field in fields))
+    after = _after(params)
+    if after is not None:
+        queryset = queryset.filter(_after_q(fields, after, descending))
+    return queryset[:get_page_size(params) + 1]
+
+
+def page_rows(queryset, params):
+    """
+    Load the ``page_size + 1`` rows of ``queryset`` that follow the cursor.
+    """
+    return list(page_queryset(queryset, params))
+
+
+def paginate_queryset(queryset, params):
+    """
+    Get one page of ``queryset`` in the requested ordering.
+    """
+    return _page(page_rows(queryset, params), params, key_fields(params))
+
+
+def merge_pages(external, db_items, params):
+    """
+    Get one page of upstream products merged with database products.
+
+    Both sources follow the requested ordering; a database product replaces
+    an upstream product with the same ``id``.
+
+    Args:
+        external (list): Upstream product dicts, without those shadowed by a database row.
+        db_items (list): Serialized database products, as loaded by ``page_rows``.
+        params (QueryDict): Request query parameters.
+    """
+    fields, descending = ORDERINGS[get_ordering(params)]
+    after = _after(params)
+    if after is not None:
+        if descending:
+            external = [item for item in external if row_key(item, fields) < after]
+        else:
+            external = [item for item in external if row_key(item, fields) > after]
+    merged = {item['id']: item for item in external}
+    merged.update((item['id'], item) for item in db_items)
+    items = sorted(merged.values(), key=lambda item: row_key(item, fields), reverse=descending)
+    return _page(items[:get_page_size(params) + 1], params, fields)
+
+
+def project(items, fields):
+    """
+    Restrict product dicts to ``fields``.
+    """
+    if fields is None:
+        return items
+    return [{name: item[name] for name in fields if name in item} for item in items]
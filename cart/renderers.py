@@ -0,0 +1,59 @@
+"""
+JSON rendering for the API.
+
+``FastJSONRenderer`` produces the same bytes as DRF's ``JSONRenderer`` with
+the default compact, unicode and strict settings. It reuses one encoder
+instead of building one per response and, when the optional ``orjson``
+package is installed, encodes with it.
+"""
+from rest_framework.compat import SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+from .instrumentation import timer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement of ``JSONRenderer`` for compact output.
+
+    Indented output (``Accept: application/json; indent=4`` or the browsable
+    API) goes through ``JSONRenderer``. With orjson, data it cannot encode
+    (e.g. integers above 64 bits) falls back to the standard encoder; unlike
+    ``json``, orjson writes very large or small floats without a ``+`` or a
+    leading zero in the exponent and renders NaN as ``null``.
+    """
+    _encoder = encoders.JSONEncoder(
+        ensure_ascii=JSONRenderer.ensure_ascii,
+        allow_nan=not JSONRenderer.strict,
+        separators=SHORT_SEPARATORS,
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timer('serialize'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if data is None:
+            return b''
+        if not self.compact or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if orjson is not None and not self.ensure_ascii:
+            try:
+                ret = orjson.dumps(
+                    data,
+                    default=self._encoder.default,
+                    option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+                )
+            except TypeError:
+                pass
+            else:
+                # Escape U+2028 / U+2029 like JSONRenderer, keeping the output a JavaScript subset.
+                return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        ret = self._encoder.encode(data)
+        return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
@@ -0,0 +1,117 @@
+"""
+Server-side cache of rendered product list responses.
+
+Rendered JSON bytes are stored in the ``responses`` cache alias under a key
+made of the endpoint, the query string and the catalog version token (see
+``cart.conditional``). The Product signal receivers bump the version on every
+change, so entries written for older versions are never read again and age
+out of the size-bounded cache.
+
+A cold key is rebuilt by one caller at a time: the first one takes a short
+lock with ``cache.add`` and the others wait for its entry. Across processes
+this needs a shared cache backend (file-based, memcached...); the default
+locmem cache is per process.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from . import metrics
+from .catalog import CatalogUnavailable
+from .conditional import catalog_validators
+
+# Headers stored along with the body.
+CACHED_HEADERS = ('Link',)
+
+
+def get_cache():
+    """
+    Get the cache holding rendered responses.
+    """
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def cache_key(endpoint, request, token):
+    """
+    Build the cache key of a response to ``request`` over data at version ``token``.
+    """
+    digest = hashlib.sha1(f'{token}\n{request.get_full_path()}'.encode()).hexdigest()
+    return f'products:{endpoint}:{digest}'
+
+
+def _to_entry(response):
+    headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+    return {'content': response.content, 'content_type': response['Content-Type'], 'headers': headers}
+
+
+def _from_entry(entry):
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    for name, value in entry['headers'].items():
+        response[name] = value
+    return response
+
+
+def _wait_for(cache, key):
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cache_response(endpoint, upstream=True):
+    """
+    Decorate the ``get`` method of a product list view with the response cache.
+
+    Only successful JSON responses are cached; the browsable API is rendered
+    per request. Apply it under ``conditional_get`` so the version token is
+    looked up once.
+
+    Args:
+        endpoint (str): Name of the endpoint, part of the cache key.
+        upstream (bool): Whether the view also serves the external catalog.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not settings.RESPONSE_CACHE_ENABLED or request.accepted_renderer.format != 'json':
+                return method(self, request, *args, **kwargs)
+            try:
+                token, _ = getattr(request, 'catalog_validators', None) or catalog_validators(upstream)
+            except CatalogUnavailable:
+                return method(self, request, *args, **kwargs)
+            cache = get_cache()
+            key = cache_key(endpoint, request, token)
+            entry = cache.get(key)
+            if entry is not None:
+                metrics.incr('response_cache_hits')
+                return _from_entry(entry)
+            metrics.incr('response_cache_misses')
+            lock = f'{key}:lock'
+            locked = cache.add(lock, 1, timeout=settings.RESPONSE_CACHE_LOCK_TIMEOUT)
+            if not locked:
+                # Another caller is rendering this key: wait for its entry rather than render it again.
+                metrics.incr('response_cache_waits')
+                entry = _wait_for(cache, key)
+                if entry is not None:
+                    return _from_entry(entry)
+            try:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                self.finalize_response(request, response, *args, **kwargs)
+                response.render()
+                if len(response.content) <= settings.RESPONSE_CACHE_MAX_ENTRY_BYTES:
+                    cache.set(key, _to_entry(response))
+                return response
+            finally:
+                if locked:
+                    cache.delete(lock)
+        return wrapper
+    return decorator
@@ -0,0 +1,236 @@
+"""
+Ranked, prefix-matching full-text search over products.
+
+Two backends index ``title``, ``name``, ``description`` and ``category``:
+
+- ``fts5``: an SQLite FTS5 table (``cart_product_fts``, created by migration
+  0003) ranked with bm25. Used by default when running on SQLite.
+- ``memory``: an in-process inverted index for other databases. It is built
+  from the database on first use and then kept current from Product
+  save/delete signals; ``PRODUCT_SEARCH_MAX_AGE`` bounds how long changes
+  made by other processes can go unnoticed.
+
+Both are updated incrementally from signals (see ``cart.signals``), never
+rebuilt per query.
+"""
+import bisect
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+
+from .models import Product
+
+FTS_TABLE = 'cart_product_fts'
+
+# Field weights, in FTS table column order.
+FIELD_WEIGHTS = {'title': 10.0, 'name': 5.0, 'description': 1.0, 'category': 3.0}
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """
+    Split text into lower-case word tokens.
+    """
+    return _token_re.findall(str(text).lower())
+
+
+class FTS5Backend:
+    """
+    Search backed by the SQLite FTS5 table.
+    """
+    name = 'fts5'
+
+    def search(self, query, limit):
+        """
+        Get ``(product_id, score)`` pairs best first; every term is prefix-matched.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS.values())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, {weights}) AS score FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s ORDER BY score DESC, rowid LIMIT %s",
+                [match, limit],
+            )
+            return cursor.fetchall()
+
+    def index(self, products):
+        rows = [(p.id, p.title, p.name, p.description, p.category) for p in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, name, description, category) VALUES (%s, %s, %s, %s, %s)",
+                rows,
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in product_ids])
+
+
+class InvertedIndex:
+    """
+    An in-process inverted index scored with field-weighted TF-IDF.
+
+    Attributes:
+        postings (dict): Term mapped to ``{product_id: weighted term frequency}``.
+        terms (list): Sorted vocabulary, used for prefix lookups.
+    """
+    name = 'memory'
+
+    def __init__(self, max_age=300, clock=time.monotonic):
+        self.max_age = max_age
+        self.clock = clock
+        self.postings = defaultdict(dict)
+        self.terms = []
+        self.documents = {}
+        self._built_at = None
+        self._lock = threading.RLock()
+
+    def search(self, query, limit):
+        """
+        Get ``(product_id, score)`` pairs best first; every term is prefix-matched.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            self._ensure_built()
+            total = max(len(self.documents), 1)
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                start = bisect.bisect_left(self.terms, term)
+                for candidate in self.terms[start:]:
+                    if not candidate.startswith(term):
+                        break
+                    postings = self.postings[candidate]
+                    idf = math.log(1 + total / len(postings))
+                    for product_id, frequency in postings.items():
+                        term_scores[product_id] = max(term_scores[product_id], frequency * idf)
+                # Every query term must match, as with FTS5.
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {pk: score + term_scores[pk] for pk, score in scores.items() if pk in term_scores}
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    def index(self, products):
+        with self._lock:
+            if self._built_at is None:
+                return
+            for product in products:
+                self._remove(product.id)
+                self._add(product)
+
+    def remove(self, product_ids):
+        with self._lock:
+            for product_id in product_ids:
+                self._remove(product_id)
+
+    def _ensure_built(self):
+        if self._built_at is not None and self.clock() - self._built_at < self.max_age:
+            return
+        self.postings.clear()
+        self.terms = []
+        self.documents = {}
+        fields = ['id', *FIELD_WEIGHTS]
+        for product in Product.objects.only(*fields).iterator(chunk_size=2000):
+            self._add(product)
+        self._built_at = self.clock()
+
+    def _add(self, product):
+        frequencies = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(getattr(product, field)):
+                frequencies[term] += weight
+        for term, frequency in frequencies.items():
+            if not self.postings[term]:
+                bisect.insort(self.terms, term)
+            self.postings[term][product.id] = frequency
+        self.documents[product.id] = list(frequencies)
+
+    def _remove(self, product_id):
+        for term in self.documents.pop(product_id, ()):
+            postings = self.postings[term]
+            postings.pop(product_id, None)
+            if not postings:
+                del self.postings[term]
+                self.terms.pop(bisect.bisect_left(self.terms, term))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _fts_available():
+    return connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+
+
+def get_backend():
+    """
+    Get the search backend selected by ``PRODUCT_SEARCH_BACKEND``.
+
+    ``auto`` picks FTS5 when running on SQLite with the FTS table present and
+    the in-process index otherwise.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                choice = settings.PRODUCT_SEARCH_BACKEND
+                if choice == 'fts5' or (choice == 'auto' and _fts_available()):
+                    _backend = FTS5Backend()
+                else:
+                    _backend = InvertedIndex(max_age=settings.PRODUCT_SEARCH_MAX_AGE)
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting=None, **kwargs):
+    """
+    Drop the selected backend when a ``PRODUCT_SEARCH_*`` setting changes.
+    """
+    global _backend
+    if setting is None or setting.startswith('PRODUCT_SEARCH_'):
+        _backend = None
+
+
+def search_products(query, limit=20):
+    """
+    Search products.
+
+    Returns:
+        list: ``(Product, score)`` pairs, best match first.
+    """
+    ranked = get_backend().search(query, limit)
+    products = Product.objects.in_bulk([product_id for product_id, _ in ranked])
+    return [(products[pk], score) for pk, score in ranked if pk in products]
+
+
+def index_products(products):
+    """
+    Add or refresh products in the search index.
+    """
+    get_backend().index(products)
+
+
+def remove_products(product_ids):
+    """
+    Remove products from the search index.
+    """
+    get_backend().remove(product_ids)
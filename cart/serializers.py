@@ -1,5 +1,10 @@
+import functools
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import Cart, CartItem, Product
+from rest_framework.settings import api_settings
+from .instrumentation import timer
+from .models import Cart, CartItem, CategoryFacet, Order, OrderLine, Product
 from django.contrib.auth.models import User
 
 class RegistrationSerializer(serializers.ModelSerializer):
@@ -32,11 +37,33 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('username', 'email')
 
 class ProductSerializer(serializers.ModelSerializer):
-    
+    """
+    Serializer for Product model.
+
+    Pass ``fields=[...]`` to render only a subset of the fields.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Product
         fields = ['id', 'title', 'price', 'description', 'category', 'image']
 
+class ProductIngestSerializer(serializers.ModelSerializer):
+    """
+    Validates one row of a bulk product upsert.
+
+    Rows are keyed on ``id``, so the uniqueness check of ``id`` is dropped.
+    """
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'title', 'price', 'category', 'description', 'image']
+        extra_kwargs = {'id': {'validators': []}}
+
 class ProductDetailSerializer(serializers.ModelSerializer):
     """
     Serializer for detailed Product model.
@@ -45,10 +72,139 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Product
-        fields = '__all__'
+        # Checkouts change the stock without a new catalog version, so it is
+        # left out of the cached product representations.
+        exclude = ['stock']
+
+class CategoryFacetSerializer(serializers.ModelSerializer):
+    count = serializers.IntegerField(source='product_count')
+
+    class Meta:
+        model = CategoryFacet
+        fields = ['category', 'count', 'min_price', 'max_price']
 
 class CartSerializer(serializers.ModelSerializer):
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
     class Meta:
         model = CartItem
         fields = ['product', 'quantity']
-    
\ No newline at end of file
+
+
+class CartItemSerializer(CartSerializer):
+    """
+    An existing cart line: only its quantity changes, the product is fixed.
+    """
+    class Meta(CartSerializer.Meta):
+        read_only_fields = ['product']
+
+
+class OrderLineSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OrderLine
+        fields = ['product', 'quantity', 'unit_price']
+
+class OrderSerializer(serializers.ModelSerializer):
+    lines = OrderLineSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'status', 'total', 'created_at', 'expires_at', 'lines']
+
+class CartOperationSerializer(serializers.Serializer):
+    """
+    One operation of a batch cart mutation.
+    """
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=0, default=1)
+    op = serializers.ChoiceField(choices=['add', 'set', 'remove'], default='add')
+
+
+# Fields whose values, as returned by ``QuerySet.values()``, are already their representation.
+_IDENTITY_FIELDS = (serializers.BooleanField, serializers.CharField, serializers.IntegerField)
+
+
+def _converter(field):
+    if isinstance(field, _IDENTITY_FIELDS):
+        return None
+    if isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+        # ``values()`` returns the primary key of the related row.
+        return None
+    if (isinstance(field, serializers.DecimalField) and not field.localize
+            and getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            and field.decimal_places is not None and field.rounding is None):
+        quantum = Decimal(1).scaleb(-field.decimal_places)
+        return lambda value: format(value.quantize(quantum), 'f')
+    return field.to_representation
+
+
+class FastReadSerializer:
+    """
+    Read-only fast path of a ModelSerializer over ``QuerySet.values()`` rows.
+
+    Field introspection is done once; rows are then converted with plain
+    dict operations, skipping the per-field ``to_representation`` calls of
+    values the database already returns in their rendered form. The output
+    renders to the same JSON as ``serializer_class(instances, many=True).data``.
+
+    Get instances with ``get_fast_serializer``.
+
+    Args:
+        serializer_class: ModelSerializer whose output is reproduced.
+        fields (tuple): Subset of its fields to render, in any order.
+    """
+    def __init__(self, serializer_class, fields=None):
+        self.names, self.sources, self._converters = [], [], []
+        for name, field in serializer_class().fields.items():
+            if field.write_only or (fields is not None and name not in fields):
+                continue
+            if field.source == '*' or '.' in field.source:
+                raise TypeError(f"{serializer_class.__name__}.{name} is not a model column.")
+            self.names.append(name)
+            self.sources.append(field.source)
+            converter = _converter(field)
+            if converter is not None:
+                self._converters.append((name, converter))
+        self._pairs = list(zip(self.names, self.sources))
+
+    def values(self, queryset, *extra):
+        """
+        Get the ``values()`` queryset of the columns to render, plus ``extra`` ones.
+        """
+        return queryset.values(*dict.fromkeys([*self.sources, *extra]))
+
+    def to_representation(self, row):
+        item = {name: row[source] for name, source in self._pairs}
+        for name, convert in self._converters:
+            value = item[name]
+            if value is not None:
+                item[name] = convert(value)
+        return item
+
+    def serialize(self, rows):
+        """
+        Render ``values()`` rows into a list of dicts.
+        """
+        pairs, converters = self._pairs, self._converters
+        data = []
+        with timer('serialize'):
+            for row in rows:
+                item = {name: row[source] for name, source in pairs}
+                for name, convert in converters:
+                    value = item[name]
+                    if value is not None:
+                        item[name] = convert(value)
+                data.append(item)
+        return data
+
+
+@functools.lru_cache(maxsize=256)
+def get_fast_serializer(serializer_class, fields=None):
+    """
+    Get the shared FastReadSerializer of ``serializer_class`` restricted to ``fields``.
+
+    Args:
+        serializer_class: ModelSerializer whose output is reproduced.
+        fields (tuple): Subset of its fields to render, or None for all of them.
+    """
+    return FastReadSerializer(serializer_class, fields)
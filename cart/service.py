@@ -1,26 +1,28 @@
 from decimal import Decimal
 
-from django.conf import settings
-
 from .serializers import ProductSerializer
 from .models import Product
+from .storage import get_storage
 
 
 class Cart:
     """
     A class representing a shopping cart.
 
-    The cart is stored in the user's session and contains information
-    about the products added, their quantities, and total price.
+    The cart is kept by the storage backend selected with ``CART_STORAGE``
+    (the user's session by default, see ``cart.storage``) and contains
+    information about the products added, their quantities, and total price.
 
     Methods:
     - __init__: Initialize the cart.
     - __iter__: Allow iteration over cart items.
-    - save: Save the cart to the session.
+    - save: Save the cart to the storage backend.
     - add: Add a product to the cart or update its quantity.
+    - apply_operations: Apply a batch of add / set / remove operations.
     - remove: Remove a product from the cart.
     - __len__: Get the total number of items in the cart.
     - get_total_price: Get the total price of all items in the cart.
+    - totals: Get the item count and subtotal as rendered by the API.
     - clear: Clear the entire cart.
 
     Reference:
@@ -30,24 +32,22 @@ class Cart:
         """
         initialize the cart
         """
-        self.session = request.session
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            # save an empty cart in session
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
-
-    def __iter__(self):    
-        return iter(self.items)
-    
+        self.request = request
+        self.storage = get_storage()
+        self.cart = self.storage.load(request)
+
     def save(self):
-        self.session.modified = True
+        self.storage.save(self.request, self.cart)
 
     def add(self, product, quantity=1, override_quantity=False):
         """
         Add product to the cart or update its quantity
-        """
 
+        Raises:
+            ValueError: If ``quantity`` is below 1; the cart is left unchanged.
+        """
+        if quantity < 1:
+            raise ValueError(f"Quantity must be at least 1, got {quantity}.")
         product_id = str(product["id"])
         if product_id not in self.cart:
             self.cart[product_id] = {
@@ -71,18 +71,54 @@ class Cart:
             del self.cart[product_id]
             self.save()
 
+    def apply_operations(self, operations):
+        """
+        Apply a batch of add / set / remove operations, saving the cart once
+
+        Operations have the shape taken by ``models.Cart.apply_operations``;
+        a resulting quantity of 0 drops the line.
+
+        Raises:
+            Product.DoesNotExist: If an operation names an unknown product.
+        """
+        product_ids = {operation["product"] for operation in operations}
+        prices = dict(Product.objects.filter(id__in=product_ids).values_list("id", "price"))
+        unknown = product_ids.difference(prices)
+        if unknown:
+            raise Product.DoesNotExist(f"Unknown products: {', '.join(map(str, sorted(unknown)))}")
+        for operation in operations:
+            product_id = str(operation["product"])
+            line = self.cart.setdefault(product_id, {"quantity": 0, "price": str(prices[operation["product"]])})
+            if operation["op"] == "add":
+                line["quantity"] += operation["quantity"]
+            elif operation["op"] == "set":
+                line["quantity"] = operation["quantity"]
+            else:
+                line["quantity"] = 0
+            if line["quantity"] == 0:
+                del self.cart[product_id]
+        self.save()
+
+    def totals(self):
+        """
+        Get the totals as they are rendered in API responses, like ``models.Cart.totals``
+        """
+        return {"item_count": len(self), "subtotal": f"{self.get_total_price():.2f}"}
+
     def __iter__(self):
         """
         Loop through cart items and fetch the products from the database
+
+        The products are loaded with one query and serialized in one batch.
+        Each item is a new dict, so derived fields never leak into the storage.
         """
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
-        for product in products:
-            cart[str(product.id)]["product"] = ProductSerializer(product).data
-        for item in cart.values():
-            item["price"] = Decimal(item["price"]) 
-            item["total_price"] = item["price"] * item["quantity"]
+        products = Product.objects.filter(id__in=list(self.cart))
+        serialized = {str(product["id"]): product for product in ProductSerializer(products, many=True).data}
+        for product_id, stored in self.cart.items():
+            price = Decimal(stored["price"])
+            item = {"quantity": stored["quantity"], "price": price, "total_price": price * stored["quantity"]}
+            if product_id in serialized:
+                item["product"] = serialized[product_id]
             yield item
 
     def __len__(self):
@@ -95,6 +131,6 @@ class Cart:
         return sum(Decimal(item["price"]) * item["quantity"] for item in self.cart.values())
 
     def clear(self):
-        # remove cart from session
-        del self.session[settings.CART_SESSION_ID]
-        self.save()
\ No newline at end of file
+        # remove cart from the storage
+        self.storage.clear(self.request)
+        self.cart = {}
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Signal receivers keeping derived product data (the search index, the
+category facets and the catalog version) in sync with the Product table, and
+merging guest carts at login.
+
+``bulk_create`` / ``bulk_update`` do not send ``post_save``, so code writing
+products in bulk sends ``products_bulk_saved`` with the affected ids instead.
+
+The search index is updated once the write commits: a rolled back write
+leaves it untouched, and a long import does not hold it up.
+"""
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import search
+from .models import Cart, CatalogVersion, CategoryFacet, Product
+from .storage import get_storage
+
+# Sent by bulk writers with ``ids``: primary keys of created or updated
+# products, and ``categories``: the categories updated rows had before the
+# write (omitted when only new rows were written).
+products_bulk_saved = Signal()
+
+
+@receiver(pre_save, sender=Product)
+def product_saving(sender, instance, **kwargs):
+    # An instance not loaded from the database, e.g. ``Product(id=...).save()``,
+    # may replace a stored row: read the category and price it had.
+    if not hasattr(instance, '_stored_facet_values'):
+        instance._stored_facet_values = Product.objects.filter(pk=instance.pk).values_list('category', 'price').first()
+
+
+def _update_facets(instance, created):
+    stored = instance._stored_facet_values
+    current = (instance.category, instance.price)
+    if created or stored is None:
+        CategoryFacet.add_product(*current)
+    elif stored[0] != current[0]:
+        CategoryFacet.remove_product(*stored)
+        CategoryFacet.add_product(*current)
+    elif stored[1] != current[1]:
+        CategoryFacet.change_price(current[0], stored[1], current[1])
+    instance._stored_facet_values = current
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    transaction.on_commit(lambda: search.index_products([instance]))
+    _update_facets(instance, created)
+    CatalogVersion.bump()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: search.remove_products([product_id]))
+    CategoryFacet.remove_product(instance.category, instance.price)
+    CatalogVersion.bump()
+
+
+@receiver(products_bulk_saved, sender=Product)
+def products_bulk_saved_handler(sender, ids, categories=(), **kwargs):
+    products = Product.objects.filter(id__in=ids)
+    transaction.on_commit(lambda: search.index_products(products))
+    CategoryFacet.refresh({*categories, *products.values_list('category', flat=True).distinct()})
+    CatalogVersion.bump()
+
+
+@receiver(user_logged_in)
+def merge_guest_cart(sender, request, user, **kwargs):
+    """
+    Move the cart built before logging in into the user's database cart, summing quantities.
+    """
+    if request is None:
+        return
+    guest = get_storage().pop_guest_cart(request)
+    if guest:
+        cart, created = Cart.objects.get_or_create(user=user)
+        cart.merge_items({product_id: item['quantity'] for product_id, item in guest.items()})
@@ -0,0 +1,158 @@
+"""
+Swappable storage backends for guest carts, used by ``cart.service.Cart``.
+
+The payload maps product ids (as strings) to ``{"quantity": int, "price": str}``.
+The backend is chosen with the ``CART_STORAGE`` setting:
+
+- ``cart.storage.SessionCartStorage``: the Django session (the default). Pair
+  it with ``SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'``
+  and a shared cache to serve reads from the cache.
+- ``cart.storage.SignedCookieCartStorage``: a compact signed cookie; no
+  server-side state at all.
+
+Logged-in users' carts always live in the ``Cart`` / ``CartItem`` tables
+(``cart.models.Cart``), which keep running totals, serve token-authenticated
+clients without a session and are what checkout reserves. Anonymous requests
+never touch those tables: the guest cart is merged into the user's database
+cart at login (see ``cart.signals``).
+
+``cart.middleware.CartStorageMiddleware`` must be installed for backends that
+act on the response (the signed cookie).
+"""
+import threading
+
+from django.conf import settings
+from django.core import signing
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+_PAYLOAD_ATTR = '_cart_payload'
+
+
+class BaseCartStorage:
+    """
+    Interface of cart storage backends.
+    """
+    def load(self, request):
+        """
+        Get the cart payload of the request; changes are only kept through ``save``.
+        """
+        raise NotImplementedError
+
+    def save(self, request, cart):
+        """
+        Store the cart payload of the request.
+        """
+        raise NotImplementedError
+
+    def clear(self, request):
+        """
+        Remove the cart of the request.
+        """
+        self.save(request, {})
+
+    def pop_guest_cart(self, request):
+        """
+        Remove and return the cart the client built before logging in.
+
+        Called once the request is authenticated, by the ``user_logged_in``
+        receiver merging it into the user's database cart.
+        """
+        cart = self.load(request)
+        if cart:
+            self.clear(request)
+        return cart
+
+    def process_response(self, request, response):
+        """
+        Hook called by ``CartStorageMiddleware`` on every response.
+        """
+        return response
+
+
+class SessionCartStorage(BaseCartStorage):
+    """
+    Keep the cart in the Django session, under ``CART_SESSION_ID``.
+    """
+    def load(self, request):
+        return request.session.get(settings.CART_SESSION_ID) or {}
+
+    def save(self, request, cart):
+        request.session[settings.CART_SESSION_ID] = cart
+        request.session.modified = True
+
+    def clear(self, request):
+        request.session.pop(settings.CART_SESSION_ID, None)
+        request.session.modified = True
+
+
+class SignedCookieCartStorage(BaseCartStorage):
+    """
+    Keep the cart in a compressed, signed cookie named ``CART_COOKIE_NAME``.
+
+    The payload is stored as ``[[product_id, quantity, price], ...]``; browsers
+    cap cookies at about 4 KB, which fits carts of a few hundred lines.
+    """
+    salt = 'cart.storage.SignedCookieCartStorage'
+
+    def load(self, request):
+        if hasattr(request, _PAYLOAD_ATTR):
+            return getattr(request, _PAYLOAD_ATTR)
+        value = request.COOKIES.get(settings.CART_COOKIE_NAME)
+        cart = {}
+        if value:
+            try:
+                lines = signing.loads(value, salt=self.salt, max_age=settings.CART_COOKIE_MAX_AGE)
+                cart = {str(pk): {'quantity': quantity, 'price': price} for pk, quantity, price in lines}
+            except (signing.BadSignature, ValueError, TypeError):
+                cart = {}
+        return cart
+
+    def save(self, request, cart):
+        # Views get a DRF ``Request``; the middleware sees the Django request it wraps.
+        setattr(getattr(request, '_request', request), _PAYLOAD_ATTR, cart)
+
+    def process_response(self, request, response):
+        if not hasattr(request, _PAYLOAD_ATTR):
+            return response
+        cart = getattr(request, _PAYLOAD_ATTR)
+        if not cart:
+            response.delete_cookie(settings.CART_COOKIE_NAME)
+            return response
+        lines = [[int(pk), item['quantity'], item['price']] for pk, item in cart.items()]
+        response.set_cookie(
+            settings.CART_COOKIE_NAME,
+            signing.dumps(lines, salt=self.salt, compress=True),
+            max_age=settings.CART_COOKIE_MAX_AGE,
+            httponly=True,
+            samesite='Lax',
+            secure=request.is_secure(),
+        )
+        return response
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """
+    Get the process-wide cart storage selected by ``CART_STORAGE``.
+    """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = import_string(settings.CART_STORAGE)()
+    return _storage
+
+
+@receiver(setting_changed)
+def reset_storage(setting=None, **kwargs):
+    """
+    Drop the process-wide storage when a ``CART_*`` setting changes.
+    """
+    global _storage
+    if setting is None or setting.startswith('CART_'):
+        _storage = None
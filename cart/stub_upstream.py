@@ -0,0 +1,110 @@
+"""
+Local stand-in for the fakestoreapi.com products API.
+
+The stub serves ``/products`` and ``/products/<id>`` from an in-memory list
+on a random local port, so the catalog code can be exercised in tests and
+benchmarks without touching the network.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_products(count=20):
+    """
+    Build ``count`` products shaped like the fakestoreapi.com payload.
+    """
+    return [
+        {
+            "id": i,
+            "title": f"Product {i}",
+            "price": round(9.99 + i, 2),
+            "description": f"Description of product {i}",
+            "category": ("electronics", "jewelery", "men's clothing", "women's clothing")[i % 4],
+            "image": f"https://example.com/img/{i}.jpg",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+class StubUpstream:
+    """
+    A threaded HTTP server serving a fixed product list.
+
+    Attributes:
+        products (list): Products returned by ``/products``.
+        latency (float): Seconds to sleep before answering each request.
+        status (int): HTTP status to answer with; anything but 200 sends an error body.
+        request_count (int): Number of requests served so far.
+    """
+    def __init__(self, products=None, latency=0.0, status=200):
+        self.products = make_products() if products is None else products
+        self.latency = latency
+        self.status = status
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def url(self):
+        return f"{self.base_url}/products"
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with stub._count_lock:
+                    stub.request_count += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, payload = stub._answer(self.path)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _answer(self, path):
+        if self.status != 200:
+            return self.status, {"error": "stub upstream failure"}
+        path = path.split("?", 1)[0].rstrip("/")
+        if path == "/products":
+            return 200, self.products
+        prefix, _, product_id = path.rpartition("/")
+        if prefix == "/products" and product_id.isdigit():
+            for product in self.products:
+                if product["id"] == int(product_id):
+                    return 200, product
+        return 404, {"error": "not found"}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
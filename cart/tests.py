@@ -1,3 +1,1322 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import threading
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import SyncToAsync
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+import cart.renderers
+from cart import metrics
+from cart.catalog import CatalogCache, CatalogUnavailable
+from cart.checkout import release_expired
+from cart.conditional import catalog_validators
+from cart.db import check_persistent_connections
+from cart.factories import CartItemFactory, seed
+from cart.importer import iter_records, sync_products
+from cart.middleware import CartStorageMiddleware
+from cart.models import Cart, CartItem, CategoryFacet, Order, Product
+from cart.renderers import FastJSONRenderer
+from cart.response_cache import cache_key, get_cache
+from cart.serializers import CartSerializer, ProductDetailSerializer, ProductSerializer, get_fast_serializer
+from cart.service import Cart as SessionCart
+from cart.storage import get_storage
+from cart.stub_upstream import StubUpstream, make_products
+from cart.upstream import CircuitBreaker, CircuitOpenError, UpstreamClient
+from cart.warmup import warm_up
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CatalogCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.stub = StubUpstream().start()
+        self.addCleanup(self.stub.stop)
+        self.clock = FakeClock()
+        client = UpstreamClient(retries=0)
+        self.cache = CatalogCache(self.stub.url, ttl=10, stale_ttl=60, client=client, clock=self.clock)
+
+    def test_fresh_copy_is_served_from_cache(self):
+        self.assertEqual(len(self.cache.get()), 20)
+        self.cache.get()
+        self.assertEqual(self.stub.request_count, 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["refreshes"]), (1, 1, 1))
+
+    def test_cold_burst_triggers_single_fetch(self):
+        self.stub.latency = 0.2
+        threads = [threading.Thread(target=self.cache.get) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.stub.request_count, 1)
+        self.assertEqual(self.cache.stats()["refreshes"], 1)
+
+    def test_stale_copy_is_served_while_refreshing(self):
+        self.cache.get()
+        self.stub.products = self.stub.products[:5]
+        self.clock.now = 30
+        self.assertEqual(len(self.cache.get()), 20)
+        self.cache._refresh_lock.acquire()
+        self.cache._refresh_lock.release()
+        self.assertEqual(len(self.cache.get()), 5)
+        self.assertEqual(self.stub.request_count, 2)
+
+    def test_last_good_copy_is_served_when_upstream_fails(self):
+        self.cache.get()
+        self.stub.status = 503
+        self.clock.now = 1000
+        self.assertEqual(len(self.cache.get()), 20)
+        self.assertEqual(self.cache.stats()["errors"], 1)
+
+    def test_failure_without_cached_copy_raises(self):
+        self.stub.status = 503
+        with self.assertRaises(CatalogUnavailable):
+            self.cache.get()
+
+
+class UpstreamClientTests(SimpleTestCase):
+    def setUp(self):
+        self.stub = StubUpstream().start()
+        self.addCleanup(self.stub.stop)
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+        self.client = UpstreamClient(retries=2, backoff=0.001, breaker=self.breaker)
+
+    def test_transient_errors_are_retried(self):
+        self.stub.status = 503
+        response = self.client.get(self.stub.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.stub.request_count, 3)
+
+    def test_client_errors_are_not_retried(self):
+        self.assertEqual(self.client.get(f"{self.stub.url}/999").status_code, 404)
+        self.assertEqual(self.stub.request_count, 1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_breaker_opens_fails_fast_and_recovers(self):
+        opened = metrics.value("upstream_breaker_open")
+        self.stub.status = 503
+        self.client.get(self.stub.url)
+        self.client.get(self.stub.url)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(metrics.value("upstream_breaker_open"), opened + 1)
+
+        calls = self.stub.request_count
+        with self.assertRaises(CircuitOpenError):
+            self.client.get(self.stub.url)
+        self.assertEqual(self.stub.request_count, calls)
+
+        self.stub.status = 200
+        self.clock.now = 31
+        self.assertEqual(self.client.get_json(self.stub.url)[0]["id"], 1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+    def test_other_request_errors_count_as_failures(self):
+        self.breaker.state, self.breaker._opened_at = CircuitBreaker.OPEN, 0
+        self.clock.now = 31
+        with mock.patch.object(self.client.session, "get", side_effect=requests.exceptions.ChunkedEncodingError):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                self.client.get(self.stub.url)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.now = 62
+        self.assertEqual(self.client.get(self.stub.url).status_code, 200)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class CatalogImportTests(TestCase):
+    def test_iter_records_parses_array_and_jsonl_in_small_chunks(self):
+        products = make_products(5)
+        as_array = io.StringIO(json.dumps(products, indent=2))
+        as_jsonl = io.StringIO("\n".join(json.dumps(p) for p in products) + "\n")
+        self.assertEqual(list(iter_records(as_array, chunk_size=7)), products)
+        self.assertEqual(list(iter_records(as_jsonl, chunk_size=7)), products)
+
+    def test_only_changed_rows_are_written(self):
+        products = make_products(10)
+        first = sync_products(products, batch_size=4)
+        self.assertEqual((first.created, first.updated, first.unchanged), (10, 0, 0))
+
+        products[3]["price"] = 1.5
+        second = sync_products(products, batch_size=4)
+        self.assertEqual((second.created, second.updated, second.unchanged), (0, 1, 9))
+        self.assertEqual(Product.objects.get(pk=4).price, Decimal("1.50"))
+
+    def test_command_imports_from_upstream(self):
+        out = io.StringIO()
+        with StubUpstream() as stub:
+            call_command("import_catalog", stub.url, "--batch-size", "7", stdout=out)
+        self.assertEqual(Product.objects.count(), 20)
+        self.assertIn("20 created", out.getvalue())
+
+
+class ProductBulkIngestTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("loader", password="secret-password"))
+
+    def post(self, body, content_type="application/json"):
+        return self.client.post("/products/bulk/", body, content_type=content_type)
+
+    @override_settings(PRODUCT_BULK_BATCH_SIZE=3)
+    def test_array_is_upserted_and_invalid_rows_are_reported(self):
+        products = make_products(7)
+        products[2]["price"] = "not a price"
+        products[5] = ["not", "an", "object"]
+        response = self.post(json.dumps(products))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["created"], data["updated"], data["unchanged"], data["rejected"]), (5, 0, 0, 2))
+        self.assertEqual([(error["index"], error["id"]) for error in data["errors"]], [(2, 3), (5, None)])
+        self.assertIn("price", data["errors"][0]["errors"])
+        self.assertGreater(data["rows_per_second"], 0)
+        self.assertEqual(sorted(Product.objects.values_list("id", flat=True)), [1, 2, 4, 5, 7])
+
+    def test_jsonl_updates_existing_rows(self):
+        products = make_products(4)
+        self.post(json.dumps(products))
+        products[1]["title"] = "Renamed"
+        response = self.post("\n".join(json.dumps(p) for p in products) + "\n", "application/x-ndjson")
+        data = response.json()
+        self.assertEqual((data["created"], data["updated"], data["unchanged"]), (0, 1, 3))
+        self.assertEqual(Product.objects.get(pk=2).title, "Renamed")
+
+    @override_settings(PRODUCT_BULK_BATCH_SIZE=2)
+    def test_malformed_body_keeps_written_batches(self):
+        body = "\n".join(json.dumps(p) for p in make_products(3)) + "\n{broken"
+        response = self.post(body, "application/x-ndjson")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("after 3 rows", response.json()["error"])
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_requires_admin_and_json(self):
+        self.assertEqual(self.post("[]", "text/plain").status_code, 415)
+        self.client.logout()
+        # 401: the token authenticator asks for credentials.
+        self.assertEqual(self.post("[]").status_code, 401)
+
+    def test_single_product_post(self):
+        response = self.client.post("/productapi/", make_products(1)[0], content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Product.objects.filter(pk=1).exists())
+
+
+class AsyncProductEndpointTests(TransactionTestCase):
+    def setUp(self):
+        self.stub = StubUpstream(products=make_products(3)).start()
+        self.addCleanup(self.stub.stop)
+        Product.objects.create(id=100, title="Local", price="5.00", description="local", image="https://example.com/l.jpg")
+
+    async def test_list_combines_upstream_and_database(self):
+        with override_settings(CATALOG_URL=self.stub.url):
+            response = await self.async_client.get("/async/productapi/")
+        self.assertEqual([p["id"] for p in response.json()], [1, 2, 3, 100])
+
+    async def test_list_answers_unexpected_errors_like_the_sync_view(self):
+        with override_settings(CATALOG_URL=self.stub.url), \
+                mock.patch("cart.views.merge_pages", side_effect=KeyError("price")):
+            response = await self.async_client.get("/async/productapi/")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Error processing products: 'price'"})
+
+    def test_middleware_chain_stays_async(self):
+        # A sync-only middleware would make Django run the whole chain through SyncToAsync.
+        chain = ASGIHandler()._middleware_chain
+        self.assertNotIsInstance(chain, SyncToAsync)
+        self.assertTrue(asyncio.iscoroutinefunction(chain))
+
+    @override_settings(SERVER_TIMING_ENABLED=True)
+    async def test_async_requests_are_measured(self):
+        response = await self.async_client.get("/async/products/100/")
+        self.assertEqual(response.json()["title"], "Local")
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+    async def test_detail_prefers_database_then_upstream(self):
+        with override_settings(CATALOG_URL=self.stub.url):
+            local = await self.async_client.get("/async/products/100/")
+            self.assertEqual(self.stub.request_count, 0)
+            upstream = await self.async_client.get("/async/products/2/")
+            missing = await self.async_client.get("/async/products/99/")
+        self.assertEqual(local.json()["title"], "Local")
+        self.assertEqual(upstream.json()["title"], "Product 2")
+        self.assertEqual(missing.status_code, 404)
+
+
+class ProductPaginationTests(TestCase):
+    def setUp(self):
+        # Rendered responses are keyed by catalog version, which every test restarts from.
+        get_cache().clear()
+        for i in range(1, 8):
+            Product.objects.create(id=i * 10, title=f"P{i}", price="1.00", description="d", image="https://example.com/i.jpg")
+
+    def walk(self, path, params):
+        ids, url = [], path
+        while url:
+            response = self.client.get(url, params)
+            body = response.json()
+            ids.append([p["id"] for p in (body["data"] if isinstance(body, dict) else body)])
+            link = response.get("Link")
+            url, params = (link[1:link.index(">")], None) if link else (None, None)
+        return ids
+
+    def test_products_are_paged_by_id(self):
+        self.assertEqual(self.walk("/products/", {"page_size": 3}), [[10, 20, 30], [40, 50, 60], [70]])
+
+    @override_settings(CATALOG_SOURCE="upstream")
+    def test_upstream_and_database_products_are_merged_by_id(self):
+        with StubUpstream(products=make_products(12)) as stub, override_settings(CATALOG_URL=stub.url):
+            pages = self.walk("/productapi/", {"page_size": 8})
+        self.assertEqual(pages, [[1, 2, 3, 4, 5, 6, 7, 8], [9, 10, 11, 12, 20, 30, 40, 50], [60, 70]])
+
+    def test_fields_projection_defers_unrequested_columns(self):
+        # The catalog version lookup of the conditional GET check, then the page.
+        with self.assertNumQueries(2) as queries:
+            response = self.client.get("/products/", {"fields": "id,title,price", "page_size": 2})
+        self.assertEqual(response.json()["data"][0], {"id": 10, "title": "P1", "price": "1.00"})
+        self.assertNotIn("description", queries.captured_queries[-1]["sql"])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get("/products/", {"fields": "secret"}).status_code, 400)
+        self.assertEqual(self.client.get("/products/", {"cursor": "!!"}).status_code, 400)
+        self.assertEqual(self.client.get("/products/", {"page_size": "0"}).status_code, 400)
+
+
+class ProductFilterTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        prices = ["5.00", "1.50", "20.00", "1.50", "12.00", "7.25"]
+        for i, price in enumerate(prices, start=1):
+            Product.objects.create(id=i, title=f"P{i}", price=price, category="a" if i % 2 else "b",
+                                   description="d", image="https://example.com/i.jpg")
+
+    def ids(self, **params):
+        return [p["id"] for p in self.client.get("/products/", params).json()["data"]]
+
+    def test_price_ordering_pages_with_id_tie_breaker(self):
+        first = self.client.get("/products/", {"ordering": "price", "page_size": 3}).json()
+        self.assertEqual([p["id"] for p in first["data"]], [2, 4, 1])
+        rest = self.ids(ordering="price", page_size=3, cursor=first["next"])
+        self.assertEqual(rest, [6, 5, 3])
+        self.assertEqual(self.ids(ordering="-price"), [3, 5, 6, 1, 4, 2])
+
+    def test_category_and_price_range(self):
+        self.assertEqual(self.ids(category="a"), [1, 3, 5])
+        self.assertEqual(self.ids(min_price="5", max_price="12"), [1, 5, 6])
+        self.assertEqual(self.ids(category="b", ordering="-price", max_price="10"), [6, 4, 2])
+
+    def test_cursor_is_bound_to_its_ordering(self):
+        cursor = self.client.get("/products/", {"ordering": "price", "page_size": 1}).json()["next"]
+        self.assertEqual(self.client.get("/products/", {"ordering": "id", "cursor": cursor}).status_code, 400)
+        self.assertEqual(self.client.get("/products/", {"min_price": "cheap"}).status_code, 400)
+
+    def test_upstream_products_are_filtered_and_ordered_with_local_ones(self):
+        with StubUpstream(products=make_products(4)) as stub, override_settings(CATALOG_URL=stub.url):
+            response = self.client.get("/productapi/", {"ordering": "price", "category": "b", "fields": "id,price"})
+        # Stub products 1-4 are shadowed by local rows with the same ids.
+        self.assertEqual(response.json(), [
+            {"id": 2, "price": "1.50"}, {"id": 4, "price": "1.50"}, {"id": 6, "price": "7.25"}])
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make(1, "Mens Cotton Jacket", "men's clothing", "Great outerwear jackets for spring")
+            self.make(2, "Solid Gold Petite Micropave", "jewelery", "Satisfaction guaranteed")
+            self.make(3, "Cotton Shirt", "men's clothing", "Slim fit jacket alternative")
+
+    def make(self, pk, title, category, description):
+        return Product.objects.create(id=pk, title=title, name=title, price="1.00", category=category,
+                                      description=description, image="https://example.com/i.jpg")
+
+    def search(self, q):
+        return [p["id"] for p in self.client.get("/products/search/", {"q": q}).json()["data"]]
+
+    def check_backend(self):
+        self.assertEqual(self.search("jack"), [1, 3])
+        self.assertEqual(self.search("cotton jacket"), [1, 3])
+        self.assertEqual(self.search("jewel"), [2])
+        self.assertEqual(self.search("nothing"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make(4, "Rain Jacket", "women's clothing", "Windbreaker")
+            Product.objects.filter(pk=1).get().delete()
+        self.assertEqual(self.search("jacket"), [4, 3])
+        with self.captureOnCommitCallbacks(execute=True):
+            sync_products([{"id": 5, "title": "Gold Bracelet", "price": 3, "category": "jewelery"}])
+        self.assertCountEqual(self.search("gold"), [5, 2])
+
+        # Rolled back writes never reach the index.
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.make(6, "Gold Jacket", "jewelery", "Shiny")
+                    raise RuntimeError("rolled back")
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertCountEqual(self.search("gold"), [5, 2])
+
+    def test_fts5_backend(self):
+        with override_settings(PRODUCT_SEARCH_BACKEND="auto"):
+            from cart.search import get_backend
+            self.assertEqual(get_backend().name, "fts5")
+            self.check_backend()
+
+    def test_in_process_backend(self):
+        with override_settings(PRODUCT_SEARCH_BACKEND="memory"):
+            self.check_backend()
+
+    def test_query_is_required(self):
+        self.assertEqual(self.client.get("/products/search/").status_code, 400)
+
+
+class CartTotalsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("shopper", password="secret-password")
+        self.client.force_login(self.user)
+        self.shirt = Product.objects.create(id=1, title="Shirt", price="10.50", description="d", image="https://example.com/1.jpg")
+        self.hat = Product.objects.create(id=2, title="Hat", price="4.00", description="d", image="https://example.com/2.jpg")
+
+    def add(self, product, quantity):
+        return self.client.post("/cart/", {"product": product.pk, "quantity": quantity}, content_type="application/json")
+
+    def test_totals_follow_add_update_and_delete(self):
+        self.assertEqual(self.add(self.shirt, 2).json()["totals"], {"item_count": 2, "subtotal": "21.00"})
+        self.add(self.hat, 3)
+        listing = self.client.get("/cart/").json()
+        self.assertEqual(len(listing["items"]), 2)
+        self.assertEqual(listing["totals"], {"item_count": 5, "subtotal": "33.00"})
+
+        hat_line = CartItem.objects.get(product=self.hat)
+        response = self.client.patch(f"/cart/items/{hat_line.pk}/", {"quantity": 1}, content_type="application/json")
+        self.assertEqual(response.json()["totals"], {"item_count": 3, "subtotal": "25.00"})
+
+        self.client.delete(f"/cart/items/{hat_line.pk}/")
+        self.assertEqual(self.client.get("/cart/").json()["totals"], {"item_count": 2, "subtotal": "21.00"})
+
+        self.client.post("/cart/clear/")
+        self.assertEqual(self.client.get("/cart/").json()["totals"], {"item_count": 0, "subtotal": "0.00"})
+
+    def test_updates_cannot_move_a_line_to_another_product(self):
+        self.add(self.shirt, 2)
+        self.add(self.hat, 1)
+        shirt_line = CartItem.objects.get(product=self.shirt)
+        response = self.client.patch(f"/cart/items/{shirt_line.pk}/", {"product": self.hat.pk, "quantity": 3},
+                                     content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["product"], self.shirt.pk)
+        self.assertEqual(dict(CartItem.objects.values_list("product_id", "quantity")), {1: 3, 2: 1})
+        self.assertEqual(response.json()["totals"], {"item_count": 4, "subtotal": "35.50"})
+
+    def test_writers_lock_the_cart_before_its_lines(self):
+        cart = Cart.objects.create(user=self.user)
+
+        def tables(write):
+            # Whether the cart row is locked before the first write to its lines.
+            with CaptureQueriesContext(connection) as queries:
+                write()
+            sql = [query["sql"] for query in queries]
+            lock = next((i for i, query in enumerate(sql)
+                         if query.startswith('SELECT "cart_cart"."id" FROM "cart_cart"')), len(sql))
+            first_write = next(i for i, query in enumerate(sql)
+                               if query.startswith(('INSERT INTO "cart_cartitem"', 'UPDATE "cart_cartitem"',
+                                                    'DELETE FROM "cart_cartitem"')))
+            return lock < first_write
+
+        self.assertTrue(tables(lambda: cart.add_item(self.shirt, 1)))
+        self.assertTrue(tables(lambda: cart.apply_operations([{"product": 2, "quantity": 1, "op": "add"}])))
+        line = CartItem.objects.get(product=self.shirt)
+        self.assertTrue(tables(lambda: self.client.patch(f"/cart/items/{line.pk}/", {"quantity": 3},
+                                                         content_type="application/json")))
+        self.assertTrue(tables(lambda: self.client.delete(f"/cart/items/{line.pk}/")))
+        self.assertTrue(tables(lambda: self.client.post("/cart/clear/")))
+
+    def test_items_of_other_users_are_not_reachable(self):
+        other = Cart.objects.create(user=User.objects.create_user("someone-else"))
+        line = CartItem.objects.create(cart=other, product=self.shirt, quantity=1, unit_price="10.50")
+        self.assertEqual(self.client.delete(f"/cart/items/{line.pk}/").status_code, 404)
+
+    def test_lines_keep_the_price_they_were_added_at(self):
+        self.add(self.shirt, 1)
+        Product.objects.filter(pk=self.shirt.pk).update(price="20.00")
+        self.add(self.shirt, 1)
+        self.assertEqual(self.client.get("/cart/").json()["totals"], {"item_count": 2, "subtotal": "21.00"})
+        line = CartItem.objects.get(product=self.shirt)
+        self.client.delete(f"/cart/items/{line.pk}/")
+        self.assertEqual(self.client.get("/cart/").json()["totals"], {"item_count": 0, "subtotal": "0.00"})
+
+        self.add(self.hat, 2)
+        Product.objects.filter(pk=self.hat.pk).update(price="5.00")
+        self.client.post("/cart/batch/", [{"product": 2, "quantity": 3, "op": "set"}], content_type="application/json")
+        self.assertEqual(self.client.get("/cart/").json()["totals"], {"item_count": 3, "subtotal": "12.00"})
+        response = self.client.post("/cart/batch/", [{"product": 2, "op": "remove"}], content_type="application/json")
+        self.assertEqual(response.json(), {"items": [], "totals": {"item_count": 0, "subtotal": "0.00"}})
+
+    def test_check_command_detects_and_repairs_drift(self):
+        self.add(self.shirt, 2)
+        Cart.objects.filter(user=self.user).update(subtotal="11.00")
+        out = io.StringIO()
+        call_command("check_cart_totals", stdout=out)
+        self.assertIn("1 cart(s) drifted", out.getvalue())
+
+        call_command("check_cart_totals", "--repair", stdout=io.StringIO())
+        self.assertEqual(Cart.objects.get(user=self.user).totals(), {"item_count": 2, "subtotal": "21.00"})
+        out = io.StringIO()
+        call_command("check_cart_totals", stdout=out)
+        self.assertIn("consistent", out.getvalue())
+
+
+class CartReadQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("reader", password="secret-password")
+        self.client.force_login(self.user)
+        Product.objects.bulk_create([
+            Product(id=i, title=f"P{i}", price="2.50", description="d", image="https://example.com/i.jpg")
+            for i in range(1, 51)
+        ])
+
+    def session_cart(self, lines):
+        request = RequestFactory().get("/")
+        request.session = SessionStore()
+        cart = SessionCart(request)
+        for i in range(1, lines + 1):
+            cart.add({"id": i, "price": "2.50"}, quantity=2)
+        return cart
+
+    def test_session_cart_iteration_runs_one_query_and_leaves_session_alone(self):
+        for lines in (1, 50):
+            cart = self.session_cart(lines)
+            stored = json.dumps(cart.cart, sort_keys=True)
+            with self.assertNumQueries(1):
+                items = list(cart)
+            self.assertEqual(len(items), lines)
+            self.assertEqual(items[0]["product"]["id"], 1)
+            self.assertEqual(items[0]["total_price"], Decimal("5.00"))
+            self.assertEqual(json.dumps(cart.cart, sort_keys=True), stored)
+
+    def test_cart_listing_query_count_does_not_grow_with_cart_size(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product_id=1, unit_price="2.50")
+        self.client.get("/cart/")
+        with self.assertNumQueries(4) as small:
+            self.client.get("/cart/")
+        CartItem.objects.bulk_create([CartItem(cart=cart, product_id=i, unit_price="2.50") for i in range(2, 51)])
+        with self.assertNumQueries(len(small)):
+            response = self.client.get("/cart/")
+        self.assertEqual(len(response.json()["items"]), 50)
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("batcher", password="secret-password")
+        self.client.force_login(self.user)
+        Product.objects.bulk_create([
+            Product(id=i, title=f"P{i}", price="2.00", description="d", image="https://example.com/i.jpg")
+            for i in range(1, 6)
+        ])
+
+    def batch(self, operations):
+        return self.client.post("/cart/batch/", operations, content_type="application/json")
+
+    def test_operations_are_merged_per_product(self):
+        self.batch([{"product": 1, "quantity": 2}, {"product": 2, "quantity": 1}])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.batch([
+                {"product": 1, "quantity": 3},
+                {"product": 1, "quantity": 1, "op": "add"},
+                {"product": 2, "op": "remove"},
+                {"product": 3, "quantity": 4, "op": "set"},
+                {"product": 4, "quantity": 1},
+                {"product": 4, "quantity": 0, "op": "set"},
+            ])
+        body = response.json()
+        self.assertEqual(body["items"], [{"product": 1, "quantity": 6}, {"product": 3, "quantity": 4}])
+        self.assertEqual(body["totals"], {"item_count": 10, "subtotal": "20.00"})
+        self.assertEqual(CartItem.objects.count(), 2)
+
+        # The same kinds of operations, three times as many: as many queries.
+        with CaptureQueriesContext(connection) as more_queries:
+            self.batch([
+                {"product": product, "quantity": 1, "op": op}
+                for op in ("add", "add", "set") for product in (1, 2, 3, 5)
+            ] + [{"product": 3, "op": "remove"}] * 6)
+        self.assertEqual(len(more_queries), len(queries))
+
+    @override_settings(CART_BATCH_MAX_OPERATIONS=2)
+    def test_long_batches_are_rejected_before_validation(self):
+        response = self.batch([{"product": 1}, {"product": 2}, {"product": "not a product"}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "At most 2 operations per batch."})
+
+    def test_adding_a_product_twice_merges_the_line(self):
+        self.client.post("/cart/", {"product": 1, "quantity": 2}, content_type="application/json")
+        response = self.client.post("/cart/", {"product": 1, "quantity": 3}, content_type="application/json")
+        self.assertEqual(response.json()["quantity"], 5)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+    def test_invalid_batches_change_nothing(self):
+        self.assertEqual(self.batch([{"product": 1}, {"product": 99}]).status_code, 400)
+        self.assertEqual(self.batch([{"product": 1, "op": "explode"}]).status_code, 400)
+        self.assertFalse(CartItem.objects.exists())
+
+
+def add_to_session_cart(request):
+    cart = SessionCart(request)
+    cart.add({"id": int(request.GET["product"]), "price": "2.00"}, quantity=int(request.GET.get("quantity", 1)))
+    return HttpResponse(str(len(cart)))
+
+
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db")
+class CartStorageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("storer", password="secret-password")
+        Product.objects.bulk_create([
+            Product(id=i, title=f"P{i}", price="2.00", description="d", image="https://example.com/i.jpg")
+            for i in range(1, 4)
+        ])
+        self.factory = RequestFactory()
+        self.handler = SessionMiddleware(CartStorageMiddleware(add_to_session_cart))
+
+    def add(self, product, quantity=1, user=None):
+        request = self.factory.get("/", {"product": product, "quantity": quantity})
+        request.user = user or self.user
+        response = self.handler(request)
+        self.factory.cookies.update(response.cookies)
+        return int(response.content)
+
+    def test_every_backend_keeps_the_cart_across_requests(self):
+        for storage in ("Session", "SignedCookie"):
+            with self.subTest(storage), override_settings(CART_STORAGE=f"cart.storage.{storage}CartStorage"):
+                self.factory.cookies.clear()
+                CartItem.objects.all().delete()
+                self.assertEqual(self.add(1, 2), 2)
+                self.assertEqual(self.add(2, 1), 3)
+                self.assertEqual(self.add(1, 1), 4)
+
+    def test_authenticated_carts_live_in_the_cart_tables_whatever_the_backend(self):
+        for storage in ("Session", "SignedCookie"):
+            with self.subTest(storage), override_settings(CART_STORAGE=f"cart.storage.{storage}CartStorage"):
+                self.client.force_login(self.user)
+                response = self.client.post("/cart/", {"product": 1, "quantity": 2}, content_type="application/json")
+                self.assertEqual(response.status_code, 201)
+                cart = Cart.objects.get(user=self.user)
+                self.assertEqual(cart.items.get(product_id=1).quantity, 2)
+                self.assertEqual(get_storage().load(response.wsgi_request), {})
+                cart.delete()
+
+    def test_guest_carts_persist_through_the_cart_api(self):
+        for storage in ("Session", "SignedCookie"):
+            with self.subTest(storage), override_settings(CART_STORAGE=f"cart.storage.{storage}CartStorage"):
+                client = Client()
+                response = client.post("/cart/", {"product": 1, "quantity": 2}, content_type="application/json")
+                self.assertEqual(response.status_code, 201)
+                items = client.get("/cart/").json()["items"]
+                self.assertEqual([(item["product"], item["quantity"]) for item in items], [(1, 2)])
+                self.assertFalse(CartItem.objects.exists())
+
+    @override_settings(CART_STORAGE="cart.storage.SignedCookieCartStorage")
+    def test_signed_cookie_backend_is_stateless_and_rejects_tampering(self):
+        with self.assertNumQueries(0):
+            self.add(1, 2)
+        value = self.factory.cookies["cart"].value
+        self.factory.cookies["cart"] = value[:-2] + ("AA" if not value.endswith("AA") else "BB")
+        self.assertEqual(self.add(2, 1), 1)
+
+
+class GuestCartTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("guest", password="secret-password")
+        Product.objects.bulk_create([
+            Product(id=i, title=f"P{i}", price="2.00", description="d", image="https://example.com/i.jpg")
+            for i in range(1, 5)
+        ])
+
+    def test_anonymous_requests_do_not_touch_database_carts(self):
+        response = self.client.post("/cart/", {"product": 1, "quantity": 2})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {"product": 1, "quantity": 2, "totals": {"item_count": 2, "subtotal": "4.00"}})
+        self.client.post("/cart/batch/", [{"product": 2, "quantity": 1}, {"product": 1, "op": "remove"}],
+                         content_type="application/json")
+        self.assertEqual(self.client.get("/cart/").json()["items"], [{"product": 2, "quantity": 1}])
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_anonymous_quantities_below_one_leave_the_guest_cart_unchanged(self):
+        self.client.post("/cart/", {"product": 1, "quantity": 2})
+        response = self.client.post("/cart/", {"product": 1, "quantity": -3})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get("/cart/").json()["totals"], {"item_count": 2, "subtotal": "4.00"})
+
+        request = RequestFactory().get("/cart/")
+        request.session = self.client.session
+        cart = SessionCart(request)
+        with self.assertRaises(ValueError):
+            cart.add({"id": 1, "price": "2.00"}, quantity=-3)
+        self.assertEqual(cart.totals(), {"item_count": 2, "subtotal": "4.00"})
+
+    def test_login_merges_guest_cart_with_one_upsert(self):
+        cart = Cart.objects.create(user=self.user)
+        cart.apply_operations([{"product": 1, "quantity": 1, "op": "add"}])
+        self.client.post("/cart/batch/", [{"product": 1, "quantity": 2}, {"product": 3, "quantity": 1}],
+                         content_type="application/json")
+        Product.objects.filter(pk=3).delete()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.login(username="guest", password="secret-password")
+        upserts = [query["sql"] for query in queries if query["sql"].startswith('INSERT INTO "cart_cartitem"')]
+        self.assertEqual(len(upserts), 1)
+        self.assertEqual(dict(cart.items.values_list("product_id", "quantity")), {1: 3})
+        cart.refresh_from_db()
+        self.assertEqual(cart.totals(), {"item_count": 3, "subtotal": "6.00"})
+        self.assertEqual(self.client.get("/cart/").json()["totals"], {"item_count": 3, "subtotal": "6.00"})
+        self.client.logout()
+        self.assertEqual(self.client.get("/cart/").json()["items"], [])
+
+
+class ProductConditionalGetTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        Product.objects.bulk_create([
+            Product(id=i, title=f"P{i}", price="1.00", description="d", image="https://example.com/i.jpg")
+            for i in range(1, 4)
+        ])
+
+    def test_unchanged_list_is_answered_with_304_without_loading_products(self):
+        response = self.client.get("/products/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("public", response["Cache-Control"])
+        self.assertIn("s-maxage", response["Cache-Control"])
+        with self.assertNumQueries(1):
+            cached = self.client.get("/products/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b"")
+        self.assertEqual(cached["ETag"], response["ETag"])
+        since = self.client.get("/products/", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+    def test_etag_changes_with_products_and_query(self):
+        etag = self.client.get("/products/")["ETag"]
+        self.assertNotEqual(self.client.get("/products/", {"page_size": 1})["ETag"], etag)
+        product = Product.objects.get(pk=2)
+        product.price = Decimal("5.00")
+        product.save()
+        response = self.client.get("/products/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        etag = response["ETag"]
+        sync_products([{"id": 9, "title": "New", "price": 3}])
+        self.assertEqual(self.client.get("/products/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(CATALOG_SOURCE="upstream")
+    def test_upstream_catalog_is_part_of_the_validators(self):
+        with StubUpstream(products=make_products(4)) as stub, override_settings(CATALOG_URL=stub.url, CATALOG_TTL=0, CATALOG_STALE_TTL=0):
+            first = self.client.get("/productapi/")
+            self.assertEqual(self.client.get("/productapi/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+            fetched = stub.request_count
+            detail = self.client.get("/products/1/")
+            self.assertEqual(self.client.get("/products/1/", HTTP_IF_NONE_MATCH=detail["ETag"]).status_code, 304)
+            # Database rows are validated without asking the upstream catalog.
+            self.assertEqual(stub.request_count, fetched)
+            fallback = self.client.get("/products/4/")
+            self.assertEqual(fallback.json()["title"], "Product 4")
+            self.assertEqual(self.client.get("/products/4/", HTTP_IF_NONE_MATCH=fallback["ETag"]).status_code, 304)
+            stub.products.append({**make_products(5)[-1]})
+            self.assertEqual(self.client.get("/productapi/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+            self.assertEqual(self.client.get("/products/4/", HTTP_IF_NONE_MATCH=fallback["ETag"]).status_code, 200)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        Product.objects.bulk_create([
+            Product(id=i, title=f"P{i}", price="1.00", description="d", image="https://example.com/i.jpg")
+            for i in range(1, 4)
+        ])
+
+    def test_rendered_list_is_served_from_cache_until_a_product_changes(self):
+        first = self.client.get("/products/", {"page_size": 2})
+        with self.assertNumQueries(1):
+            second = self.client.get("/products/", {"page_size": 2})
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Link"], first["Link"])
+        self.assertEqual(second["ETag"], first["ETag"])
+        product = Product.objects.get(pk=1)
+        product.title = "Renamed"
+        product.save()
+        self.assertEqual(self.client.get("/products/", {"page_size": 2}).json()["data"][0]["title"], "Renamed")
+        product.delete()
+        self.assertEqual(self.client.get("/products/", {"page_size": 2}).json()["data"][0]["id"], 2)
+
+    def test_browsable_api_is_not_cached(self):
+        self.client.get("/products/", HTTP_ACCEPT="text/html")
+        self.assertEqual(self.client.get("/products/").status_code, 200)
+        with self.assertNumQueries(2):
+            self.client.get("/products/", HTTP_ACCEPT="text/html")
+
+    def test_concurrent_miss_waits_for_the_rendering_caller(self):
+        key = cache_key("products", RequestFactory().get("/products/"), catalog_validators(upstream=False)[0])
+        cache = get_cache()
+        cache.add(f"{key}:lock", 1)
+        entry = {"content": b'{"data": [], "next": null}', "content_type": "application/json", "headers": {}}
+        threading.Timer(0.05, cache.set, args=(key, entry)).start()
+        with self.assertNumQueries(1):
+            response = self.client.get("/products/")
+        self.assertEqual(response.json(), {"data": [], "next": None})
+
+
+class FastSerializerTests(TestCase):
+    def setUp(self):
+        Product.objects.bulk_create([
+            Product(id=1, title="Plain", price="9.99", description="d", image="https://example.com/1.jpg"),
+            Product(id=2, title="Caf\u00e9 \u2028 \"quoted\" \\ \U0001F600", price="0.5", category="Men's",
+                    description="line\nbreak\ttab\u2029", image="https://example.com/2.jpg"),
+            Product(id=3, name="", title="", price="1000000.00", description="", image=""),
+        ])
+        user = User.objects.create_user("fast")
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, product_id=1, quantity=2, unit_price="9.99"),
+                                     CartItem(cart=cart, product=None, unit_price=0)])
+
+    def assertSameJSON(self, serializer_class, queryset, fields=None):
+        kwargs = {} if fields is None else {"fields": fields}
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, **kwargs).data)
+        fast = get_fast_serializer(serializer_class, None if fields is None else tuple(fields))
+        self.assertEqual(FastJSONRenderer().render(fast.serialize(fast.values(queryset))), expected)
+        self.assertEqual(JSONRenderer().render(fast.serialize(fast.values(queryset))), expected)
+
+    def test_output_matches_model_serializers_byte_for_byte(self):
+        products = Product.objects.order_by("id")
+        self.assertSameJSON(ProductSerializer, products)
+        self.assertSameJSON(ProductSerializer, products, fields=["price", "id"])
+        self.assertSameJSON(ProductDetailSerializer, products)
+        self.assertSameJSON(CartSerializer, CartItem.objects.order_by("id"))
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            "text": "\u00e9\u2028\u2029\x00\x1f</script>", "int": 2 ** 70, "float": 0.1, "score": 12.3456,
+            "decimal": Decimal("1.50"), "none": None, "bool": True, 7: "int key",
+            "nested": [{"a": []}, (1, 2)], "when": Product.objects.get(pk=1).updated_at,
+        }
+        # With orjson when it is installed, and with the standard library encoder.
+        for orjson in (cart.renderers.orjson, None):
+            with mock.patch("cart.renderers.orjson", orjson):
+                for accept in (None, "application/json", "application/json; indent=4"):
+                    self.assertEqual(FastJSONRenderer().render(data, accept), JSONRenderer().render(data, accept))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    @override_settings(CATALOG_SOURCE="database")
+    def test_endpoints_render_as_before(self):
+        detail = self.client.get("/products/2/")
+        self.assertEqual(detail.content, JSONRenderer().render(ProductDetailSerializer(Product.objects.get(pk=2)).data))
+        listing = self.client.get("/products/", {"ordering": "-price", "fields": "title"})
+        expected = ProductSerializer(Product.objects.order_by("-price", "-id"), many=True, fields=["title"]).data
+        self.assertEqual(listing.content, JSONRenderer().render({"data": expected, "next": None}))
+
+
+class ProductExportTests(TestCase):
+    def setUp(self):
+        Product.objects.bulk_create([
+            Product(id=i, title=f"P{i}", price="1.00", description=f"line, {i}\n\"quoted\"", image="https://example.com/i.jpg")
+            for i in range(1, 6)
+        ])
+
+    def export(self, **params):
+        response = self.client.get("/products/export/", params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_jsonl_and_csv_hold_every_product(self):
+        lines = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual([item["id"] for item in lines], [1, 2, 3, 4, 5])
+        self.assertEqual(lines[0]["description"], 'line, 1\n"quoted"')
+        rows = list(csv.DictReader(io.StringIO(self.export(format="csv").decode())))
+        self.assertEqual([row["id"] for row in rows], ["1", "2", "3", "4", "5"])
+        self.assertEqual(rows[0], {key: str(value) for key, value in lines[0].items()})
+
+    def test_gzip_and_updated_since(self):
+        Product.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        response = self.client.get("/products/export/", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), self.export())
+        since = response["X-Export-Timestamp"]
+        self.assertLess(datetime.fromisoformat(since), timezone.now() - timedelta(seconds=59))
+        # Changes stamped shortly before the export started may commit after it read the table.
+        Product.objects.filter(pk__in=[2, 4]).update(updated_at=timezone.now() - timedelta(seconds=30))
+        lines = self.export(updated_since=since).splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], [2, 4])
+        self.assertEqual(self.export(format="csv", updated_since="2999-01-01T00:00:00").decode().strip(),
+                         "id,name,title,price,category,description,image,updated_at")
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get("/products/export/", {"format": "xml"}).status_code, 400)
+        self.assertEqual(self.client.get("/products/export/", {"updated_since": "yesterday"}).status_code, 400)
+
+    def test_memory_stays_flat_on_a_large_catalog(self):
+        # EXPORT_TEST_ROWS=1000000 runs this on the full-size fixture.
+        rows = int(os.environ.get("EXPORT_TEST_ROWS", 50000))
+        Product.objects.bulk_create([
+            Product(id=i, title=f"Product {i}", price="9.99", description="Synthetic product " * 5,
+                    image=f"https://example.com/{i}.jpg")
+            for i in range(6, rows + 1)
+        ], batch_size=5000)
+        response = self.client.get("/products/export/")
+        tracemalloc.start()
+        try:
+            exported, samples = 0, []
+            for block in response.streaming_content:
+                exported += block.count(b"\n")
+                samples.append(tracemalloc.get_traced_memory()[0])
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(exported, rows)
+        # Memory held while streaming stays bounded by the chunk size, not the row count.
+        self.assertLess(peak, 8 * 1024 * 1024)
+        warm = samples[len(samples) // 5]
+        self.assertLess(max(samples[len(samples) // 5:]) - warm, 1024 * 1024)
+
+
+class DatabaseProfileTests(TransactionTestCase):
+    def test_sqlite_connections_are_tuned(self):
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            Product.objects.create(id=1, title="P", price="1.00", description="d", image="https://example.com/1.jpg")
+        self.assertEqual(queries[0]["sql"], "BEGIN IMMEDIATE")
+
+    def test_unusable_persistent_connection_is_closed_at_request_start(self):
+        connection.ensure_connection()
+        with mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=60), \
+                mock.patch.object(connection, "close") as close:
+            check_persistent_connections()
+            close.assert_not_called()
+            with mock.patch.object(connection, "is_usable", return_value=False):
+                check_persistent_connections()
+            close.assert_called_once_with()
+
+
+class CartQuantityValidationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("careful")
+        self.client.force_login(self.user)
+        Product.objects.create(id=1, title="Shirt", price="10.50", description="d", image="https://example.com/1.jpg")
+
+    def test_quantities_below_one_are_rejected(self):
+        for quantity in (0, -3):
+            response = self.client.post("/cart/", {"product": 1, "quantity": quantity}, content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("quantity", response.json())
+        self.assertFalse(CartItem.objects.exists())
+
+        item = self.client.post("/cart/", {"product": 1}, content_type="application/json").json()
+        self.assertEqual(item["quantity"], 1)
+        line = CartItem.objects.get()
+        response = self.client.put(f"/cart/items/{line.pk}/", {"product": 1, "quantity": -1}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Cart.objects.get(user=self.user).item_count, 1)
+
+
+class CartConcurrencyTests(TransactionTestCase):
+    def test_concurrent_adds_to_one_cart_are_all_counted(self):
+        user = User.objects.create_user("rush")
+        shirt = Product.objects.create(id=1, title="Shirt", price="10.50", description="d", image="https://example.com/1.jpg")
+        threads, adds = 8, 10
+        clients = [Client() for _ in range(threads)]
+        for client in clients:
+            client.force_login(user)
+        start = threading.Barrier(threads)
+        failures = []
+
+        def shopper(client):
+            start.wait()
+            try:
+                for _ in range(adds):
+                    response = client.post("/cart/", {"product": shirt.pk, "quantity": 1}, content_type="application/json")
+                    if response.status_code != 201:
+                        failures.append(response.status_code)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=shopper, args=(client,)) for client in clients]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(failures, [])
+        cart = Cart.objects.get(user=user)
+        self.assertEqual(list(cart.items.values_list("product", "quantity")), [(1, threads * adds)])
+        self.assertEqual((cart.item_count, cart.subtotal), (threads * adds, Decimal("10.50") * threads * adds))
+
+
+@override_settings(CATALOG_SOURCE="database", RESPONSE_CACHE_ENABLED=False, SERVER_TIMING_ENABLED=True)
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        Product.objects.create(id=1, title="Shirt", price="10.50", description="d", image="https://example.com/1.jpg")
+
+    def timing(self, response):
+        entries = [entry.split(";") for entry in response["Server-Timing"].split(", ")]
+        return {name: dict(param.split("=", 1) for param in params) for name, *params in entries}
+
+    def test_server_timing_and_histograms(self):
+        response = self.client.get("/products/1/")
+        timing = self.timing(response)
+        # The catalog version and the product.
+        self.assertEqual(timing["db"]["desc"], '"2 queries"')
+        self.assertEqual(timing["upstream"]["desc"], '"0 calls"')
+        self.assertGreater(float(timing["total"]["dur"]), 0)
+
+        with override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"]):
+            exposition = self.client.get("/metrics/").content.decode()
+        labels = 'endpoint="/products/<int:pk>/",method="GET"'
+        self.assertIn(f"shopping_request_duration_seconds_count{{{labels}}} 1", exposition)
+        self.assertIn(f"shopping_request_db_queries_sum{{{labels}}} 2", exposition)
+        self.assertIn(f"shopping_response_size_bytes_sum{{{labels}}} {len(response.content)}", exposition)
+
+    def test_upstream_time_is_counted(self):
+        with StubUpstream(latency=0.02) as stub, \
+                override_settings(CATALOG_SOURCE="upstream", CATALOG_URL=stub.url, CATALOG_TTL=0, CATALOG_STALE_TTL=0):
+            response = self.client.get("/products/5/")
+        timing = self.timing(response)
+        # The product, missing from the database, then the catalog for its validators.
+        self.assertEqual(timing["upstream"]["desc"], '"2 calls"')
+        self.assertGreaterEqual(float(timing["upstream"]["dur"]), 40)
+
+    def test_slow_requests_are_logged(self):
+        with override_settings(SLOW_REQUEST_SECONDS=1e-9), self.assertLogs("cart.middleware", "WARNING") as logs:
+            self.client.get("/products/1/")
+        self.assertIn("Slow request GET /products/1/: 200", logs.output[0])
+        with override_settings(SLOW_REQUEST_SECONDS=0), self.assertNoLogs("cart.middleware", "WARNING"):
+            self.client.get("/products/1/")
+
+    def test_server_timing_can_be_turned_off(self):
+        with override_settings(SERVER_TIMING_ENABLED=False):
+            self.assertNotIn("Server-Timing", self.client.get("/products/1/"))
+
+    def test_metrics_answer_staff_and_allowed_addresses_only(self):
+        # Nobody but staff is answered until the scraper's address is allowed.
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        with override_settings(METRICS_ALLOWED_IPS=["203.0.113.9"]):
+            self.assertEqual(self.client.get("/metrics/", REMOTE_ADDR="203.0.113.9").status_code, 200)
+            self.assertEqual(self.client.get("/metrics/", REMOTE_ADDR="203.0.113.7").status_code, 403)
+        self.client.force_login(User.objects.create_user("ops", is_staff=True))
+        self.assertEqual(self.client.get("/metrics/", REMOTE_ADDR="203.0.113.7").status_code, 200)
+
+
+class FactoryTests(TestCase):
+    def test_seed_is_reproducible_and_keeps_cart_totals(self):
+        data = seed(products=30, users=4, items_per_cart=3, first_product_id=101, seed=7)
+        self.assertEqual(data["products"], list(range(101, 131)))
+        first = list(CartItem.objects.order_by("pk").values_list("product", "quantity"))
+        for cart in Cart.objects.all():
+            self.assertEqual((cart.item_count, cart.subtotal), cart.compute_totals())
+        self.assertTrue(self.client.login(username=data["users"][0].username, password="load-test-password"))
+
+        CartItem.objects.all().delete()
+        Cart.objects.all().delete()
+        User.objects.all().delete()
+        Product.objects.all().delete()
+        seed(products=30, users=4, items_per_cart=3, first_product_id=101, seed=7)
+        self.assertEqual(list(CartItem.objects.order_by("pk").values_list("product", "quantity")), first)
+
+    def test_item_factory_builds_its_cart_and_product(self):
+        item = CartItemFactory(quantity=2)
+        self.assertEqual(item.cart.items.get().product, item.product)
+
+
+class RegistrationTests(TestCase):
+    def test_register(self):
+        body = {"username": "newcomer", "email": "new@example.com", "password": "a-long-password",
+                "first_name": "New", "last_name": "Comer"}
+        response = self.client.post("/register/", body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["User"]["username"], "newcomer")
+        response = self.client.post("/register/", body, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.json()["Errors"])
+
+
+class TokenAuthTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bearer", password="secret-password")
+        self.shirt = Product.objects.create(id=1, title="Shirt", price="10.50", description="d", image="https://example.com/1.jpg")
+        response = self.client.post("/token/", {"username": "bearer", "password": "secret-password"},
+                                    content_type="application/json")
+        self.tokens = response.json()
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {self.tokens['access']}"}
+
+    def test_cart_endpoints_skip_session_and_user_queries(self):
+        self.client.post("/cart/", {"product": 1, "quantity": 2}, content_type="application/json", **self.auth)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/cart/", **self.auth)
+        self.assertEqual(response.json()["totals"], {"item_count": 2, "subtotal": "21.00"})
+        tables = " ".join(query["sql"] for query in queries)
+        self.assertNotIn("django_session", tables)
+        self.assertNotIn("auth_user", tables)
+        # The cart, by the id in the token, then its items.
+        self.assertEqual(len(queries), 2)
+
+    def test_token_login_merges_the_guest_cart(self):
+        for storage in ("Session", "SignedCookie"):
+            with self.subTest(storage), override_settings(CART_STORAGE=f"cart.storage.{storage}CartStorage"):
+                client = Client()
+                client.post("/cart/", {"product": 1, "quantity": 2}, content_type="application/json")
+                self.assertFalse(CartItem.objects.exists())
+                response = client.post("/token/", {"username": "bearer", "password": "secret-password"},
+                                       content_type="application/json")
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(CartItem.objects.get(cart__user=self.user).quantity, 2)
+                self.assertEqual(client.get("/cart/").json()["items"], [])
+                CartItem.objects.all().delete()
+
+    def test_refresh_keeps_the_claims(self):
+        response = self.client.post("/token/refresh/", {"refresh": self.tokens["refresh"]},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {response.json()['access']}"}
+        self.assertEqual(self.client.post("/cart/clear/", **auth).status_code, 204)
+
+    def test_invalid_token_is_rejected(self):
+        self.assertEqual(self.client.get("/cart/", HTTP_AUTHORIZATION="Bearer not-a-token").status_code, 401)
+
+    def test_permissions_follow_the_user_not_the_token(self):
+        self.assertNotIn("is_staff", AccessToken(self.tokens["access"]).payload)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        body = json.dumps(make_products(1))
+        response = self.client.post("/products/bulk/", body, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 200)
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+        response = self.client.post("/products/bulk/", body, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 403)
+
+    def test_refresh_rejects_inactive_users(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post("/token/refresh/", {"refresh": self.tokens["refresh"]},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(CATALOG_SOURCE="database")
+class WarmUpTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        get_cache().clear()
+        Product.objects.create(id=1, title="Shirt", price="10.50", description="d", image="https://example.com/1.jpg")
+
+    def test_warm_up_fills_the_response_cache(self):
+        timings = warm_up(paths=["/products/"])
+        self.assertEqual(set(timings), {"urls", "serializers", "catalog", "requests", "database"})
+        self.assertIsNotNone(connection.connection)
+        response = self.client.get("/products/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(metrics.value("response_cache_hits"), 1)
+
+    def test_unavailable_upstream_does_not_stop_the_warm_up(self):
+        with StubUpstream(status=503) as stub, \
+                override_settings(CATALOG_SOURCE="upstream", CATALOG_URL=stub.url, UPSTREAM_RETRIES=0), \
+                self.assertLogs("cart.warmup", "WARNING") as logs:
+            timings = warm_up(paths=[])
+        self.assertIn("could not fetch the upstream catalog", logs.output[0])
+        self.assertIn("database", timings)
+
+
+class CategoryFacetTests(TestCase):
+    def setUp(self):
+        for pk, price, category in ((1, "10.00", "books"), (2, "25.00", "books"), (3, "40.00", "books"), (4, "5.50", "garden")):
+            Product.objects.create(id=pk, title=f"P{pk}", price=price, category=category,
+                                   description="d", image="https://example.com/1.jpg")
+
+    def assertFacetsMatchProducts(self):
+        expected = Product.objects.order_by("category").values("category").annotate(
+            product_count=Count("id"), min_price=Min("price"), max_price=Max("price"))
+        facets = CategoryFacet.objects.order_by("category").values("category", "product_count", "min_price", "max_price")
+        self.assertEqual(list(facets), list(expected))
+
+    def test_facets_follow_saves_and_deletes(self):
+        self.assertFacetsMatchProducts()
+        product = Product.objects.get(pk=2)
+        product.price = "99.00"
+        product.save()
+        self.assertFacetsMatchProducts()
+        product.category = "garden"
+        product.save()
+        self.assertFacetsMatchProducts()
+        Product.objects.get(pk=3).delete()
+        Product.objects.filter(category="garden").delete()
+        self.assertFacetsMatchProducts()
+        self.assertFalse(CategoryFacet.objects.filter(category="garden").exists())
+
+    def test_price_edits_at_the_ends_of_the_range(self):
+        for pk, price in ((1, "12.00"), (3, "30.00"), (1, "8.00"), (2, "45.00"), (4, "6.00")):
+            product = Product.objects.get(pk=pk)
+            product.price = price
+            product.save()
+            self.assertFacetsMatchProducts()
+        self.assertEqual(CategoryFacet.objects.get(category="books").product_count, 3)
+
+    def test_saves_over_unloaded_rows_recompute_only_their_categories(self):
+        with mock.patch.object(CategoryFacet, "refresh", wraps=CategoryFacet.refresh) as refresh:
+            Product(id=4, title="P4", price="1.00", category="books", description="d", image="https://example.com/1.jpg").save()
+        self.assertFacetsMatchProducts()
+        self.assertNotIn(mock.call(), refresh.call_args_list)
+
+    def test_rebuild_command_reconciles_bulk_updates(self):
+        Product.objects.filter(pk=4).update(category="books")
+        call_command("rebuild_facets", stdout=io.StringIO())
+        self.assertFacetsMatchProducts()
+
+    def test_facets_follow_bulk_imports(self):
+        sync_products([
+            {"id": 1, "title": "Moved", "price": 10, "category": "toys"},
+            {"id": 5, "title": "New", "price": 1, "category": "books"},
+        ])
+        self.assertFacetsMatchProducts()
+
+    def test_endpoint_reads_only_the_facet_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/products/facets/")
+        # The catalog version, for the validators, then the facets.
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"cart_product"', queries[1]["sql"])
+        self.assertEqual(response.json(), {
+            "categories": [
+                {"category": "books", "count": 3, "min_price": "10.00", "max_price": "40.00"},
+                {"category": "garden", "count": 1, "min_price": "5.50", "max_price": "5.50"},
+            ],
+            "total": {"count": 4, "min_price": "5.50", "max_price": "40.00"},
+        })
+        self.assertEqual(self.client.get("/products/facets/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("buyer")
+        self.client.force_login(self.user)
+        self.shirt = Product.objects.create(id=1, title="Shirt", price="10.50", stock=5, description="d", image="https://example.com/1.jpg")
+        self.hat = Product.objects.create(id=2, title="Hat", price="4.00", stock=1, description="d", image="https://example.com/2.jpg")
+        self.cart = Cart.objects.create(user=self.user)
+        self.cart.add_item(self.shirt, 2)
+        self.cart.add_item(self.hat, 1)
+
+    def stock(self):
+        return dict(Product.objects.values_list("id", "stock"))
+
+    def test_checkout_reserves_stock_and_empties_the_cart(self):
+        response = self.client.post("/checkout/")
+        self.assertEqual(response.status_code, 201)
+        order = response.json()
+        self.assertEqual((order["status"], order["total"]), ("reserved", "25.00"))
+        self.assertEqual(sorted((line["product"], line["quantity"]) for line in order["lines"]), [(1, 2), (2, 1)])
+        self.assertEqual(self.stock(), {1: 3, 2: 0})
+        self.cart.refresh_from_db()
+        self.assertEqual((self.cart.items.count(), self.cart.item_count), (0, 0))
+        self.assertEqual(self.client.post("/checkout/").status_code, 400)
+
+        response = self.client.post(f"/orders/{order['id']}/confirm/")
+        self.assertEqual(response.json()["status"], "confirmed")
+
+    def test_short_stock_reserves_nothing(self):
+        Product.objects.filter(pk=2).update(stock=0)
+        response = self.client.post("/checkout/")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["products"], [2])
+        self.assertEqual(self.stock(), {1: 5, 2: 0})
+        self.assertEqual(self.cart.items.count(), 2)
+        self.assertFalse(Order.objects.exists())
+
+    def test_expired_reservations_give_their_stock_back(self):
+        order_id = self.client.post("/checkout/").json()["id"]
+        Order.objects.filter(pk=order_id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.post(f"/orders/{order_id}/confirm/").status_code, 409)
+
+        # The next checkout short of stock releases the expired reservation first.
+        other = User.objects.create_user("late")
+        Cart.objects.create(user=other).add_item(self.hat, 1)
+        self.client.force_login(other)
+        self.assertEqual(self.client.post("/checkout/").status_code, 201)
+        self.assertEqual(Order.objects.get(pk=order_id).status, "expired")
+        self.assertEqual(self.stock(), {1: 5, 2: 0})
+        self.assertEqual(release_expired(), 0)
+
+    def test_product_saves_keep_the_stock_reserved_since_they_loaded(self):
+        stale = Product.objects.get(pk=1)
+        self.assertEqual(self.client.post("/checkout/").status_code, 201)
+        stale.title = "Linen shirt"
+        stale.save()
+        response = self.client.put("/products/1/", {"id": 1, "title": "Shirt", "price": "11.00", "description": "d",
+                                                     "image": "https://example.com/1.jpg"},
+                                   content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(), {1: 3, 2: 0})
+
+        self.assertTrue(Product.adjust_stock(1, 4))
+        self.assertFalse(Product.adjust_stock(2, -1))
+        out = io.StringIO()
+        call_command("adjust_stock", "1", "-2", stdout=out)
+        self.assertIn("5 units", out.getvalue())
+        self.assertEqual(self.stock(), {1: 5, 2: 0})
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+    def test_concurrent_checkouts_do_not_oversell(self):
+        stock, shoppers, threads = 25, 40, 8
+        shirt = Product.objects.create(id=1, title="Shirt", price="10.50", stock=stock, description="d", image="https://example.com/1.jpg")
+        clients = []
+        for n in range(shoppers):
+            user = User.objects.create_user(f"rush{n}")
+            Cart.objects.create(user=user).add_item(shirt, 1)
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        start = threading.Barrier(threads)
+        statuses = []
+
+        def shopper(mine):
+            start.wait()
+            try:
+                for client in mine:
+                    statuses.append(client.post("/checkout/").status_code)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=shopper, args=(clients[n::threads],)) for n in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(sorted(statuses), [201] * stock + [409] * (shoppers - stock))
+        shirt.refresh_from_db()
+        self.assertEqual(shirt.stock, 0)
+        self.assertEqual(Order.objects.count(), stock)
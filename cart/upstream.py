@@ -0,0 +1,195 @@
+"""
+Shared HTTP client for upstream (fakestoreapi.com) product calls.
+
+All upstream traffic goes through one pooled ``requests.Session`` so that
+connections are kept alive and reused. Each call has connect and read
+timeouts, idempotent requests are retried a bounded number of times with
+jittered exponential backoff, and a circuit breaker fails fast once the
+upstream has failed repeatedly.
+"""
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from requests.adapters import HTTPAdapter
+
+from cart import instrumentation, metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised instead of calling the upstream while the circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    A consecutive-failure circuit breaker.
+
+    The breaker opens after ``failure_threshold`` consecutive failures. Once
+    ``reset_timeout`` seconds have passed it lets a single trial call through
+    (half-open); success closes it again, failure reopens it. Every state
+    change increments the ``upstream_breaker_<state>`` counter.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check whether a call may go through, moving to half-open when due.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self._transition(self.HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self._opened_at = self.clock()
+                self._transition(self.OPEN)
+
+    def _transition(self, state):
+        logger.warning("Upstream circuit breaker %s -> %s", self.state, state)
+        self.state = state
+        metrics.incr(f'upstream_breaker_{state}')
+
+
+class UpstreamClient:
+    """
+    A pooled, retrying HTTP client guarded by a circuit breaker.
+
+    Args:
+        connect_timeout (float): Seconds to wait for a connection.
+        read_timeout (float): Seconds to wait for response data.
+        retries (int): Extra attempts for a failed idempotent request.
+        backoff (float): Base delay in seconds; attempt ``n`` sleeps up to ``backoff * 2**n``.
+        pool_size (int): Keep-alive connections kept per upstream host.
+        breaker (CircuitBreaker): Breaker shared by every call of this client.
+    """
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff=0.1,
+                 pool_size=10, breaker=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, timeout=None, **kwargs):
+        """
+        Send a GET request, retrying transient failures.
+
+        Connection errors, timeouts and 429/5xx answers are retried. The last
+        response is returned as is once retries are exhausted, so callers
+        decide how to treat its status.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            requests.RequestException: If every attempt failed without a response.
+        """
+        if not self.breaker.allow():
+            metrics.incr('upstream_short_circuited')
+            raise CircuitOpenError(f"Upstream circuit is open, not calling {url}")
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                with instrumentation.timer('upstream'):
+                    response = self.session.get(url, timeout=timeout or self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                metrics.incr('upstream_errors')
+                if last_attempt:
+                    self.breaker.record_failure()
+                    raise
+            except requests.RequestException:
+                # Not retried, but counted: a half-open breaker must not wait for a result forever.
+                metrics.incr('upstream_errors')
+                self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                metrics.incr('upstream_errors')
+                if last_attempt:
+                    self.breaker.record_failure()
+                    return response
+                response.close()
+            metrics.incr('upstream_retries')
+            time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def get_json(self, url, **kwargs):
+        """
+        GET ``url`` and decode its JSON body, raising on error statuses.
+        """
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Get the process-wide upstream client configured from settings.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = UpstreamClient(
+                    connect_timeout=settings.UPSTREAM_CONNECT_TIMEOUT,
+                    read_timeout=settings.UPSTREAM_READ_TIMEOUT,
+                    retries=settings.UPSTREAM_RETRIES,
+                    backoff=settings.UPSTREAM_BACKOFF,
+                    pool_size=settings.UPSTREAM_POOL_SIZE,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.UPSTREAM_BREAKER_THRESHOLD,
+                        reset_timeout=settings.UPSTREAM_BREAKER_RESET,
+                    ),
+                )
+    return _client
+
+
+@receiver(setting_changed)
+def reset_client(setting=None, **kwargs):
+    """
+    Drop the process-wide client when an ``UPSTREAM_*`` setting changes.
+    """
+    global _client
+    if setting is None or setting.startswith('UPSTREAM_'):
+        _client = None
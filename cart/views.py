@@ -1,19 +1,47 @@
+import asyncio
+import codecs
+import uuid
+from datetime import timedelta
+
 import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.middleware.gzip import re_accepts_gzip
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.text import compress_sequence
+from django.views.decorators.http import require_GET
 from django.shortcuts import render
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
-from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework import viewsets, permissions
 from django.contrib.auth.models import User
-from cart.service import Cart
-from cart import serializers
-from .serializers import CartSerializer, ProductSerializer, UserSerializer
-from .serializers import ProductDetailSerializer, RegistrationSerializer
-from .models import Product
-from rest_framework.generics import RetrieveAPIView, DestroyAPIView
-from .models import Cart
+from cart.service import Cart as SessionCart
+from cart import metrics
+from cart.authentication import USER_AUTHENTICATION_CLASSES, get_user_cart
+from cart.catalog import CatalogUnavailable, get_catalog
+from cart.checkout import EmptyCart, OutOfStock, checkout, confirm
+from cart.conditional import conditional_get
+from cart.export import FORMATS, export_queryset, iter_csv, iter_jsonl
+from cart.importer import SyncResult, ingest_products, iter_records
+from cart.response_cache import cache_response
+from cart.filters import filter_items, filter_queryset, get_filters
+from cart.pagination import (
+    get_fields, get_page_size, key_fields, load_fields, merge_pages, page_rows, paginate_queryset, project,
+)
+from cart.search import search_products
+from cart.upstream import get_client
+from .serializers import CartOperationSerializer, CartSerializer, OrderSerializer, ProductSerializer, UserSerializer
+from .serializers import CategoryFacetSerializer, ProductDetailSerializer, RegistrationSerializer, get_fast_serializer
+from .serializers import CartItemSerializer
+from .models import CategoryFacet, Product
+from .models import Cart, CartItem, Order
 
 
 class RegistrationMixin:
@@ -39,9 +67,9 @@ class RegistrationMixin:
                 "RequestId": str(uuid.uuid4()),
                 "Message": "User created successfully",
                 "User": serializer.data}, status=status.HTTP_201_CREATED)
-        return Response({"Errors": serializers.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"Errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
-class RegistrationAPIView(generics.GenericAPIView, RegistrationMixin):
+class RegistrationAPIView(RegistrationMixin, generics.GenericAPIView):
     """
     API view for user registration.
 
@@ -96,25 +124,36 @@ class ProductAPI(APIView):
     Reference: https://dev.to/nick_langat/building-a-shopping-cart-using-django-rest-framework-54i0.
     """
 
+    @conditional_get()
+    @cache_response('productapi')
     def get(self, request):
         """
-        Handle GET requests to retrieve a list of products.
+        Handle GET requests to retrieve a page of products.
+
+        Query parameters:
+            cursor: Cursor of the page to fetch, taken from the previous page.
+            page_size: Number of products per page.
+            fields: Comma-separated subset of fields to return.
+            category: Only products of this category.
+            min_price, max_price: Inclusive price range.
+            ordering: One of id, -id, price, -price.
         """
+        fields = get_fields(request.query_params, ProductSerializer.Meta.fields)
         try:
-            # Fetch products from external API
-            response = requests.get('https://fakestoreapi.com/products')
-            response.raise_for_status()
-            external_products_data = response.json()
-
-            # Fetch products from database
-            db_products = Product.objects.all()
-            db_products_data = ProductSerializer(db_products, many=True).data
-
-            # Combine the products from the external API and the database
-            all_products_data = external_products_data + db_products_data
-
-            return Response(all_products_data, status=status.HTTP_200_OK)
-        except requests.RequestException as e:
+            # Fetch products from the cached external catalog, unless it is synced into the database
+            external_products_data = _external_products(request.query_params)
+
+            # Fetch one page of products from database and merge it with the external ones
+            db_products_data = _db_products_page(request.query_params, fields)
+            page = merge_pages(_unshadowed(external_products_data), db_products_data, request.query_params)
+
+            response = Response(project(page.items, fields), status=status.HTTP_200_OK)
+            if page.next_cursor is not None:
+                response['Link'] = page.next_link(request)
+            return response
+        except ValidationError:
+            raise
+        except CatalogUnavailable as e:
             return Response({"error": f"Failed to fetch products: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         except Exception as e:
             return Response({"error": f"Error processing products: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
@@ -126,7 +165,7 @@ class ProductAPI(APIView):
         Returns:
             Response: JSON response containing the details of the created product.
         """
-        serializer = ProductSerializer(data=request.data, files=request.FILES)
+        serializer = ProductSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -139,13 +178,24 @@ class ProductAPIView(APIView):
     """
     serializer_class = ProductSerializer
 
+    @conditional_get(upstream=False)
+    @cache_response('products', upstream=False)
     def get(self, request, format=None):
-        qs = Product.objects.all()
+        """
+        Get a page of products, see ProductAPI.get for the query parameters.
+        """
+        fields = get_fields(request.query_params, self.serializer_class.Meta.fields)
+        qs = filter_queryset(Product.objects.all(), get_filters(request.query_params))
+        serializer = get_fast_serializer(self.serializer_class, None if fields is None else tuple(fields))
+        page = paginate_queryset(serializer.values(qs, *key_fields(request.query_params)), request.query_params)
 
-        return Response(
-            {"data": self.serializer_class(qs, many=True).data}, 
+        response = Response(
+            {"data": serializer.serialize(page.items), "next": page.next_cursor},
             status=status.HTTP_200_OK
             )
+        if page.next_cursor is not None:
+            response['Link'] = page.next_link(request)
+        return response
 
     def post(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -157,6 +207,140 @@ class ProductAPIView(APIView):
             status=status.HTTP_201_CREATED
             )
 
+class ProductBulkAPI(APIView):
+    """
+    Create or update many products in one request.
+
+    The body is a JSON array of products or one product per line (JSONL /
+    NDJSON), keyed on ``id``. It is parsed as it is read and written in
+    batches of ``PRODUCT_BULK_BATCH_SIZE`` rows; invalid rows are skipped and
+    reported with their index instead of failing the request.
+    """
+    # IsAdminUser reads is_staff from the user, loaded rather than taken from the token.
+    authentication_classes = USER_AUTHENTICATION_CLASSES
+    permission_classes = (IsAdminUser,)
+    content_types = ('application/json', 'application/x-ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+    def post(self, request):
+        """
+        Upsert the products of the request body.
+
+        Returns:
+            Response: Counts of created, updated, unchanged and rejected rows,
+            the errors of the first rejected rows and the throughput.
+        """
+        if request.content_type.split(';')[0].strip() not in self.content_types:
+            return Response({"error": f"Content type must be one of: {', '.join(self.content_types)}."},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        result = SyncResult()
+        response_status = status.HTTP_200_OK
+        data = {}
+        if request.stream is not None:
+            # Not request.data: the body is never held in memory as a whole.
+            stream = codecs.getreader(request.encoding or settings.DEFAULT_CHARSET)(request.stream)
+            try:
+                ingest_products(iter_records(stream), batch_size=settings.PRODUCT_BULK_BATCH_SIZE,
+                                max_errors=settings.PRODUCT_BULK_MAX_ERRORS, result=result)
+            except ValueError as e:
+                data["error"] = f"Invalid JSON after {result.rows + result.rejected} rows: {e}"
+                response_status = status.HTTP_400_BAD_REQUEST
+        data.update({
+            "created": result.created,
+            "updated": result.updated,
+            "unchanged": result.unchanged,
+            "rejected": result.rejected,
+            "seconds": round(result.seconds, 3),
+            "rows_per_second": round(result.rows_per_second, 1),
+            "errors": result.errors,
+        })
+        return Response(data, status=response_status)
+
+class ProductSearchAPI(APIView):
+    """
+    Ranked full-text search over product title, name, description and category.
+    """
+    def get(self, request):
+        """
+        Search products.
+
+        Query parameters:
+            q: Search terms; every term must match, as a word prefix.
+            page_size: Maximum number of results.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "The q parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        results = search_products(query, limit=get_page_size(request.query_params))
+        data = ProductSerializer([product for product, _ in results], many=True).data
+        for item, (_, score) in zip(data, results):
+            item['score'] = round(score, 4)
+        return Response({"data": data}, status=status.HTTP_200_OK)
+
+class ProductFacetsAPI(APIView):
+    """
+    Product count and price range of each category, and of the whole catalog.
+    """
+    @conditional_get(upstream=False)
+    def get(self, request):
+        """
+        Get the category facets of the database catalog, by category name.
+
+        They are read from the CategoryFacet table, whose size is the number
+        of categories, not of products.
+        """
+        serializer = get_fast_serializer(CategoryFacetSerializer)
+        rows = list(serializer.values(CategoryFacet.objects.order_by('category')))
+        total = serializer.to_representation({
+            'category': None,
+            'product_count': sum(row['product_count'] for row in rows),
+            'min_price': min((row['min_price'] for row in rows), default=None),
+            'max_price': max((row['max_price'] for row in rows), default=None),
+        })
+        del total['category']
+        return Response({"categories": serializer.serialize(rows), "total": total}, status=status.HTTP_200_OK)
+
+@require_GET
+def product_export(request):
+    """
+    Stream the whole product catalog, with constant memory.
+
+    Query parameters:
+        format: jsonl (default) or csv.
+        updated_since: ISO 8601 date-time; only products changed since then.
+
+    The body is gzip-compressed on the fly when the client accepts it. The
+    ``X-Export-Timestamp`` header holds the time the export started, less
+    ``PRODUCT_EXPORT_OVERLAP_SECONDS``: pass it as ``updated_since`` for the
+    next incremental pull. A row's ``updated_at`` is set before its write
+    commits, so a row stamped just before the export started may not be
+    visible to it yet; the overlap makes the next pull include it again.
+    """
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in FORMATS:
+        return JsonResponse({"error": f"format must be one of: {', '.join(FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+    updated_since = None
+    if request.GET.get('updated_since'):
+        try:
+            updated_since = parse_datetime(request.GET['updated_since'])
+        except ValueError:
+            pass
+        if updated_since is None:
+            return JsonResponse({"error": "updated_since must be an ISO 8601 date-time."}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(updated_since):
+            updated_since = timezone.make_aware(updated_since, timezone.utc)
+
+    next_since = timezone.now() - timedelta(seconds=settings.PRODUCT_EXPORT_OVERLAP_SECONDS)
+    encode = iter_jsonl if export_format == 'jsonl' else iter_csv
+    blocks = encode(export_queryset(updated_since), chunk_size=settings.PRODUCT_EXPORT_CHUNK_SIZE)
+    gzipped = bool(re_accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+    response = StreamingHttpResponse(compress_sequence(blocks) if gzipped else blocks, content_type=FORMATS[export_format])
+    if gzipped:
+        response['Content-Encoding'] = 'gzip'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    response['Content-Disposition'] = f'attachment; filename="products.{export_format}"'
+    response['X-Export-Timestamp'] = next_since.isoformat()
+    return response
+
 class ProductDetailAPI(generics.RetrieveUpdateDestroyAPIView):
     """
     API to handle individual product operations (GET, DELETE)
@@ -164,46 +348,294 @@ class ProductDetailAPI(generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductDetailSerializer
 
+    # Validated without the external catalog, which is only asked for products missing from the database.
+    @conditional_get(upstream=False)
     def get(self, request, *args, **kwargs):
         product_id = self.kwargs.get('pk')
 
         # Try to fetch the product from the database
+        product = _db_product(product_id)
+        if product is not None:
+            return Response(product, status=status.HTTP_200_OK)
+        if settings.CATALOG_SOURCE == 'database':
+            return Response({"error": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
+        # If the product is not found in the database, try to fetch it from the external API
         try:
-            product = Product.objects.get(pk=product_id)
-            serializer = ProductDetailSerializer(product)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Product.DoesNotExist:
-            # If the product is not found in the database, try to fetch it from the external API
-            response = requests.get(f'https://fakestoreapi.com/products/{product_id}')
-
-            if response.status_code == 200:
-                return Response(response.json(), status=status.HTTP_200_OK)
-            else:
-                return Response({"error": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
+            response = get_client().get(f"{settings.CATALOG_URL.rstrip('/')}/{product_id}")
+        except requests.RequestException as e:
+            return Response({"error": f"Failed to fetch product: {str(e)}"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        if response.status_code == 200:
+            product = Response(response.json(), status=status.HTTP_200_OK)
+            product.from_upstream = True
+            return product
+        else:
+            return Response({"error": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
 
     def perform_destroy(self, instance):
         instance.delete()
 
+def _external_products(params):
+    if settings.CATALOG_SOURCE == 'database':
+        return []
+    return filter_items(get_catalog().get(), get_filters(params))
+
+
+def _unshadowed(external):
+    """
+    Drop upstream products that have a database row with the same id.
+    """
+    if not external:
+        return external
+    local_ids = set(Product.objects.filter(id__in=[item['id'] for item in external]).values_list('id', flat=True))
+    return [item for item in external if item['id'] not in local_ids]
+
+
+def _db_products_page(params, fields):
+    db_products = filter_queryset(Product.objects.all(), get_filters(params))
+    fields = load_fields(fields, params)
+    # Only load the columns (e.g. not the description TextField) the client asked for
+    serializer = get_fast_serializer(ProductSerializer, None if fields is None else tuple(fields))
+    return serializer.serialize(page_rows(serializer.values(db_products), params))
+
+
+def _db_product(product_id):
+    serializer = get_fast_serializer(ProductDetailSerializer)
+    row = serializer.values(Product.objects.filter(pk=product_id)).first()
+    return serializer.to_representation(row) if row is not None else None
+
+
+def _external_product(product_id):
+    if settings.CATALOG_SOURCE == 'database':
+        return None
+    response = get_client().get(f"{settings.CATALOG_URL.rstrip('/')}/{product_id}")
+    return response.json() if response.status_code == 200 else None
+
+
+async def product_list_async(request):
+    """
+    Async counterpart of ProductAPI.get for the ASGI entry point.
+
+    The upstream catalog and the database products are fetched concurrently:
+    the upstream call runs in the shared thread pool while the ORM query runs
+    on the thread reserved for database access.
+    """
+    try:
+        fields = get_fields(request.GET, ProductSerializer.Meta.fields)
+        external_products_data, db_products_data = await asyncio.gather(
+            sync_to_async(_external_products, thread_sensitive=False)(request.GET),
+            sync_to_async(_db_products_page)(request.GET, fields),
+        )
+        external_products_data = await sync_to_async(_unshadowed)(external_products_data)
+        page = merge_pages(external_products_data, db_products_data, request.GET)
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    except CatalogUnavailable as e:
+        return JsonResponse({"error": f"Failed to fetch products: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    except Exception as e:
+        return JsonResponse({"error": f"Error processing products: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+    response = JsonResponse(project(page.items, fields), safe=False)
+    if page.next_cursor is not None:
+        response['Link'] = page.next_link(request)
+    return response
+
+
+async def product_detail_async(request, pk):
+    """
+    Async counterpart of ProductDetailAPI.get for the ASGI entry point.
+
+    The upstream catalog is only asked for products missing from the database,
+    like in the sync view.
+    """
+    product = await sync_to_async(_db_product)(pk)
+    if product is not None:
+        return JsonResponse(product)
+    try:
+        product = await sync_to_async(_external_product, thread_sensitive=False)(pk)
+    except requests.RequestException as e:
+        return JsonResponse({"error": f"Failed to fetch product: {str(e)}"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if product is None:
+        return JsonResponse({"error": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
+    return JsonResponse(product)
+
+
+def _guest_cart_data(cart):
+    items = [{"product": int(product_id), "quantity": line["quantity"]} for product_id, line in cart.cart.items()]
+    return {"items": items, "totals": cart.totals()}
+
 class CartAPI(generics.ListCreateAPIView):
+    """
+    List the items of the user's cart, or add one.
+
+    Responses include the cart's running ``totals`` (item count and subtotal).
+    Anonymous clients get a guest cart kept by the cart storage backend
+    (``cart.service.Cart``), merged into their database cart at login.
+    """
     serializer_class = CartSerializer
 
     def get_queryset(self):
-        user = self.request.user
-        cart, created = Cart.objects.get_or_create(user=user)
-        return cart.items.all()
+        self.cart = get_user_cart(self.request)
+        return self.cart.items.select_related('product')
+
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return Response(_guest_cart_data(SessionCart(request)))
+        serializer = get_fast_serializer(self.serializer_class)
+        items = serializer.serialize(serializer.values(self.filter_queryset(self.get_queryset())))
+        return Response({"items": items, "totals": self.cart.totals()})
+
+    def create(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            product = serializer.validated_data['product']
+            cart = SessionCart(request)
+            cart.add({'id': product.pk, 'price': product.price}, quantity=serializer.validated_data.get('quantity', 1))
+            line = {"product": product.pk, "quantity": cart.cart[str(product.pk)]["quantity"]}
+            return Response({**line, "totals": cart.totals()}, status=status.HTTP_201_CREATED)
+        response = super().create(request, *args, **kwargs)
+        response.data = {**response.data, "totals": self.cart.totals()}
+        return response
 
     def perform_create(self, serializer):
-        user = self.request.user
-        cart, created = Cart.objects.get_or_create(user=user)
-        serializer.save(cart=cart)
+        self.cart = get_user_cart(self.request)
+        # Adding a product already in the cart increases the quantity of its line.
+        serializer.instance = self.cart.add_item(
+            serializer.validated_data['product'], serializer.validated_data.get('quantity', 1))
+
+class CartBatchAPI(APIView):
+    """
+    Apply a list of add / set / remove operations to the user's cart in one transaction.
+
+    The body is a list of ``{"product": id, "quantity": n, "op": "add" | "set" | "remove"}``;
+    the response holds the resulting cart items and totals. Anonymous clients
+    update their guest cart.
+    """
+    def post(self, request):
+        # Checked before validating, which would go through every operation first.
+        if isinstance(request.data, list) and len(request.data) > settings.CART_BATCH_MAX_OPERATIONS:
+            return Response(
+                {"error": f"At most {settings.CART_BATCH_MAX_OPERATIONS} operations per batch."},
+                status=status.HTTP_400_BAD_REQUEST)
+        serializer = CartOperationSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        if not request.user.is_authenticated:
+            cart = SessionCart(request)
+            try:
+                cart.apply_operations(serializer.validated_data)
+            except Product.DoesNotExist as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(_guest_cart_data(cart), status=status.HTTP_200_OK)
+        cart = get_user_cart(request)
+        try:
+            cart.apply_operations(serializer.validated_data)
+        except Product.DoesNotExist as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = get_fast_serializer(CartSerializer)
+        items = serializer.serialize(serializer.values(cart.items.order_by('pk')))
+        return Response({"items": items, "totals": cart.totals()}, status=status.HTTP_200_OK)
+
+class CartItemAPI(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Retrieve, update or remove one item of the user's cart, keeping the cart totals current.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = CartItemSerializer
+
+    def get_queryset(self):
+        return CartItem.objects.filter(cart__user_id=self.request.user.pk).select_related('cart', 'product')
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response.data = {**response.data, "totals": self.cart.totals()}
+        return response
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        # The line is read again once the cart is locked: it may have changed since it was loaded.
+        serializer.instance.cart.lock()
+        try:
+            serializer.instance.refresh_from_db(fields=['quantity'])
+        except CartItem.DoesNotExist:
+            raise NotFound()
+        old_quantity, old_total = serializer.instance.quantity, serializer.instance.line_total
+        item = serializer.save()
+        self.cart = item.cart
+        self.cart.add_to_totals(item.quantity - old_quantity, item.line_total - old_total)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.cart.lock()
+        line = CartItem.objects.filter(pk=instance.pk)
+        quantity = line.values_list('quantity', flat=True).first()
+        if quantity is not None:
+            line.delete()
+            instance.cart.add_to_totals(-quantity, -quantity * instance.unit_price)
 
 class ClearCartAPI(APIView):
+    @transaction.atomic
     def post(self, request):
         user = request.user
-        cart, created = Cart.objects.get_or_create(user=user)
+        if not user.is_authenticated:
+            SessionCart(request).clear()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        cart = get_user_cart(request)
+        cart.lock()
         cart.items.all().delete()
+        Cart.objects.filter(pk=cart.pk).update(item_count=0, subtotal=0)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class CheckoutAPI(APIView):
+    """
+    Turn the user's cart into an order, reserving the stock of its lines.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        """
+        Check out the cart.
+
+        Returns:
+            Response: The order (201); its stock is held until ``expires_at``,
+            by which time it must be confirmed. 409 with the ids of the
+            products short of stock, in which case nothing is reserved.
+        """
+        try:
+            order = checkout(get_user_cart(request))
+        except EmptyCart as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except OutOfStock as e:
+            return Response({"error": str(e), "products": e.product_ids}, status=status.HTTP_409_CONFLICT)
+        return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
+
+class OrderConfirmAPI(APIView):
+    """
+    Confirm one of the user's orders before its reservation expires.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, pk):
+        try:
+            order = Order.objects.get(pk=pk, user_id=request.user.pk)
+        except Order.DoesNotExist:
+            return Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not confirm(order):
+            order.refresh_from_db(fields=['status'])
+            return Response({"error": f"The order is {order.status}, it cannot be confirmed."},
+                            status=status.HTTP_409_CONFLICT)
+        return Response(OrderSerializer(order).data, status=status.HTTP_200_OK)
+
+def prometheus_metrics(request):
+    """
+    Serve the counters and request histograms of this process in the Prometheus text format.
+
+    Only staff users and the addresses in ``METRICS_ALLOWED_IPS`` (the
+    scraper's) are answered; other clients get a 403.
+    """
+    if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 def home(request):
     """
     Render the home page.
@@ -215,9 +647,10 @@ def home(request):
         Response: Rendered HTML page with the list of products.
     """
     try:
-        response = requests.get('https://fakestoreapi.com/products')
-        response.raise_for_status()
-        products = response.json()
+        if settings.CATALOG_SOURCE == 'database':
+            products = ProductSerializer(Product.objects.all(), many=True).data
+        else:
+            products = get_catalog().get()
         return render(request, 'home.html', {'products': products})
-    except requests.RequestException as e:
+    except CatalogUnavailable as e:
         return render(request, 'home.html', {'error': f"Failed to fetch products: {str(e)}"})
@@ -0,0 +1,155 @@
+"""
+Warm-up of a freshly started process.
+
+Django and DRF do much of their setup lazily: URL patterns are compiled,
+serializer fields introspected, templates loaded, database connections
+opened and the catalog and response caches filled by the first requests that
+need them, which makes the first requests served by a new worker the
+slowest. ``warm_up`` does that work at boot instead. ``shopping.wsgi`` and
+``shopping.asgi`` run it when ``WARM_UP`` is on; ``gunicorn.conf.py`` runs it
+in each worker, or once in the master before forking with ``--preload``.
+
+Connections must not be shared by forked processes: ``release_connections``
+closes those opened in the master, and each worker opens its own.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+from django.test import Client
+from django.urls import get_resolver
+
+from . import search, upstream
+from .catalog import CatalogUnavailable, get_catalog
+from .models import CatalogVersion
+from .renderers import FastJSONRenderer
+from .serializers import CartSerializer, ProductDetailSerializer, ProductSerializer, get_fast_serializer
+
+logger = logging.getLogger(__name__)
+
+# Serializers rendered by the read endpoints through the fast path.
+FAST_SERIALIZERS = (ProductSerializer, ProductDetailSerializer, CartSerializer)
+TEMPLATES = ('home.html',)
+
+
+def _compile_urls(resolver):
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if hasattr(pattern, 'url_patterns'):
+            _compile_urls(pattern)
+
+
+def _host():
+    # A host accepted by ALLOWED_HOSTS ('localhost' is allowed when it is empty and DEBUG is on).
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def warm_urls():
+    """
+    Import the URLconf and its views, and compile every URL pattern.
+    """
+    resolver = get_resolver()
+    _compile_urls(resolver)
+    # Builds the reverse lookup tables used by reverse() and DRF's links.
+    resolver.reverse_dict
+
+
+def warm_serializers():
+    """
+    Introspect the fields of the fast-path serializers and load the JSON renderer and templates.
+    """
+    for serializer_class in FAST_SERIALIZERS:
+        get_fast_serializer(serializer_class)
+    FastJSONRenderer().render({})
+    for name in TEMPLATES:
+        get_template(name)
+
+
+def warm_database():
+    """
+    Open a connection to every database and read the catalog version.
+    """
+    for connection in connections.all():
+        connection.ensure_connection()
+    CatalogVersion.current()
+
+
+def warm_catalog():
+    """
+    Fetch the upstream catalog and build the search index.
+    """
+    if settings.CATALOG_SOURCE != 'database':
+        try:
+            get_catalog().get()
+        except CatalogUnavailable as e:
+            logger.warning("Warm-up could not fetch the upstream catalog: %s", e)
+    search.get_backend().search('warm', 1)
+
+
+def warm_requests(paths):
+    """
+    GET each of ``paths`` through the whole middleware stack, filling the response cache.
+    """
+    client = Client(HTTP_HOST=_host(), raise_request_exception=False)
+    for path in paths:
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            logger.warning("Warm-up request to %s answered %s", path, response.status_code)
+
+
+@contextmanager
+def _step(timings, name):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        # A failed step makes the first requests slower, not the process unable to start.
+        logger.exception("Warm-up step %s failed", name)
+    timings[name] = round(time.perf_counter() - started, 4)
+
+
+def warm_up(paths=None):
+    """
+    Do the lazy setup of the first requests now.
+
+    Args:
+        paths (list): Paths requested to prime the caches; defaults to ``WARM_UP_PATHS``.
+
+    Returns:
+        dict: Seconds spent in each step.
+    """
+    paths = settings.WARM_UP_PATHS if paths is None else paths
+    timings = {}
+    with _step(timings, 'urls'):
+        warm_urls()
+    with _step(timings, 'serializers'):
+        warm_serializers()
+    with _step(timings, 'catalog'):
+        warm_catalog()
+    with _step(timings, 'requests'):
+        warm_requests(paths)
+    # Last: request_started closes connections older than CONN_MAX_AGE.
+    with _step(timings, 'database'):
+        warm_database()
+    logger.info("Warmed up in %.3fs: %s", sum(timings.values()), timings)
+    return timings
+
+
+def release_connections():
+    """
+    Close the database and upstream connections of this process before it forks.
+
+    Cached data is kept and shared with the children copy-on-write.
+    """
+    connections.close_all()
+    client = upstream.get_client()
+    client.session.close()
+    upstream.reset_client()
@@ -0,0 +1,30 @@
+"""
+gunicorn settings, read from the working directory by ``gunicorn shopping.wsgi``.
+
+With ``WARM_UP`` on, every worker warms up (see ``cart.warmup``) before it
+accepts connections. ``GUNICORN_PRELOAD`` loads and warms the application
+once in the master instead: workers are forked with the imports, compiled
+URL patterns, serializers and filled caches already in memory, and only open
+their own database connections.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+
+def pre_fork(server, worker):
+    # Connections opened by the master's warm-up must not be shared with workers.
+    if server.cfg.preload_app:
+        from cart.warmup import release_connections
+        release_connections()
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    if settings.WARM_UP:
+        from cart.warmup import warm_database
+        warm_database()
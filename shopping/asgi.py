@@ -8,9 +8,20 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 """
 
 import os
+import threading
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shopping.settings')
 
 application = get_asgi_application()
+
+# Pay for the lazy setup of the first requests at boot (see cart.warmup).
+# Run in a thread: the server may import this module from its running event
+# loop, where the ORM refuses synchronous calls.
+if settings.WARM_UP:
+    from cart.warmup import warm_up
+    thread = threading.Thread(target=warm_up, name='warm-up')
+    thread.start()
+    thread.join()
@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 
 import os
+import tempfile
+from datetime import timedelta
 from pathlib import Path
 
 
@@ -34,6 +36,107 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'auth.User'
 # Define the session key for the shopping cart
 CART_SESSION_ID = 'cart'  # You can use any string as the session key
+# Largest number of operations accepted by one POST /cart/batch/.
+CART_BATCH_MAX_OPERATIONS = int(os.environ.get('CART_BATCH_MAX_OPERATIONS', 500))
+# Seconds checkout holds the stock of an order before it must be confirmed
+# (cart.checkout); `manage.py release_reservations` returns expired holds.
+ORDER_RESERVATION_SECONDS = int(os.environ.get('ORDER_RESERVATION_SECONDS', 15 * 60))
+# Where cart.service.Cart keeps guest carts (cart.storage): SessionCartStorage
+# or SignedCookieCartStorage. Logged-in users' carts are always in the cart
+# tables.
+CART_STORAGE = os.environ.get('CART_STORAGE', 'cart.storage.SessionCartStorage')
+CART_COOKIE_NAME = os.environ.get('CART_COOKIE_NAME', 'cart')
+CART_COOKIE_MAX_AGE = int(os.environ.get('CART_COOKIE_MAX_AGE', 60 * 60 * 24 * 14))
+# 'django.contrib.sessions.backends.cached_db' serves session (and session
+# cart) reads from the cache; use it with a cache shared by all processes.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+
+# External product catalog (fakestoreapi.com), cached in process.
+# A copy is fresh for CATALOG_TTL seconds, then served for up to
+# CATALOG_STALE_TTL more seconds while it is refreshed in the background.
+CATALOG_URL = os.environ.get('CATALOG_URL', 'https://fakestoreapi.com/products')
+CATALOG_TTL = int(os.environ.get('CATALOG_TTL', 300))
+CATALOG_STALE_TTL = int(os.environ.get('CATALOG_STALE_TTL', 3600))
+# 'upstream' merges the external catalog into product reads; 'database' reads
+# the Product table alone once it is kept in sync by `manage.py import_catalog`.
+CATALOG_SOURCE = os.environ.get('CATALOG_SOURCE', 'upstream')
+
+# Keyset pagination of the product listings (cart.pagination).
+PRODUCT_PAGE_SIZE = int(os.environ.get('PRODUCT_PAGE_SIZE', 100))
+PRODUCT_MAX_PAGE_SIZE = int(os.environ.get('PRODUCT_MAX_PAGE_SIZE', 1000))
+# Rows fetched per database round trip by the streaming /products/export/.
+PRODUCT_EXPORT_CHUNK_SIZE = int(os.environ.get('PRODUCT_EXPORT_CHUNK_SIZE', 2000))
+# Seconds X-Export-Timestamp is moved back, so the next incremental export
+# also picks up writes that were still committing while this one ran.
+PRODUCT_EXPORT_OVERLAP_SECONDS = int(os.environ.get('PRODUCT_EXPORT_OVERLAP_SECONDS', 60))
+# Rows validated and upserted per transaction by /products/bulk/, and the
+# number of rejected rows whose errors are listed in its response.
+PRODUCT_BULK_BATCH_SIZE = int(os.environ.get('PRODUCT_BULK_BATCH_SIZE', 500))
+PRODUCT_BULK_MAX_ERRORS = int(os.environ.get('PRODUCT_BULK_MAX_ERRORS', 100))
+
+# Cache-Control of the product read endpoints, which also answer conditional
+# GETs (ETag / Last-Modified, see cart.conditional). Clients revalidate after
+# PRODUCT_CACHE_MAX_AGE seconds, shared caches after PRODUCT_PROXY_MAX_AGE.
+PRODUCT_CACHE_MAX_AGE = int(os.environ.get('PRODUCT_CACHE_MAX_AGE', 0))
+PRODUCT_PROXY_MAX_AGE = int(os.environ.get('PRODUCT_PROXY_MAX_AGE', 60))
+
+# Per-request instrumentation (cart.middleware.PerformanceMiddleware):
+# histograms served by /metrics/, a warning logged for requests slower than
+# SLOW_REQUEST_SECONDS (0 disables it) and, with SERVER_TIMING_ENABLED, a
+# Server-Timing header on every response. The header tells any client how
+# long the database and upstream took, so only turn it on where that is fine.
+# /metrics/ answers staff users and the addresses in METRICS_ALLOWED_IPS,
+# which is empty by default: behind a reverse proxy on the same host every
+# client would come from 127.0.0.1, so list the scraper's address to opt in.
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', 1.0))
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+
+# Warm-up of new processes (cart.warmup): shopping.wsgi / shopping.asgi compile
+# the URLconf, build the serializers, open database connections, fetch the
+# catalog and GET WARM_UP_PATHS (comma separated) before serving traffic.
+WARM_UP = os.environ.get('WARM_UP', 'false').lower() in ('1', 'true', 'yes')
+WARM_UP_PATHS = [path for path in os.environ.get('WARM_UP_PATHS', '/products/,/productapi/').split(',') if path]
+
+# Server-side cache of rendered product list responses (cart.response_cache),
+# keyed by endpoint, query string and catalog version. Use a shared backend
+# (e.g. django.core.cache.backends.filebased.FileBasedCache) so a cold key is
+# rendered by a single process.
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRY_BYTES', 1024 * 1024))
+RESPONSE_CACHE_LOCK_TIMEOUT = float(os.environ.get('RESPONSE_CACHE_LOCK_TIMEOUT', 5))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', 'product-responses'),
+        'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 600)),
+        # Least recently used entries are culled past MAX_ENTRIES.
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))},
+    },
+}
+
+# Product search (cart.search): 'auto' uses SQLite FTS5 when available and an
+# in-process inverted index otherwise ('fts5' / 'memory' force one of them).
+# The in-process index is rebuilt at most every PRODUCT_SEARCH_MAX_AGE seconds
+# to pick up writes made by other processes.
+PRODUCT_SEARCH_BACKEND = os.environ.get('PRODUCT_SEARCH_BACKEND', 'auto')
+PRODUCT_SEARCH_MAX_AGE = int(os.environ.get('PRODUCT_SEARCH_MAX_AGE', 300))
+
+# Shared upstream HTTP client (cart.upstream): pooled keep-alive connections,
+# connect/read timeouts, retries with jittered backoff and a circuit breaker
+# that opens after UPSTREAM_BREAKER_THRESHOLD consecutive failures for
+# UPSTREAM_BREAKER_RESET seconds.
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3.05))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10))
+UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 2))
+UPSTREAM_BACKOFF = float(os.environ.get('UPSTREAM_BACKOFF', 0.1))
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 10))
+UPSTREAM_BREAKER_THRESHOLD = int(os.environ.get('UPSTREAM_BREAKER_THRESHOLD', 5))
+UPSTREAM_BREAKER_RESET = float(os.environ.get('UPSTREAM_BREAKER_RESET', 30))
 # Application definition
 
 INSTALLED_APPS = [
@@ -47,12 +150,36 @@ INSTALLED_APPS = [
     'rest_framework',
 ]
 
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        # Bearer tokens from /token/, checked without a session or User query (cart.authentication).
+        'rest_framework_simplejwt.authentication.JWTTokenUserAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        # Same output as rest_framework.renderers.JSONRenderer, faster (cart.renderers).
+        'cart.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Lifetimes of the tokens issued by /token/. Access tokens are checked without
+# loading the user, so a deactivated user keeps access until theirs expires:
+# keep them short-lived. Refreshing checks that the user is still active.
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.environ.get('ACCESS_TOKEN_MINUTES', 5))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(hours=int(os.environ.get('REFRESH_TOKEN_HOURS', 24))),
+}
+
 MIDDLEWARE = [
+    'cart.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'cart.middleware.CartStorageMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,12 +208,47 @@ WSGI_APPLICATION = 'shopping.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE selects the profile: sqlite (default, single node) or postgres.
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 closes them after
+# each request); with DB_HEALTH_CHECKS a kept connection is checked before a
+# request reuses it (cart.db).
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60 if DB_ENGINE == 'postgres' else 0))
+DB_HEALTH_CHECKS = os.environ.get('DB_HEALTH_CHECKS', 'true').lower() in ('1', 'true', 'yes')
+
+# SQLite tuning applied to every new connection (cart.backends.sqlite3): WAL lets readers
+# run alongside a writer, a busy timeout makes writers wait for the lock
+# instead of failing with "database is locked", and IMMEDIATE transactions
+# take the write lock up front so a read-then-write transaction cannot fail
+# half way.
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 20))
+SQLITE_TRANSACTION_MODE = os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'shopping'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'cart.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {'timeout': SQLITE_BUSY_TIMEOUT},
+            # A file, not the shared in-memory database, so threaded tests get real locking.
+            'TEST': {'NAME': os.environ.get('DB_TEST_NAME', os.path.join(tempfile.gettempdir(), 'shopping_test.sqlite3'))},
+        }
     }
-}
 
 
 # Password validation
@@ -21,17 +21,31 @@ from django.conf.urls.static import static
 
 from shopping import settings
 from cart import views
+from cart.authentication import CartTokenObtainPairView, CartTokenRefreshView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('register/', views.RegistrationAPIView.as_view(), name='register'),
+    path('token/', CartTokenObtainPairView.as_view(), name='token-obtain'),
+    path('token/refresh/', CartTokenRefreshView.as_view(), name='token-refresh'),
     path('users/', views.ListUser.as_view(), name='users-list'),
     path('users/<int:pk>/', views.DetailUser.as_view(), name='user-detail'),
     path('productapi/', views.ProductAPI.as_view(), name='products'),
     path('products/', views.ProductAPIView.as_view(), name='products'),
+    path('products/search/', views.ProductSearchAPI.as_view(), name='product-search'),
+    path('products/bulk/', views.ProductBulkAPI.as_view(), name='product-bulk'),
+    path('products/export/', views.product_export, name='product-export'),
+    path('products/facets/', views.ProductFacetsAPI.as_view(), name='product-facets'),
     path('products/<int:pk>/', views.ProductDetailAPI.as_view(), name='product-detail'),
+    path('async/productapi/', views.product_list_async, name='products-async'),
+    path('async/products/<int:pk>/', views.product_detail_async, name='product-detail-async'),
     path('cart/', views.CartAPI.as_view(), name='cart'),
+    path('cart/batch/', views.CartBatchAPI.as_view(), name='cart-batch'),
+    path('cart/items/<int:pk>/', views.CartItemAPI.as_view(), name='cart-item'),
     path('cart/clear/', views.ClearCartAPI.as_view(), name='clear_cart'),
+    path('checkout/', views.CheckoutAPI.as_view(), name='checkout'),
+    path('orders/<int:pk>/confirm/', views.OrderConfirmAPI.as_view(), name='order-confirm'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
     path('', views.home, name='home'),
 ]
 
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shopping.settings')
 
 application = get_wsgi_application()
+
+# Pay for the lazy setup of the first requests at boot (see cart.warmup).
+if settings.WARM_UP:
+    from cart.warmup import warm_up
+    warm_up()